@@ -14,7 +14,7 @@ from src import (
     LLMAdapter,
     SecurityExtractor,
     DialogueState,
-    ExplicitDetector,
+    get_detector,
     ClassificationRules,
     KnowledgeBaseRetriever,
     get_owasp_display_name,
@@ -42,8 +42,20 @@ load_dotenv()
 # Originally had 0.65 but changed to 0.70 for better safety after some misclassifications
 THRESH_GO = 0.70  # min confidence to proceed to phase 2
 CLARIFY_THRESHOLD = 0.70  # ask questions below this
+LLM_TURN_BUDGET = 15.0  # seconds - past this the turn falls back to keyword detection
+
+# analyze_turn entity keys -> IOC keys used in the chat session (CVEs are looked up separately)
+LLM_ENTITY_KEYS = {
+    "ips": "ip", "urls": "url", "domains": "domain", "hashes": "hash",
+    "emails": "email", "filenames": "filename",
+}
+MULTI_LABEL_THRESHOLD = 0.75  # explicit pattern score needed to add an extra label for playbook merging
 OWASP_VERSION = "2025"  # OWASP Top 10 version: 2025 only
 
+# Hedging (optional) - e.g. LLM_HEDGE_MODEL=gpt-4o-mini: a call Gemini hasn't
+# answered by its usual p95 latency goes to that model too, first answer wins
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL")
+
 # OPA Configuration (optional)
 OPA_URL = os.getenv("OPA_URL")  # e.g., "http://localhost:8181/v1/data/playbook/result"
 
@@ -67,12 +79,14 @@ if "chat_messages" not in st.session_state:
 # Initialize services (only once per session)
 if "llm_adapter" not in st.session_state:
     st.session_state.llm_adapter = LLMAdapter(model="gemini-2.5-pro")
+    if LLM_HEDGE_MODEL:
+        st.session_state.llm_adapter.enable_hedging(LLM_HEDGE_MODEL)
 
 if "extractor" not in st.session_state:
     st.session_state.extractor = SecurityExtractor()
 
 if "explicit_detector" not in st.session_state:
-    st.session_state.explicit_detector = ExplicitDetector()
+    st.session_state.explicit_detector = get_detector()  # shared across sessions
 
 # Initialize classification cache for performance optimization
 if "classification_cache" not in st.session_state:
@@ -105,6 +119,10 @@ if "show_details_panel" not in st.session_state:
 if "executed_steps" not in st.session_state:
     st.session_state.executed_steps = {}
 
+# IOCs from an attached log file (streamed, merged into the next analysis)
+if "log_iocs" not in st.session_state:
+    st.session_state.log_iocs = None
+
 if "current_classification" not in st.session_state:
     st.session_state.current_classification = None
 
@@ -122,6 +140,8 @@ with st.sidebar:
             os.environ["GEMINI_API_KEY"] = api_key
             # Reinitialize LLM adapter with new key
             st.session_state.llm_adapter = LLMAdapter(model="gemini-2.5-pro")
+            if LLM_HEDGE_MODEL:
+                st.session_state.llm_adapter.enable_hedging(LLM_HEDGE_MODEL)
             st.success("API Key configured!")
             st.rerun()
     else:
@@ -169,6 +189,33 @@ with st.sidebar:
     
     st.divider()
     
+    st.header("📎 Log File")
+    log_file = st.file_uploader("Attach log file", type=["log", "txt", "csv", "json"],
+                                help="IOCs from the log are added to the next analysis")
+    if log_file is not None and st.button("Scan Log"):
+        # Stream it - big logs don't get loaded into memory at once, and CVE
+        # lookups start as soon as the first CVEs show up
+        progress_bar = st.progress(0.0, text="Scanning log...")
+        counts_box = st.empty()
+        looked_up = []
+        for update in st.session_state.extractor.extract_stream(log_file):
+            if update.total:
+                progress_bar.progress(min(update.position / update.total, 1.0), text="Scanning log...")
+            counts_box.caption(", ".join(f"{k}: {v}" for k, v in update.counts.items() if v))
+            for cve_id in update.new.cves:
+                if len(looked_up) < 3:
+                    looked_up.append(cve_id)
+                    cve = st.session_state.cve_service.get_cve_by_id(cve_id)  # cached for the analysis too
+                    if cve:
+                        st.caption(f"🔖 {cve_id} - {cve.get('severity', 'Unknown')}")
+            if update.done:
+                st.session_state.log_iocs = update.entities
+        progress_bar.progress(1.0, text="Log scanned")
+    if st.session_state.log_iocs is not None:
+        st.caption(f"Log IOCs attached: {sum(len(v) for v in st.session_state.log_iocs.__dict__().values())}")
+    
+    st.divider()
+    
     if st.button("🔄 Reset Conversation"):
         st.session_state.dialogue_ctx.reset()
         st.session_state.phase1_output = None
@@ -179,6 +226,7 @@ with st.sidebar:
         st.session_state.show_details_panel = True  # Always show panel in new UI
         st.session_state.executed_steps = {}
         st.session_state.execution_simulator.clear_log()
+        st.session_state.log_iocs = None
         if "phase2_result" in st.session_state:
             del st.session_state.phase2_result
         st.rerun()
@@ -540,16 +588,28 @@ Explanation:"""
                     "domain": ents.domains,
                     "hash": ents.hashes,
                     "email": ents.emails,
+                    "filename": ents.filenames,
                 }
+                if st.session_state.log_iocs is not None:
+                    log_ents = st.session_state.log_iocs
+                    for key, values in (("ip", log_ents.ips), ("url", log_ents.urls),
+                                        ("domain", log_ents.domains), ("hash", log_ents.hashes),
+                                        ("email", log_ents.emails), ("filename", log_ents.filenames)):
+                        iocs[key] = list(dict.fromkeys(iocs[key] + values))
                 
                 # Get knowledge base context
                 kb_context = st.session_state.kb_retriever.get_context_for_label(description_text)
                 
                 # Try explicit detection first (only for very obvious cases)
-                explicit_label, explicit_conf = st.session_state.explicit_detector.detect(description_text)
+                # One scan scores every label: the best one drives the fast path,
+                # the rest are reused for multi-label playbook merging below
+                explicit_scores = st.session_state.explicit_detector.detect_scores(description_text)
+                explicit_label, explicit_conf = next(iter(explicit_scores.items()), (None, 0.0))
                 
                 # Initialize classification to avoid NameError
                 classification = None
+                llm_labels = []
+                turn_question = None  # clarifying question from the combined LLM call, if any
                 
                 # Use fast path for high-confidence explicit detection (optimization)
                 # Lowered threshold from 0.90 to 0.85 to enable fast path more often
@@ -563,8 +623,42 @@ Explanation:"""
                     rationale = f"Detected: {explicit_label}"
                 else:
                     # Use LLM for semantic understanding - it handles vague descriptions better
-                    # Check cache first to avoid redundant API calls (performance optimization)
-                    cached_result = st.session_state.classification_cache.get(description_text)
+                    # Build rich context for LLM with FULL conversation history
+                    # Get both structured context and natural conversation flow
+                    conversation_summary = st.session_state.dialogue_ctx.get_conversation_context()
+                    full_conversation = st.session_state.dialogue_ctx.get_full_conversation_history()
+                    
+                    # Add explicit detection hint if we found something (even if low confidence)
+                    context_parts = [kb_context]
+                    if explicit_label and explicit_conf >= 0.60:
+                        context_parts.append(f"Keyword hint: '{explicit_label}' (confidence: {explicit_conf:.2f})")
+                    
+                    # Add NVD context if we have CVEs or can search for related vulnerabilities
+                    if ents.cves:
+                        cve_info = []
+                        for cve_id in ents.cves[:3]:  # Limit to 3 CVEs
+                            try:
+                                cve_data = st.session_state.cve_service.get_cve_by_id(cve_id)
+                                if cve_data:
+                                    cve_info.append(f"{cve_id}: {cve_data.get('description', '')[:200]}")
+                            except Exception:
+                                pass  # CVE lookup failed, continue without it
+                        if cve_info:
+                            context_parts.append(f"Related CVEs:\n" + "\n".join(cve_info))
+                    
+                    full_context = "\n".join(context_parts)
+                    
+                    # Check cache first to avoid redundant API calls (performance optimization).
+                    # Keyed on the message plus everything that shapes the answer - context,
+                    # conversation so far, model and prompt - so a hit is never an answer
+                    # given for a different conversation state
+                    cache_scope = {
+                        "context": full_context,
+                        "conversation_history": full_conversation,
+                        "model": st.session_state.llm_adapter.model_name,
+                        "prompt": st.session_state.llm_adapter.prompt_fingerprint(CLARIFY_THRESHOLD),
+                    }
+                    cached_result = st.session_state.classification_cache.get(description_text, **cache_scope)
                     
                     if cached_result:
                         # Cache hit - use cached result (much faster, ~5ms instead of ~103ms!)
@@ -580,37 +674,35 @@ Explanation:"""
                         classification = None  # Initialize to avoid NameError
                         llm_labels = []  # Initialize LLM labels
                         try:
-                            # Build rich context for LLM with FULL conversation history
-                            # Get both structured context and natural conversation flow
-                            conversation_summary = st.session_state.dialogue_ctx.get_conversation_context()
-                            full_conversation = st.session_state.dialogue_ctx.get_full_conversation_history()
-                            
-                            # Add explicit detection hint if we found something (even if low confidence)
-                            context_parts = [kb_context]
-                            if explicit_label and explicit_conf >= 0.60:
-                                context_parts.append(f"Keyword hint: '{explicit_label}' (confidence: {explicit_conf:.2f})")
-                            
-                            # Add NVD context if we have CVEs or can search for related vulnerabilities
-                            if ents.cves:
-                                cve_info = []
-                                for cve_id in ents.cves[:3]:  # Limit to 3 CVEs
-                                    try:
-                                        cve_data = st.session_state.cve_service.get_cve_by_id(cve_id)
-                                        if cve_data:
-                                            cve_info.append(f"{cve_id}: {cve_data.get('description', '')[:200]}")
-                                    except Exception:
-                                        pass  # CVE lookup failed, continue without it
-                                if cve_info:
-                                    context_parts.append(f"Related CVEs:\n" + "\n".join(cve_info))
-                            
-                            full_context = "\n".join(context_parts)
-                            
                             # Pass full conversation history so Gemini remembers everything
-                            classification = st.session_state.llm_adapter.classify_incident(
+                            # One call gets the classification, entities and (when confidence is
+                            # low) the clarifying question - no second round trip for the question.
+                            # Streamed - the label shows up as soon as the model writes it
+                            # instead of after the whole response (rationale is the slow part)
+                            canned_question = explicit_label in ("injection", "broken_access_control") and explicit_conf >= 0.60
+                            label_box = st.empty()
+                            shown = (None, "")
+                            for chunk in st.session_state.llm_adapter.stream_analyze_turn(
                                 description=description_text,
                                 context=full_context,
                                 conversation_history=full_conversation,  # Full natural conversation
-                            )
+                                clarify_threshold=CLARIFY_THRESHOLD,
+                                budget=LLM_TURN_BUDGET,  # slow provider = degraded answer, not a hung chat
+                            ):
+                                if chunk.result is not None:
+                                    classification = chunk.result["classification"]
+                                    turn_question = chunk.result["clarifying_question"]
+                                    for key, values in chunk.result["entities"].items():
+                                        ioc_key = LLM_ENTITY_KEYS.get(key)
+                                        if ioc_key:
+                                            iocs[ioc_key] = list(dict.fromkeys(iocs.get(ioc_key, []) + values))
+                                elif chunk.label and (chunk.label, chunk.question) != shown:
+                                    shown = (chunk.label, chunk.question)
+                                    preview = f"🔎 Looks like **{get_owasp_display_name(chunk.label)}** - still analyzing..."
+                                    if chunk.question and not canned_question:
+                                        preview += f"\n\n**{chunk.question}▌**"
+                                    label_box.markdown(preview)
+                            label_box.empty()
                             
                             fine_label = classification.get("fine_label", "unknown")
                             score = float(classification.get("confidence", 0.0))
@@ -622,14 +714,20 @@ Explanation:"""
                             if not isinstance(llm_labels, list):
                                 llm_labels = []
                             
-                            # Cache the result for future use (performance optimization)
-                            cache_entry = {
-                                "fine_label": fine_label,
-                                "confidence": score,
-                                "incident_type": report_category,
-                                "rationale": rationale
-                            }
-                            st.session_state.classification_cache.set(description_text, cache_entry)
+                            if classification.get("degraded"):
+                                # LLM ran out of time - keyword answer, don't cache it so the
+                                # next attempt gets a real classification
+                                st.caption("⏱️ AI analysis took too long - showing a keyword-based classification.")
+                            else:
+                                # Cache the result for future use (performance optimization)
+                                cache_entry = {
+                                    "fine_label": fine_label,
+                                    "confidence": score,
+                                    "incident_type": report_category,
+                                    "rationale": rationale,
+                                    "labels": llm_labels,
+                                }
+                                st.session_state.classification_cache.set(description_text, cache_entry, **cache_scope)
                             
                             # If explicit detection found something and LLM agrees, boost confidence
                             if explicit_label and explicit_conf >= 0.70:
@@ -683,40 +781,17 @@ Explanation:"""
                 if label not in detected_labels:
                     detected_labels.insert(0, label)
                 
-                text_lower = description_text.lower()
-                
-                # Enhanced keyword detection for additional labels (backup if LLM missed something)
-                # Check for multiple attack types mentioned with "and", "also", "plus", etc.
-                has_multiple_indicators = any(word in text_lower for word in [" and ", " also ", " plus ", " combined with ", " as well as "])
-                
-                # Check for additional labels mentioned in the text
-                if ("broken access control" in text_lower or "access control" in text_lower or 
-                    "unauthorized access" in text_lower or "idor" in text_lower or
-                    "can access" in text_lower and "admin" in text_lower):
-                    if "broken_access_control" not in detected_labels:
-                        detected_labels.append("broken_access_control")
-                
-                if ("injection" in text_lower or "sql injection" in text_lower or 
-                    "xss" in text_lower or "command injection" in text_lower):
-                    if "injection" not in detected_labels and "sql_injection" not in detected_labels:
-                        detected_labels.append("injection")
-                
-                if ("authentication" in text_lower or "login" in text_lower or 
-                    "session" in text_lower or "password" in text_lower and "weak" in text_lower):
-                    if "broken_authentication" not in detected_labels:
-                        detected_labels.append("broken_authentication")
-                
-                # Enhanced cryptographic detection
-                if ("cryptographic" in text_lower or "encryption" in text_lower or 
-                    "plaintext" in text_lower or "unencrypted" in text_lower or
-                    "not encrypted" in text_lower or "without encryption" in text_lower or
-                    "crypto" in text_lower and "attack" in text_lower):
-                    if "cryptographic_failures" not in detected_labels:
-                        detected_labels.append("cryptographic_failures")
-                
-                if "misconfiguration" in text_lower or "misconfig" in text_lower:
-                    if "security_misconfiguration" not in detected_labels:
-                        detected_labels.append("security_misconfiguration")
+                # Add any other labels the explicit patterns scored (backup if LLM missed something)
+                # Reuses the scores from the detection scan above instead of re-scanning the text
+                from src.classification_rules import canonicalize_label
+                present_labels = {canonicalize_label(lbl) for lbl in detected_labels}
+                for extra_label, extra_conf in explicit_scores.items():
+                    if extra_conf < MULTI_LABEL_THRESHOLD:
+                        break  # scores are ordered highest first
+                    extra_canonical = canonicalize_label(extra_label)
+                    if extra_canonical != "other" and extra_canonical not in present_labels:
+                        detected_labels.append(extra_canonical)
+                        present_labels.add(extra_canonical)
                 
                 # Remove duplicates while preserving order
                 seen = set()
@@ -946,6 +1021,8 @@ Explanation:"""
                     conversation_history = st.session_state.dialogue_ctx.get_conversation_context()
                     
                     # Generate more specific question based on what we detected
+                    # (LLM questions are streamed below, as they're written)
+                    question_stream = None
                     try:
                         # Use full conversation history for better context
                         full_conversation = st.session_state.dialogue_ctx.get_full_conversation_history()
@@ -957,14 +1034,18 @@ Explanation:"""
                                 clarifying_question = "This sounds like it might be an injection attack. Can you tell me more? For example: What exact error messages or syntax did you see? Was it on a login page, search form, or somewhere else?"
                             elif explicit_label == "broken_access_control":
                                 clarifying_question = "This might be an access control issue. Can you clarify: What were they trying to access? Did they change a URL or parameter? What happened when they accessed it?"
+                            elif turn_question:
+                                clarifying_question = turn_question  # already came with the classification
                             else:
-                                clarifying_question = st.session_state.llm_adapter.generate_clarifying_question(
+                                question_stream = st.session_state.llm_adapter.stream_clarifying_question(
                                     incident_description=description_text,
                                     current_classification=classification_result,
                                     conversation_history=full_conversation
                                 )
+                        elif turn_question:
+                            clarifying_question = turn_question
                         else:
-                            clarifying_question = st.session_state.llm_adapter.generate_clarifying_question(
+                            question_stream = st.session_state.llm_adapter.stream_clarifying_question(
                                 incident_description=description_text,
                                 current_classification=classification_result,
                                 conversation_history=full_conversation
@@ -982,10 +1063,23 @@ Explanation:"""
                     version_badge = f"OWASP {detected_version}"
                     
                     response = f"🔍 I've analyzed your incident and I'm about {conf_pct}% confident this might be **{user_friendly_name}** ({version_badge}), but I'd like to gather more details to ensure accuracy.\n\n"
-                    response += f"**{clarifying_question}**\n\n"
-                    response += f"**Current Classification:** {actual_category}"
+                    footer = f"**Current Classification:** {actual_category}"
                     
-                    st.write(response)
+                    if question_stream is not None:
+                        # Show the question token by token instead of after the full round trip
+                        st.write(response)
+                        question_box = st.empty()
+                        clarifying_question = ""
+                        for piece in question_stream:
+                            clarifying_question += piece
+                            question_box.markdown(f"**{clarifying_question}▌**")
+                        question_box.markdown(f"**{clarifying_question}**")
+                        st.write(footer)
+                        response += f"**{clarifying_question}**\n\n" + footer
+                    else:
+                        response += f"**{clarifying_question}**\n\n"
+                        response += footer
+                        st.write(response)
                     
                     # Store assistant message
                     st.session_state.chat_messages.append({
@@ -0,0 +1,195 @@
+"""
+Combined Turn Benchmark
+=======================
+
+An ambiguous chat turn used to cost two sequential LLM round trips -
+classify_incident() and then generate_clarifying_question() (three with
+extract_entities()). analyze_turn() gets the classification, entities and
+question from one structured response.
+
+Runs against a local OpenAI-compatible server that answers after a fixed
+time to first token plus a per-token generation time, so the comparison
+includes both the extra round trip and the extra output tokens. "question
+shown" is when the user has the whole question on screen: the end of the
+second call for the old flow, and - with stream_analyze_turn(), where the
+question comes before the long rationale - partway through the one call.
+
+Defaults model a reasoning model like gemini-2.5-pro (slow first token,
+fast generation).
+
+Usage:
+    python scripts/benchmark_analyze_turn.py
+    python scripts/benchmark_analyze_turn.py --turns 20 --ttft-ms 600 --token-ms 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import src.llm_adapter as llm_adapter
+from src.llm_adapter import LLMAdapter
+
+CLASSIFICATION = {
+    "fine_label": "sql_injection",
+    "confidence": 0.55,
+    "labels": ["sql_injection"],
+    "incident_type": "A05:2025 - Injection",
+    "rationale": "Odd syntax on the login page could be an SQL injection attempt, but it might "
+                 "also be a misconfiguration showing verbose errors - needs clarification.",
+    "owasp_version": "2025",
+}
+QUESTION = ("I know this is stressful - what exactly appeared on the login page, for example an "
+            "error mentioning SQL or the database, and did it happen after someone typed something unusual?")
+ENTITIES = {"ips": ["203.0.113.7"], "urls": [], "domains": [], "hashes": [], "cves": [], "emails": [], "filenames": []}
+TURN = {
+    key: CLASSIFICATION[key] for key in ("fine_label", "confidence", "labels", "incident_type")
+}
+TURN.update(clarifying_question=QUESTION, rationale=CLASSIFICATION["rationale"],
+            entities=ENTITIES, owasp_version="2025")  # schema order
+COMPACT = (",", ":")  # structured outputs come back without whitespace
+RESPONSES = {
+    "incident_classification": json.dumps(CLASSIFICATION, separators=COMPACT),
+    "security_entities": json.dumps(ENTITIES, separators=COMPACT),
+    "incident_turn": json.dumps(TURN, separators=COMPACT),
+    None: QUESTION,
+}
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    ttft = 1.5
+    token_s = 0.01
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # client closed a kept-alive connection
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        schema = body.get("response_format", {}).get("json_schema", {}).get("name")
+        text = RESPONSES[schema]
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)]  # ~4 chars per token
+        time.sleep(self.ttft)
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for piece in pieces:
+                self._event({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+                time.sleep(self.token_s)
+            self._send_chunk(b"data: [DONE]\n\n")
+            self._send_chunk(b"")
+            return
+        time.sleep(self.token_s * len(pieces))
+        payload = json.dumps({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _event(self, data: dict):
+        data.update({"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o-mini"})
+        self._send_chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+DESCRIPTION = "weird syntax showed up on the login page from 203.0.113.7, not sure what it is"
+
+
+def separate_calls(adapter: LLMAdapter, with_entities: bool) -> float:
+    classification = adapter.classify_incident(DESCRIPTION)
+    if with_entities:
+        adapter.extract_entities(DESCRIPTION)
+    adapter.generate_clarifying_question(DESCRIPTION, classification)
+    return time.perf_counter()
+
+
+def combined_call(adapter: LLMAdapter) -> float:
+    adapter.analyze_turn(DESCRIPTION)
+    return time.perf_counter()
+
+
+def streamed_combined_call(adapter: LLMAdapter) -> float:
+    """Time the question was complete on screen."""
+    shown, shown_at = "", None
+    for chunk in adapter.stream_analyze_turn(DESCRIPTION):
+        if chunk.result is None and chunk.question != shown:
+            shown, shown_at = chunk.question, time.perf_counter()
+    return shown_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark separate calls vs analyze_turn for ambiguous turns")
+    parser.add_argument("--turns", type=int, default=10, help="Ambiguous turns per mode (median is reported)")
+    parser.add_argument("--ttft-ms", type=float, default=1500, help="Fake model time to first token")
+    parser.add_argument("--token-ms", type=float, default=10, help="Fake model time per output token")
+    args = parser.parse_args()
+
+    FakeModelHandler.ttft = args.ttft_ms / 1000
+    FakeModelHandler.token_s = args.token_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModelHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    llm_adapter.clear_provider_clients()
+    adapter = LLMAdapter(api_key="sk-bench", model="gpt-4o-mini")
+    adapter.rate_limiter = None
+
+    modes = {
+        "classify + question": lambda: separate_calls(adapter, with_entities=False),
+        "classify + entities + question": lambda: separate_calls(adapter, with_entities=True),
+        "analyze_turn": lambda: combined_call(adapter),
+        "stream_analyze_turn": lambda: streamed_combined_call(adapter),
+    }
+
+    print("=" * 74)
+    print(f"COMBINED TURN BENCHMARK - {args.turns} ambiguous turns, fake model: "
+          f"{args.ttft_ms:.0f} ms to first token, {args.token_ms:.0f} ms/token")
+    print("=" * 74)
+    print(f"{'':32s} {'calls':>6s} {'question shown':>15s} {'complete':>10s}")
+    medians = {}
+    for name, run in modes.items():
+        shown, done = [], []
+        calls_before = adapter.usage_totals.calls
+        for _ in range(args.turns):
+            start = time.perf_counter()
+            shown.append(run() - start)
+            done.append(time.perf_counter() - start)
+        calls = (adapter.usage_totals.calls - calls_before) / args.turns
+        medians[name] = statistics.median(shown)
+        print(f"{name:32s} {calls:6.1f} {medians[name] * 1000:13.0f}ms {statistics.median(done) * 1000:8.0f}ms")
+    print("-" * 74)
+    base = medians["classify + question"]
+    print(f"Question on screen vs classify + question: analyze_turn {base / medians['analyze_turn']:.2f}x, "
+          f"streamed {base / medians['stream_analyze_turn']:.2f}x sooner")
+    print("=" * 74)
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
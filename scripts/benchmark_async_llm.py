@@ -0,0 +1,101 @@
+"""
+Async LLM Classification Benchmark
+==================================
+
+Runs the 50-case accuracy corpus (tests/test_cases.py) through
+LLMAdapter.aclassify_many() at increasing concurrency limits and reports
+throughput. Throughput should scale with the limit until the provider's
+rate limit is hit.
+
+By default it calls the real provider (needs the API key for --model).
+--simulate replaces the network with a fake async client - fixed latency
+plus a cap on requests per second - to see the scaling shape offline.
+
+Usage:
+    python scripts/benchmark_async_llm.py --model gemini-2.5-flash
+    python scripts/benchmark_async_llm.py --simulate --latency-ms 800 --rps 20
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from dotenv import load_dotenv
+
+from src.llm_adapter import LLMAdapter
+from test_cases import TEST_CASES
+
+load_dotenv()
+
+
+class SimulatedClient:
+    """Fake AsyncOpenAI: fixed latency, at most `rps` requests started per second."""
+
+    def __init__(self, latency: float, rps: float):
+        self.latency = latency
+        self.interval = 1.0 / rps
+        self.next_slot = 0.0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        # queue behind the provider's rate limit
+        now = time.monotonic()
+        start = max(now, self.next_slot)
+        self.next_slot = start + self.interval
+        await asyncio.sleep(start - now + self.latency)
+        content = json.dumps({"fine_label": "other", "confidence": 0.5, "rationale": "simulated"})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark async LLM classification throughput")
+    parser.add_argument("--model", default="gemini-2.5-flash", help="Model to call")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Concurrency limits to try")
+    parser.add_argument("--simulate", action="store_true", help="Fake provider instead of real API calls")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Simulated call latency")
+    parser.add_argument("--rps", type=float, default=10, help="Simulated provider rate limit (requests/s)")
+    args = parser.parse_args()
+
+    descriptions = [case["user_input"] for case in TEST_CASES]
+    levels = [int(x) for x in args.levels.split(",")]
+
+    if args.simulate:
+        adapter = LLMAdapter(api_key="sk-simulated", model="gpt-4o-mini")
+        adapter.rate_limiter = None  # the simulated provider enforces its own limit
+        source = f"simulated ({args.latency_ms:.0f} ms/call, {args.rps:g} req/s limit)"
+    else:
+        adapter = LLMAdapter(model=args.model)
+        source = args.model
+
+    print("=" * 70)
+    print(f"ASYNC LLM CLASSIFICATION - {len(descriptions)} cases, {source}")
+    print("=" * 70)
+    print(f"{'concurrency':>12s} {'wall (s)':>10s} {'cases/s':>9s} {'speedup':>9s} {'errors':>7s}")
+
+    baseline = None
+    for level in levels:
+        if args.simulate:
+            # fresh client per level so rate-limit slots don't carry over
+            adapter._async_client = SimulatedClient(args.latency_ms / 1000, args.rps)
+        start = time.perf_counter()
+        results = adapter.classify_many(descriptions, concurrency=level, return_exceptions=True)
+        wall = time.perf_counter() - start
+        errors = sum(isinstance(r, Exception) for r in results)
+        baseline = baseline or wall
+        print(f"{level:12d} {wall:10.2f} {len(descriptions) / wall:9.2f} {baseline / wall:8.2f}x {errors:7d}")
+
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
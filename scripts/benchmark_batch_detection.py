@@ -0,0 +1,87 @@
+"""
+Batch Detection Benchmark
+=========================
+
+Replays a large corpus of incident descriptions through the keyword fast paths
+(ExplicitDetector.detect_many and BaselineKeywordClassifier.classify_many),
+in-process and with the process-pool backend.
+
+The corpus is the tests/accuracy cases repeated up to --count texts, with a
+case number appended so the texts aren't all identical.
+
+Usage:
+    python scripts/benchmark_batch_detection.py
+    python scripts/benchmark_batch_detection.py --count 100000 --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from src.explicit_detector import ExplicitDetector
+from src.baseline_keyword_classifier import BaselineKeywordClassifier
+from test_cases import TEST_CASES
+from accuracy.test_multi_incident_classification_merge import MULTI_INCIDENT_TEST_CASES
+
+
+def build_corpus(count: int) -> List[str]:
+    """Repeat the accuracy corpora up to `count` descriptions."""
+    base = [case["user_input"] for case in TEST_CASES]
+    base += [case["user_input"] for case in MULTI_INCIDENT_TEST_CASES]
+    return [f"{base[i % len(base)]} (ticket #{i})" for i in range(count)]
+
+
+def timed(label: str, fn: Callable[[], list], count: int) -> list:
+    """Run fn once, print wall time and throughput, return its results."""
+    start = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:54s} {elapsed:7.2f} s   {count / elapsed:10,.0f} texts/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch keyword detection")
+    parser.add_argument("--count", type=int, default=100_000, help="Descriptions to replay")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Process pool size for the parallel runs")
+    args = parser.parse_args()
+
+    texts = build_corpus(args.count)
+    detector = ExplicitDetector()
+    baseline = BaselineKeywordClassifier()
+
+    print("=" * 72)
+    print(f"BATCH DETECTION BENCHMARK - {args.count:,} descriptions, {args.workers} workers")
+    print("=" * 72)
+
+    serial = timed("ExplicitDetector.detect (loop)",
+                   lambda: [detector.detect(t) for t in texts], args.count)
+    timed("ExplicitDetector.detect_many (in-process)",
+          lambda: detector.detect_many(texts), args.count)
+    parallel = timed(f"ExplicitDetector.detect_many (workers={args.workers})",
+                     lambda: detector.detect_many(texts, workers=args.workers), args.count)
+
+    baseline_serial = timed("BaselineKeywordClassifier.classify_many (in-process)",
+                            lambda: baseline.classify_many(texts), args.count)
+    baseline_parallel = timed(f"BaselineKeywordClassifier.classify_many (workers={args.workers})",
+                              lambda: baseline.classify_many(texts, workers=args.workers), args.count)
+
+    in_order = serial == parallel and baseline_serial == baseline_parallel
+    print("-" * 72)
+    print(f"Parallel results identical and in input order: {in_order}")
+    print("=" * 72)
+
+    return 0 if in_order else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Batch Inference Benchmark
+=========================
+
+The experiment scripts classify one case at a time with a fixed sleep
+between calls (run_baseline_experiment.py: 1 s, run_improved_accuracy_
+comparison.py: 0.5 s). LLMAdapter.classify_batch() runs the same requests
+through a bounded worker pool (or the provider's batch endpoint), paced by
+the adapter's rate limiter instead of sleeps, and checkpoints every result.
+
+Runs against a local OpenAI-compatible server with a fixed latency, so it
+needs no API key. Measures wall time for the sequential loop vs the local
+batch pool, then interrupts a batch run halfway and measures the resume.
+
+Usage:
+    python scripts/benchmark_batch_inference.py
+    python scripts/benchmark_batch_inference.py --requests 100 --concurrency 16
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import src.llm_adapter as llm_adapter
+from src.batch_inference import load_results
+from src.llm_adapter import LLMAdapter
+
+RESPONSE = json.dumps({
+    "incident_type": "A05:2025 - Injection",
+    "fine_label": "sql_injection",
+    "labels": ["sql_injection"],
+    "confidence": 0.85,
+    "rationale": "Database errors after special characters in the login form",
+    "owasp_version": "2025",
+})
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.4
+    calls = 0
+    lock = threading.Lock()
+
+    def handle(self):
+        try:
+            super().handle()
+        except (ConnectionResetError, BrokenPipeError):
+            pass  # interrupted run dropped its in-flight calls
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.lock:
+            FakeModelHandler.calls += 1
+        time.sleep(self.latency)
+        payload = json.dumps({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": RESPONSE}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class Interrupted(Exception):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential experiment loop vs classify_batch")
+    parser.add_argument("--requests", type=int, default=40, help="Classification requests")
+    parser.add_argument("--latency-ms", type=float, default=400, help="Fake model latency")
+    parser.add_argument("--sleep-s", type=float, default=0.5, help="Sleep between calls in the sequential loop")
+    parser.add_argument("--concurrency", type=int, default=8, help="Batch worker pool size")
+    args = parser.parse_args()
+
+    FakeModelHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModelHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    llm_adapter.clear_provider_clients()
+    adapter = LLMAdapter(api_key="sk-bench", model="gpt-4o-mini")
+    requests = [{"id": f"case_{i:04d}", "description": f"SQL error on the login form (case {i})"}
+                for i in range(args.requests)]
+
+    print("=" * 74)
+    print(f"BATCH INFERENCE BENCHMARK - {args.requests} requests, fake model {args.latency_ms:.0f} ms")
+    print("=" * 74)
+
+    start = time.perf_counter()
+    for i, request in enumerate(requests):
+        adapter.classify_incident(request["description"])
+        if i < len(requests) - 1:
+            time.sleep(args.sleep_s)
+    sequential = time.perf_counter() - start
+    print(f"{'sequential loop (+' + str(args.sleep_s) + ' s sleep)':38s} {sequential:8.1f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "batch.jsonl")
+        start = time.perf_counter()
+        adapter.classify_batch(requests, output, mode="local", concurrency=args.concurrency)
+        batch = time.perf_counter() - start
+        print(f"{'classify_batch local x' + str(args.concurrency):38s} {batch:8.1f}s")
+
+        # Interrupt a fresh run halfway, then resume it
+        output = os.path.join(tmp, "resume.jsonl")
+
+        def stop_halfway(done, total):
+            if done >= total // 2:
+                raise Interrupted
+
+        try:
+            adapter.classify_batch(requests, output, mode="local", concurrency=args.concurrency,
+                                   progress=stop_halfway)
+        except Interrupted:
+            pass
+        checkpointed = sum("result" in r for r in load_results(output).values())
+        calls_before = FakeModelHandler.calls
+        start = time.perf_counter()
+        results = adapter.classify_batch(requests, output, mode="local", concurrency=args.concurrency)
+        resumed = time.perf_counter() - start
+        ok = sum("result" in r for r in results.values())
+        print(f"{'resume after interrupt':38s} {resumed:8.1f}s   "
+              f"({checkpointed} checkpointed, {FakeModelHandler.calls - calls_before} re-sent, {ok}/{len(requests)} done)")
+
+    print("-" * 74)
+    print(f"Batch pool {sequential / batch:.1f}x faster than the sequential loop")
+    print("=" * 74)
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
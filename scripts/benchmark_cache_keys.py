@@ -0,0 +1,101 @@
+"""
+Cache Key Benchmark
+===================
+
+The classification cache used to key on the message text alone. In a
+multi-turn chat the same follow-up ("Yes, it happened again this morning.")
+means a different incident in every conversation, so a text-only key hands
+one conversation's answer to another. Keys now also cover a fingerprint of
+the context / conversation so far, the model and the prompt hash, and
+invalidate() retires a namespace by bumping its version instead of scanning.
+
+Measures:
+- Multi-turn replay: conversations opened by each of the 50 test cases,
+  continued with generic follow-ups, replayed NUM_RUNS times (like the
+  latency scripts' repeated trials). The "LLM" answers each turn with the
+  conversation's expected label - a cache hit with another label is wrong.
+- Invalidation time with a large cache: drop-by-scan vs namespace bump
+
+Usage:
+    python scripts/benchmark_cache_keys.py
+    python scripts/benchmark_cache_keys.py --runs 3 --entries 500000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from src.classification_cache import ClassificationCache
+from test_cases import TEST_CASES
+
+FOLLOW_UPS = [
+    "Yes, it happened again this morning.",
+    "I'm not sure, can you help?",
+    "It started yesterday after the update.",
+]
+MODEL = "gpt-4o-mini"
+PROMPT = "classification-prompt-v1"
+
+
+def replay(cache, runs, composite):
+    """Returns (turns, hits, wrong hits)."""
+    turns = hits = wrong = 0
+    for _ in range(runs):
+        for case in TEST_CASES:
+            history = []
+            for message in [case["user_input"]] + FOLLOW_UPS:
+                scope = {"conversation_history": "\n".join(history), "model": MODEL, "prompt": PROMPT} if composite else {}
+                turns += 1
+                result = cache.get(message, **scope)
+                if result is None:
+                    cache.set(message, {"fine_label": case["expected"]}, **scope)  # the "LLM" gets it right
+                else:
+                    hits += 1
+                    wrong += result["fine_label"] != case["expected"]
+                history.append(f"User: {message}")
+    return turns, hits, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text-only vs composite cache keys")
+    parser.add_argument("--runs", type=int, default=3, help="Replays of every conversation")
+    parser.add_argument("--entries", type=int, default=200_000, help="Cache size for the invalidation test")
+    args = parser.parse_args()
+
+    print("=" * 74)
+    print(f"CACHE KEYS - {len(TEST_CASES)} conversations x {1 + len(FOLLOW_UPS)} turns, {args.runs} runs")
+    print("=" * 74)
+    print(f"{'key':28s} {'turns':>7s} {'hits':>7s} {'hit rate':>9s} {'wrong hits':>11s}")
+    for label, composite in (("message text only (old)", False), ("message + context + model", True)):
+        turns, hits, wrong = replay(ClassificationCache(), args.runs, composite)
+        print(f"{label:28s} {turns:7d} {hits:7d} {hits / turns:8.1%} {wrong:11d}")
+
+    cache = ClassificationCache(max_bytes=None)
+    for i in range(args.entries):
+        cache.set(f"incident {i}", {"fine_label": "injection"}, model=MODEL, prompt=PROMPT)
+    start = time.perf_counter()
+    with cache._lock:
+        stale = [key for key in cache.cache]  # all one namespace - a scan has to visit every key
+        for key in stale:
+            cache._drop(key)
+    scan = time.perf_counter() - start
+    for i in range(args.entries):
+        cache.set(f"incident {i}", {"fine_label": "injection"}, model=MODEL, prompt=PROMPT)
+    start = time.perf_counter()
+    cache.invalidate()
+    bump = time.perf_counter() - start
+    assert cache.get("incident 0", model=MODEL, prompt=PROMPT) is None
+    print(f"\nInvalidate {args.entries:,} entries: scan + delete {scan * 1000:.0f} ms, "
+          f"namespace bump {bump * 1e6:.1f} us")
+    print("=" * 74)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Classification Cache Benchmark
+==============================
+
+ClassificationCache.set() used to find its eviction victim with
+min(self.cache.keys(), key=...) - a scan over every entry on each insert once
+the cache is full, evicting by insert time (FIFO). The cache is now an
+OrderedDict LRU bounded by memory: insert, hit and eviction are O(1).
+
+Measures:
+- Insert time into a full cache at growing sizes, legacy scan vs LRU
+- Hit rate of FIFO vs LRU on a skewed (Zipf-like) incident stream, same size
+- Real memory per entry (tracemalloc) vs the cache's own byte estimate
+- Filling a cache with --fill entries (default 1M) under the default 64 MB bound
+
+Usage:
+    python scripts/benchmark_classification_cache.py
+    python scripts/benchmark_classification_cache.py --sizes 100,1000,10000 --fill 2000000
+"""
+
+import argparse
+import hashlib
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.classification_cache import ClassificationCache
+
+RESULT = {
+    "fine_label": "injection",
+    "confidence": 0.9,
+    "incident_type": "A05:2025 - Injection",
+    "rationale": "Database error after a quote was typed into the login form",
+    "labels": ["injection"],
+}
+
+
+class LegacyCache:
+    """The old ClassificationCache: dict + min() scan over insert times."""
+
+    def __init__(self, max_size):
+        self.cache = {}
+        self.max_size = max_size
+
+    def _get_hash(self, text):
+        return hashlib.md5(text.lower().strip().encode("utf-8")).hexdigest()
+
+    def get(self, text):
+        entry = self.cache.get(self._get_hash(text))
+        return entry[0] if entry else None
+
+    def set(self, text, result):
+        cache_key = self._get_hash(text)
+        if len(self.cache) >= self.max_size:
+            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][1])
+            del self.cache[oldest_key]
+        self.cache[cache_key] = (result, datetime.now())
+
+
+def insert_us(cache, size, inserts):
+    """Microseconds per insert into a cache already holding `size` entries."""
+    for i in range(size):
+        cache.set(f"warm {i}", RESULT)
+    start = time.perf_counter()
+    for i in range(inserts):
+        cache.set(f"new {i}", RESULT)
+    return (time.perf_counter() - start) / inserts * 1e6
+
+
+def hit_rate(cache, stream):
+    hits = 0
+    for text in stream:
+        if cache.get(text) is not None:
+            hits += 1
+        else:
+            cache.set(text, RESULT)
+    return hits / len(stream)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy scan eviction vs O(1) LRU cache")
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="Full-cache sizes to insert into")
+    parser.add_argument("--inserts", type=int, default=2000, help="Timed inserts per size")
+    parser.add_argument("--fill", type=int, default=1_000_000, help="Entries for the fill test (0 = skip)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("CLASSIFICATION CACHE BENCHMARK")
+    print("=" * 70)
+
+    print(f"\nInsert into a full cache (us/insert, {args.inserts} inserts)")
+    print(f"{'size':>10s} {'legacy scan':>14s} {'LRU':>10s} {'speedup':>9s}")
+    for size in [int(x) for x in args.sizes.split(",")]:
+        inserts = max(20, min(args.inserts, 2_000_000 // size))  # legacy is O(n) per insert
+        legacy = insert_us(LegacyCache(size), size, inserts)
+        lru = insert_us(ClassificationCache(max_size=size), size, args.inserts)
+        print(f"{size:10d} {legacy:14.1f} {lru:10.2f} {legacy / lru:8.0f}x")
+
+    # Skewed stream - a few alerts repeat a lot, most are one-offs
+    rng = random.Random(0)
+    stream = [f"incident {int(rng.paretovariate(1.0))}" for _ in range(50_000)]
+    print(f"\nHit rate, {len(stream)} lookups on a Zipf-like stream")
+    print(f"{'size':>10s} {'FIFO (legacy)':>14s} {'LRU':>10s}")
+    for size in (50, 200, 1000):
+        print(f"{size:10d} {hit_rate(LegacyCache(size), stream):13.1%} "
+              f"{hit_rate(ClassificationCache(max_size=size), stream):9.1%}")
+
+    cache = ClassificationCache(max_bytes=None)
+    tracemalloc.start()
+    for i in range(20_000):
+        cache.set(f"incident {i}", dict(RESULT))
+    real, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"\nMemory per entry: {real / 20_000:.0f} B real (tracemalloc), "
+          f"{cache.nbytes / 20_000:.0f} B estimated")
+
+    if args.fill:
+        cache = ClassificationCache()
+        start = time.perf_counter()
+        for i in range(args.fill):
+            cache.set(f"incident {i}", RESULT)
+        wall = time.perf_counter() - start
+        stats = cache.stats()
+        print(f"\nFill {args.fill:,} entries (64 MB bound): {wall:.1f}s, {wall / args.fill * 1e6:.2f} us/insert, "
+              f"{stats['entries']:,} kept, {stats['evictions']:,} evicted, {stats['bytes'] / 2**20:.1f} MB")
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Detector Registry Benchmark
+===========================
+
+Compares building a detector per call (what run_phase1_classification used to
+do) against the process-wide shared detector from get_detector():
+
+- First-use cost (load + compile the pattern pack) vs every later call
+- Per-call setup time and memory allocated
+- End-to-end fast-path run_phase1_classification latency
+- Threads racing on first use all get the same object
+
+Usage:
+    python scripts/benchmark_detector_registry.py
+    python scripts/benchmark_detector_registry.py --calls 20000 --threads 16
+"""
+
+import argparse
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src import explicit_detector, pattern_pack
+from src.explicit_detector import ExplicitDetector, get_detector
+from src.pattern_matcher import CompiledPatternSet
+from src.phase1_core import run_phase1_classification
+
+
+FAST_PATH_TEXT = "Attacker used SQL injection on the login form to dump the users table"
+
+
+def reset_registry():
+    """Forget the shared detectors and loaded packs, as in a fresh process."""
+    explicit_detector._detectors.clear()
+    pattern_pack._sources.clear()
+
+
+def make_legacy_construct():
+    """What ExplicitDetector() used to cost: rebuild the table, look up its compiled set."""
+    table = list(get_detector().patterns)
+    compiled = {tuple(table): CompiledPatternSet(table)}
+
+    def legacy_construct():
+        patterns = list(table)
+        return compiled[tuple(patterns)]
+    return legacy_construct
+
+
+def per_call_us(fn: Callable[[], object], calls: int) -> float:
+    """Average microseconds per call."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) * 1_000_000 / calls
+
+
+def allocated_bytes(fn: Callable[[], object], calls: int = 100) -> float:
+    """Average peak memory allocated during one call."""
+    tracemalloc.start()
+    total = 0
+    for _ in range(calls):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - before
+    tracemalloc.stop()
+    return total / calls
+
+
+def race_first_use(threads: int) -> bool:
+    """Reset the registry, hit get_detector() from many threads at once."""
+    reset_registry()
+    barrier = threading.Barrier(threads)
+    seen = []
+
+    def worker():
+        barrier.wait()
+        seen.append(get_detector())
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return len({id(d) for d in seen}) == 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared detector registry")
+    parser.add_argument("--calls", type=int, default=5000, help="Calls per measurement")
+    parser.add_argument("--threads", type=int, default=8, help="Threads racing on first use")
+    args = parser.parse_args()
+
+    # First use loads and compiles the pack, everything after is a dict lookup
+    reset_registry()
+    start = time.perf_counter()
+    pack_size = len(get_detector().patterns)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    legacy_construct = make_legacy_construct()
+    legacy_us = per_call_us(legacy_construct, args.calls)
+    construct_us = per_call_us(ExplicitDetector, args.calls)
+    shared_us = per_call_us(get_detector, args.calls)
+
+    legacy_alloc = allocated_bytes(legacy_construct)
+    construct_alloc = allocated_bytes(ExplicitDetector)
+    shared_alloc = allocated_bytes(get_detector)
+
+    phase1_us = per_call_us(lambda: run_phase1_classification(FAST_PATH_TEXT), args.calls // 5)
+
+    same_object = race_first_use(args.threads)
+
+    print("=" * 68)
+    print("DETECTOR REGISTRY BENCHMARK")
+    print("=" * 68)
+    print(f"First get_detector() (loads {pack_size}-pattern pack): {first_ms:8.1f} ms")
+    print("-" * 68)
+    print(f"{'per-call setup':38s} {'us/call':>10s} {'bytes/call':>12s}")
+    print(f"{'old ExplicitDetector() (rebuild table)':38s} {legacy_us:10.2f} {legacy_alloc:12,.0f}")
+    print(f"{'ExplicitDetector() (shared table)':38s} {construct_us:10.2f} {construct_alloc:12,.0f}")
+    print(f"{'get_detector()':38s} {shared_us:10.2f} {shared_alloc:12,.0f}")
+    print("-" * 68)
+    print(f"run_phase1_classification fast path: {phase1_us:8.1f} us/call")
+    print(f"{args.threads} threads racing on first use got one detector: {same_object}")
+    print("=" * 68)
+
+    return 0 if same_object else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Explicit Detector Micro-Benchmark
+=================================
+
+Compares the old ExplicitDetector loop (re.search over every raw pattern
+string with IGNORECASE) against the compiled matching engine in
+src/pattern_matcher.py, using the tests/accuracy corpora.
+
+Also checks that both return exactly the same (label, confidence) for every case.
+
+Usage:
+    python scripts/benchmark_explicit_detector.py
+    python scripts/benchmark_explicit_detector.py --rounds 200
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from src.explicit_detector import ExplicitDetector
+from test_cases import TEST_CASES
+from accuracy.test_multi_incident_classification_merge import MULTI_INCIDENT_TEST_CASES
+
+
+def legacy_detect(patterns, text: str) -> Tuple[Optional[str], float]:
+    """The original detect() loop, kept here as the baseline."""
+    text_lower = text.lower()
+    matches = []
+    for pattern, label, confidence in patterns:
+        if re.search(pattern, text_lower, re.IGNORECASE):
+            matches.append((label, confidence))
+    if not matches:
+        return None, 0.0
+    best_match = max(matches, key=lambda x: x[1])
+    return best_match[0], best_match[1]
+
+
+def load_corpus() -> List[str]:
+    """All user inputs from the single- and multi-incident accuracy corpora."""
+    texts = [case["user_input"] for case in TEST_CASES]
+    texts += [case["user_input"] for case in MULTI_INCIDENT_TEST_CASES]
+    return texts
+
+
+def time_per_call(fn: Callable[[str], object], texts: List[str], rounds: int) -> float:
+    """Average microseconds per call over the corpus."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1_000_000 / (rounds * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ExplicitDetector matching")
+    parser.add_argument("--rounds", type=int, default=50, help="Passes over the corpus")
+    args = parser.parse_args()
+
+    texts = load_corpus()
+    detector = ExplicitDetector()
+
+    # Correctness first - the engine must not change any answer
+    mismatches = [
+        t for t in texts
+        if legacy_detect(detector.patterns, t) != detector.detect(t)
+    ]
+
+    # Warm up re's internal cache so the legacy path isn't penalized for compiling
+    for text in texts:
+        legacy_detect(detector.patterns, text)
+
+    legacy_us = time_per_call(lambda t: legacy_detect(detector.patterns, t), texts, args.rounds)
+    compiled_us = time_per_call(detector.detect, texts, args.rounds)
+
+    print("=" * 60)
+    print("EXPLICIT DETECTOR MICRO-BENCHMARK")
+    print("=" * 60)
+    print(f"Corpus:            {len(texts)} cases x {args.rounds} rounds")
+    print(f"Patterns:          {len(detector.patterns)}")
+    print(f"Legacy loop:       {legacy_us:8.1f} us/call")
+    print(f"Compiled engine:   {compiled_us:8.1f} us/call")
+    print(f"Speedup:           {legacy_us / compiled_us:8.1f}x")
+    print(f"Result mismatches: {len(mismatches)}")
+    for text in mismatches[:5]:
+        print(f"  - {text[:70]}")
+    print("=" * 60)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
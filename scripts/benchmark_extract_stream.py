@@ -0,0 +1,117 @@
+"""
+Streaming IOC Extraction Benchmark
+==================================
+
+Writes a large synthetic log file (same generator as benchmark_extractor.py)
+and compares reading it whole + extract() against extract_stream():
+
+- Throughput (MB/s)
+- Peak Python memory (tracemalloc) - extract() holds the whole file as a str,
+  extract_stream() should stay around one chunk plus the kept entities
+- Time to the first CVE - when the UI / NVD lookups could start
+- Same entities either way
+
+Usage:
+    python scripts/benchmark_extract_stream.py
+    python scripts/benchmark_extract_stream.py --mb 200 --chunk-kb 4096
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "scripts"))
+
+from src.extractor import SecurityExtractor
+from benchmark_extractor import build_log
+
+
+def write_log(path: Path, mb: int) -> int:
+    """Repeat a 20k-line synthetic block until the file is ~mb MB."""
+    block = build_log(20_000) + "\n"
+    target = mb * 1_000_000
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        i = 0
+        while written < target:
+            # vary the block a little so later chunks still have new IOCs
+            chunk = block.replace("CVE-2021-", f"CVE-{2000 + i % 25}-")
+            f.write(chunk)
+            written += len(chunk)
+            i += 1
+    return os.path.getsize(path)
+
+
+def run_whole(path: Path):
+    extractor = SecurityExtractor()
+    start = time.perf_counter()
+    text = path.read_text(encoding="utf-8")
+    ents = extractor.extract(text)
+    return ents, time.perf_counter() - start, None
+
+
+def run_stream(path: Path, chunk_size: int, max_per_field):
+    extractor = SecurityExtractor()
+    start = time.perf_counter()
+    first_cve = None
+    final = None
+    for update in extractor.extract_stream(path, chunk_size=chunk_size, max_per_field=max_per_field):
+        if first_cve is None and update.new.cves:
+            first_cve = time.perf_counter() - start
+        final = update
+    return final.entities, time.perf_counter() - start, first_cve
+
+
+def peak_mb(fn) -> float:
+    """Peak traced allocation (MB) while fn runs."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1_000_000
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming IOC extraction")
+    parser.add_argument("--mb", type=int, default=50, help="Size of the generated log file")
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="extract_stream chunk size")
+    args = parser.parse_args()
+    chunk_size = args.chunk_kb * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "big.log"
+        size = write_log(path, args.mb)
+        mb = size / 1_000_000
+
+        print("=" * 78)
+        print(f"STREAMING IOC EXTRACTION BENCHMARK - {mb:.0f} MB log, {args.chunk_kb} KB chunks")
+        print("=" * 78)
+
+        whole, whole_s, _ = run_whole(path)
+        stream, stream_s, first_cve = run_stream(path, chunk_size, None)
+        whole_peak = peak_mb(lambda: run_whole(path))
+        stream_peak = peak_mb(lambda: run_stream(path, chunk_size, None))
+
+        print(f"{'':22s} {'time':>10s} {'MB/s':>8s} {'peak mem':>10s} {'first CVE':>10s}")
+        print(f"{'read + extract()':22s} {whole_s:9.2f}s {mb / whole_s:8.1f} {whole_peak:8.1f}MB {whole_s:9.2f}s")
+        print(f"{'extract_stream()':22s} {stream_s:9.2f}s {mb / stream_s:8.1f} {stream_peak:8.1f}MB {first_cve:9.3f}s")
+        print("-" * 78)
+        counts = ", ".join(f"{k}={len(v)}" for k, v in stream.__dict__().items())
+        print(f"found: {counts}")
+        same = stream == whole
+        print(f"Same entities as extract(): {'yes' if same else 'NO'}")
+        print("=" * 78)
+
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
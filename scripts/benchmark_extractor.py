@@ -0,0 +1,143 @@
+"""
+IOC Extractor Benchmark
+=======================
+
+Compares the old SecurityExtractor (one re.findall pass per entity type, no
+domains/filenames) against the single-scan extractor in src/extractor.py on:
+
+- Pasted logs: synthetic web/EDR log lines, dense with IPs, URLs, hashes, CVEs
+- Descriptions: the tests/accuracy incident descriptions (mostly prose)
+
+Also checks the new extractor finds everything the old one did (the old one
+returned unordered sets, CVEs as typed).
+
+Usage:
+    python scripts/benchmark_extractor.py
+    python scripts/benchmark_extractor.py --lines 100000 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from src.extractor import SecurityExtractor
+from test_cases import TEST_CASES
+from accuracy.test_multi_incident_classification_merge import MULTI_INCIDENT_TEST_CASES
+
+
+FIELDS = ("ips", "urls", "domains", "hashes", "cves", "emails", "filenames")
+
+
+def legacy_extract(text: str) -> Dict[str, List[str]]:
+    """The original extract(): five findall passes, list(set(...)) each."""
+    ips = [
+        ip for ip in re.findall(SecurityExtractor.IP_PATTERN, text)
+        if all(0 <= int(part) <= 255 for part in ip.split('.'))
+    ]
+    md5 = re.findall(SecurityExtractor.HASH_MD5_PATTERN, text)
+    sha256 = re.findall(SecurityExtractor.HASH_SHA256_PATTERN, text)
+    return {
+        "ips": list(set(ips)),
+        "urls": list(set(re.findall(SecurityExtractor.URL_PATTERN, text))),
+        "domains": [],
+        "hashes": list(set(md5 + sha256)),
+        "cves": list(set(re.findall(SecurityExtractor.CVE_PATTERN, text, re.IGNORECASE))),
+        "emails": list(set(re.findall(SecurityExtractor.EMAIL_PATTERN, text))),
+        "filenames": [],
+    }
+
+
+def build_log(lines: int, seed: int = 7) -> str:
+    """Synthetic pasted log excerpt."""
+    rng = random.Random(seed)
+
+    def hexs(n):
+        return "".join(rng.choice("0123456789abcdef") for _ in range(n))
+
+    def ip():
+        return ".".join(str(rng.randint(1, 254)) for _ in range(4))
+
+    events = [
+        lambda: f"GET http://{ip()}/dl/{hexs(32)} 200 ua=curl/7.68",
+        lambda: f"POST https://login-{rng.randint(1, 50)}.evil-domain.com/auth?u=bob@corp.io 302",
+        lambda: "user admin logged in from console session",
+        lambda: f"sha256={hexs(64)} file=C:\\Users\\Public\\payload{rng.randint(1, 9)}.exe",
+        lambda: f"IDS alert CVE-2021-{rng.randint(1000, 99999)} exploit attempt blocked",
+        lambda: f"dns query c2.bad-actor{rng.randint(1, 20)}.ru from {ip()}",
+        lambda: "notify soc@example.org, see runbook.pdf",
+        lambda: f"sha1 {hexs(40)} md5 {hexs(32)} quarantined",
+        lambda: "healthcheck ok latency=12ms",
+    ]
+    out = []
+    for i in range(lines):
+        ts = f"2024-05-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:{(i * 7) % 60:02d}Z"
+        out.append(f"{ts} {rng.choice(['INFO', 'WARN', 'ERROR'])} src={ip()} {rng.choice(events)()}")
+    return "\n".join(out)
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    """Best wall time (s) over `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def compare(name: str, text: str, repeat: int) -> List[str]:
+    """Time both extractors on one text, return any IOCs the new one missed."""
+    extractor = SecurityExtractor()
+    old = legacy_extract(text)
+    new = extractor.extract(text)
+
+    missed = []
+    for f in ("ips", "urls", "hashes", "emails"):
+        missed += [v for v in set(old[f]) - set(getattr(new, f))]
+    missed += [v for v in {c.upper() for c in old["cves"]} - set(new.cves)]
+
+    old_s = best_time(lambda: legacy_extract(text), repeat)
+    new_s = best_time(lambda: extractor.extract(text), repeat)
+    mb = len(text) / 1_000_000
+    print(f"{name:14s} {mb:6.2f} MB   old {old_s * 1000:8.1f} ms   new {new_s * 1000:8.1f} ms"
+          f"   {old_s / new_s:5.2f}x")
+    counts = ", ".join(f"{f}={len(getattr(new, f))}" for f in FIELDS)
+    print(f"{'':14s} found: {counts}")
+    return missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IOC extraction")
+    parser.add_argument("--lines", type=int, default=50_000, help="Log lines in the pasted-log corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs (best is reported)")
+    args = parser.parse_args()
+
+    descriptions = [case["user_input"] for case in TEST_CASES]
+    descriptions += [case["user_input"] for case in MULTI_INCIDENT_TEST_CASES]
+    prose = " ".join(descriptions * 100)
+
+    print("=" * 84)
+    print("IOC EXTRACTOR BENCHMARK - five findall passes vs single scan")
+    print("=" * 84)
+    missed = compare("pasted logs", build_log(args.lines), args.repeat)
+    missed += compare("descriptions", prose, args.repeat)
+    print("-" * 84)
+    print(f"IOCs found by the old extractor but not the new one: {len(missed)}")
+    for value in missed[:5]:
+        print(f"  - {value}")
+    print("=" * 84)
+
+    return 1 if missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Offline Load Test (fake provider)
+=================================
+
+Runs the 50-case accuracy corpus (tests/test_cases.py), repeated --rounds
+times, through LLMAdapter.aclassify_incident() against the built-in fake
+provider (src/fake_llm.py) at increasing concurrency. No API key, no network
+- but realistic timings: lognormal call latency, random 5xx errors and a
+provider rate limit that answers 429 with retry-after, so the adapter's
+limiter, retries and backoff all do their real work.
+
+Reports per concurrency level: wall time, throughput, per-call p50 / p95 /
+p99, how many 429s / 500s the fake handed out and how many calls still
+failed after retries. Seeded, so reruns see the same latencies and errors.
+
+Usage:
+    python scripts/benchmark_fake_provider.py
+    python scripts/benchmark_fake_provider.py --latency-ms 1200 --rps 5 --error-rate 0.05 --levels 1,8,32
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+import src.llm_adapter as llm_adapter
+from src.fake_llm import FakeLLMConfig, configure_fake_llm, fake_llm_stats
+from src.llm_adapter import LLMAdapter
+from test_cases import TEST_CASES
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_level(adapter, descriptions, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(description):
+        nonlocal failures
+        async with limit:
+            started = time.perf_counter()
+            try:
+                result = await adapter.aclassify_incident(description)
+            except Exception:
+                failures += 1
+                return None
+            latencies.append(time.perf_counter() - started)
+            return result
+
+    try:
+        results = await asyncio.gather(*(one(d) for d in descriptions))
+    finally:
+        await llm_adapter.aclose_provider_clients()
+    return results, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the classification path against the offline fake provider")
+    parser.add_argument("--levels", default="1,4,8,16", help="Concurrency limits to try")
+    parser.add_argument("--rounds", type=int, default=2, help="Passes over the 50-case corpus per level")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Median fake call latency")
+    parser.add_argument("--sigma", type=float, default=0.35, help="Lognormal latency spread")
+    parser.add_argument("--rps", type=float, default=8, help="Fake provider rate limit (requests/s)")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Fraction of calls failing with a 500")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed")
+    args = parser.parse_args()
+
+    cases = TEST_CASES * args.rounds
+    descriptions = [case["user_input"] for case in cases]
+    levels = [int(x) for x in args.levels.split(",")]
+    adapter = LLMAdapter(model="fake")
+    adapter.coalesce = False  # repeated rounds are the load - every one should reach the fake
+
+    print("=" * 94)
+    print(f"OFFLINE LOAD TEST - {len(descriptions)} classifications, fake provider "
+          f"{args.latency_ms:.0f} ms median, {args.rps:g} req/s limit, {args.error_rate:.0%} 5xx")
+    print("=" * 94)
+    print(f"{'concurrency':>11s} {'wall (s)':>9s} {'calls/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} "
+          f"{'429s':>6s} {'500s':>6s} {'failed':>7s} {'agree':>7s}")
+
+    for level in levels:
+        configure_fake_llm(FakeLLMConfig(latency_ms=args.latency_ms, latency_sigma=args.sigma, rate_limit=args.rps,
+                                         error_rate=args.error_rate, seed=args.seed))
+        llm_adapter.clear_provider_clients()
+        start = time.perf_counter()
+        results, latencies, failures = asyncio.run(run_level(adapter, descriptions, level))
+        wall = time.perf_counter() - start
+        stats = fake_llm_stats()
+        # synthesized answers are the keyword classifier's - agreement with the
+        # expected labels is a sanity check on the replies, not model accuracy
+        agree = sum(r is not None and r.get("category") == case["expected"] for r, case in zip(results, cases))
+        ms = [x * 1000 for x in latencies] or [0.0]
+        print(f"{level:11d} {wall:9.1f} {len(descriptions) / wall:8.2f} {statistics.median(ms):8.0f} "
+              f"{percentile(ms, 0.95):8.0f} {percentile(ms, 0.99):8.0f} {stats['throttled']:6d} "
+              f"{stats['errors']:6d} {failures:7d} {agree / len(cases):6.0%}")
+
+    print("-" * 94)
+    print("Throughput levels off at the fake's rate limit - past it, extra concurrency only adds 429s and latency")
+    print("=" * 94)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
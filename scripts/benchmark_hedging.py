@@ -0,0 +1,156 @@
+"""
+Hedged Requests Benchmark
+=========================
+
+Compares classify_incident() against one provider in a brownout with the
+same calls hedged to a second provider (LLMAdapter.enable_hedging): a call
+the primary hasn't answered by its observed p95 goes to the secondary too
+and the first valid answer wins.
+
+Runs against a local OpenAI-compatible endpoint serving two models - the
+primary, where a fraction of requests stall, and the secondary with normal
+latency - so it needs no API keys (hedging to another provider works the
+same way, the request is provider-agnostic). The primary's latency
+histogram is warmed up first so the hedge delay is the real observed p95.
+
+Usage:
+    python scripts/benchmark_hedging.py
+    python scripts/benchmark_hedging.py --requests 200 --stall-rate 0.02
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import src.llm_adapter as llm_adapter
+from src.hedging import clear_latency_histograms, hedge_delay
+from src.llm_adapter import LLMAdapter
+
+PRIMARY_MODEL = "gpt-4o-mini"
+SECONDARY_MODEL = "gpt-4.1-mini"
+RESULT = {
+    "incident_type": "A05:2025 - Injection",
+    "fine_label": "sql_injection",
+    "labels": ["sql_injection"],
+    "confidence": 0.85,
+    "rationale": "Database errors after special characters in the login form",
+    "owasp_version": "2025",
+}
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible endpoint - the primary model browns out, the secondary doesn't."""
+    protocol_version = "HTTP/1.1"
+    latency = {PRIMARY_MODEL: 0.4, SECONDARY_MODEL: 0.6}
+    stall = 0.0
+    stall_rate = 0.0
+    rng = random.Random(7)
+    rng_lock = threading.Lock()
+
+    def handle(self):
+        try:
+            super().handle()
+        except (ConnectionResetError, BrokenPipeError):
+            pass  # hedged call abandoned by the client
+
+    def do_POST(self):
+        model = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["model"]
+        with self.rng_lock:
+            stalled = model == PRIMARY_MODEL and self.rng.random() < self.stall_rate
+            jitter = 0.5 + self.rng.random()
+        time.sleep(self.stall if stalled else self.latency[model] * jitter)
+        payload = json.dumps({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(RESULT)}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(adapter: LLMAdapter, requests: int, workers: int):
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        adapter.classify_incident(f"attacker used ' OR 1=1 -- in the login form (report {i})")
+        return time.perf_counter() - start
+
+    FakeProviderHandler.rng = random.Random(7)  # same stalls for both modes
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-provider vs hedged classification in a brownout")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per mode")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--stall-s", type=float, default=8, help="How long a stalled primary request takes")
+    parser.add_argument("--stall-rate", type=float, default=0.04, help="Fraction of primary requests that stall (above ~5%% the p95 itself is a stall)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProviderHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    llm_adapter.clear_provider_clients()
+    clear_latency_histograms()
+    adapter = LLMAdapter(api_key="sk-bench", model=PRIMARY_MODEL)
+    adapter.rate_limiter = None
+    adapter.retry_policy = llm_adapter.RetryPolicy(max_attempts=1)
+
+    print("=" * 74)
+    print(f"HEDGING BENCHMARK - {args.requests} requests, {args.workers} sessions, "
+          f"{args.stall_rate:.0%} of primary calls stall for {args.stall_s:.0f} s")
+    print("=" * 74)
+    print(f"{'':22s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'hedged':>8s} {'2nd won':>8s}")
+    p99 = {}
+    for name, hedged in (("primary only", False), ("hedged", True)):
+        # Fresh histogram warmed up on a healthy primary, then the brownout
+        # (the stalls would otherwise leak into the next mode's p95)
+        adapter.latency.reset()
+        FakeProviderHandler.stall_rate = 0.0
+        run(adapter, 40, args.workers)
+        FakeProviderHandler.stall = args.stall_s
+        FakeProviderHandler.stall_rate = args.stall_rate
+        if hedged:
+            adapter.enable_hedging(SECONDARY_MODEL, api_key="sk-bench")
+            adapter.hedge.rate_limiter = None
+            adapter.hedge.retry_policy = adapter.retry_policy
+        adapter.hedge_stats = {"hedged": 0, "secondary_wins": 0}
+        latencies = run(adapter, args.requests, args.workers)
+        p99[name] = percentile(latencies, 0.99)
+        print(f"{name:22s} {statistics.median(latencies) * 1000:7.0f}ms {percentile(latencies, 0.95) * 1000:7.0f}ms "
+              f"{p99[name] * 1000:7.0f}ms {adapter.hedge_stats['hedged']:8d} {adapter.hedge_stats['secondary_wins']:8d}")
+    print("-" * 74)
+    print(f"Hedge delay (primary p95 after the run): {hedge_delay(adapter.latency) * 1000:.0f} ms")
+    print(f"p99 {p99['primary only'] / p99['hedged']:.1f}x lower with hedging")
+    print("=" * 74)
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+JSON Recovery Benchmark
+=======================
+
+Compares the old fallback for model output that isn't bare JSON (a
+nested-brace regex, good for two levels of nesting) against
+extract_json_object() in src/llm_adapter.py.
+
+Recovery rate is measured on the kinds of wrapped output models actually
+return, with time per call for both (this only runs when a response isn't
+bare JSON, so a few microseconds either way don't matter - a miss costs the
+user a whole clarification turn).
+
+Usage:
+    python scripts/benchmark_json_recovery.py
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.llm_adapter import extract_json_object
+
+RESULT = {
+    "incident_type": "A05:2025 - Injection",
+    "fine_label": "xss",
+    "labels": ["xss"],
+    "confidence": 0.85,
+    "rationale": "Script tags rendered in comments",
+    "owasp_version": "2025",
+}
+BODY = json.dumps(RESULT)
+
+CASES = {
+    "markdown fence": f"```json\n{BODY}\n```",
+    "prose around it": f"Here is my classification:\n{BODY}\nLet me know if you need more.",
+    "brace in a string": json.dumps({**RESULT, "rationale": "payload was <script>{alert(1)}</script>"}),
+    "unbalanced brace in string": json.dumps({**RESULT, "rationale": "saw '}' in the URL"}) + " done",
+    "three levels deep": json.dumps({**RESULT, "evidence": {"request": {"params": {"q": "1=1"}}}}),
+    "prose with braces first": "Using the {incident} template: " + BODY,
+}
+
+
+def old_regex(content: str):
+    match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+
+
+def timed(fn, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    print("=" * 74)
+    print("JSON RECOVERY BENCHMARK")
+    print("=" * 74)
+    print(f"{'case':30s} {'old regex':>12s} {'extractor':>12s} {'regex us':>9s} {'scan us':>9s}")
+    recovered = {"old": 0, "new": 0}
+    for name, text in CASES.items():
+        old, new = old_regex(text), extract_json_object(text)
+        old_ok = old is not None and old.get("fine_label") == "xss"
+        new_ok = new is not None and new.get("fine_label") == "xss"
+        recovered["old"] += old_ok
+        recovered["new"] += new_ok
+        print(f"{name:30s} {'ok' if old_ok else 'FAILED':>12s} {'ok' if new_ok else 'FAILED':>12s}"
+              f" {timed(old_regex, text, 2000) * 1e6:9.1f} {timed(extract_json_object, text, 2000) * 1e6:9.1f}")
+
+    print("-" * 74)
+    print(f"Recovered: old regex {recovered['old']}/{len(CASES)}, extractor {recovered['new']}/{len(CASES)}")
+    print("=" * 74)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
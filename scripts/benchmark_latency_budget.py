@@ -0,0 +1,150 @@
+"""
+Latency Budget Benchmark
+========================
+
+classify_incident() used to wait as long as the provider took - a stalled
+request held the chat until the SDK timeout (60 s call budget). With
+budget= the call is abandoned at the budget and the keyword fallback
+(ExplicitDetector / BaselineKeywordClassifier) answers instead, marked
+degraded.
+
+Runs against a local OpenAI-compatible server in a "brownout": most
+requests answer after a normal latency, a fraction stall for much longer.
+Reports p50 / p99 / max end-to-end latency and how many answers were
+degraded, with and without a budget.
+
+Usage:
+    python scripts/benchmark_latency_budget.py
+    python scripts/benchmark_latency_budget.py --requests 100 --stall-rate 0.05 --budget 3
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import src.llm_adapter as llm_adapter
+from src.llm_adapter import LLMAdapter
+
+RESPONSE = json.dumps({
+    "incident_type": "A05:2025 - Injection",
+    "fine_label": "sql_injection",
+    "labels": ["sql_injection"],
+    "confidence": 0.85,
+    "rationale": "Database errors after special characters in the login form",
+    "owasp_version": "2025",
+})
+DESCRIPTIONS = [
+    "attacker used ' OR 1=1 -- in the login form and dumped the users table",
+    "users can open other customers' invoices by changing the id in the URL",
+    "passwords are stored in plain text in the database",
+    "weird syntax showed up on the login page, not sure what it is",
+]
+
+
+class BrownoutHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.4
+    stall = 10.0
+    stall_rate = 0.1
+    rng = random.Random(7)
+    rng_lock = threading.Lock()
+
+    def handle(self):
+        try:
+            super().handle()
+        except (ConnectionResetError, BrokenPipeError):
+            pass  # client gave up on a stalled request
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.rng_lock:
+            stalled = self.rng.random() < self.stall_rate
+        time.sleep(self.stall if stalled else self.latency * (0.5 + self.rng.random()))
+        payload = json.dumps({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": RESPONSE}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(adapter: LLMAdapter, requests: int, budget, workers: int):
+    def one(i: int):
+        start = time.perf_counter()
+        result = adapter.classify_incident(DESCRIPTIONS[i % len(DESCRIPTIONS)], budget=budget)
+        return time.perf_counter() - start, bool(result.get("degraded"))
+
+    BrownoutHandler.rng = random.Random(7)  # same stalls for both modes
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark classify_incident latency with and without a budget")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per mode")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--latency-ms", type=float, default=400, help="Normal fake model latency")
+    parser.add_argument("--stall-s", type=float, default=10, help="How long a stalled request takes")
+    parser.add_argument("--stall-rate", type=float, default=0.1, help="Fraction of requests that stall")
+    parser.add_argument("--budget", type=float, default=2.0, help="Latency budget in seconds")
+    args = parser.parse_args()
+
+    BrownoutHandler.latency = args.latency_ms / 1000
+    BrownoutHandler.stall = args.stall_s
+    BrownoutHandler.stall_rate = args.stall_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BrownoutHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    llm_adapter.clear_provider_clients()
+    adapter = LLMAdapter(api_key="sk-bench", model="gpt-4o-mini")
+    adapter.rate_limiter = None
+    adapter.retry_policy = llm_adapter.RetryPolicy(max_attempts=1)  # a stall is a stall, not a retryable error
+
+    print("=" * 74)
+    print(f"LATENCY BUDGET BENCHMARK - {args.requests} requests, {args.workers} sessions, "
+          f"{args.stall_rate:.0%} stall for {args.stall_s:.0f} s")
+    print("=" * 74)
+    print(f"{'':22s} {'p50':>9s} {'p99':>9s} {'max':>9s} {'degraded':>10s}")
+    p99 = {}
+    for name, budget in (("no budget", None), (f"budget {args.budget:.1f} s", args.budget)):
+        rows = run(adapter, args.requests, budget, args.workers)
+        latencies = [r[0] for r in rows]
+        degraded = sum(r[1] for r in rows)
+        p99[name] = percentile(latencies, 0.99)
+        print(f"{name:22s} {statistics.median(latencies) * 1000:7.0f}ms {p99[name] * 1000:7.0f}ms "
+              f"{max(latencies) * 1000:7.0f}ms {degraded:6d}/{len(rows)}")
+    print("-" * 74)
+    base, budgeted = p99.values()
+    print(f"p99 {base / budgeted:.1f}x lower with the budget (ceiling {args.budget * 1000:.0f} ms)")
+    print("=" * 74)
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Shared LLM Client Benchmark
+===========================
+
+Compares building an LLMAdapter with a fresh SDK client per call (the old
+behaviour of run_phase1_classification / app.py) against the shared client
+registry in src/llm_adapter.py.
+
+Runs against a local OpenAI-compatible HTTP server so it needs no API key,
+and counts how many TCP connections the server sees - every new connection
+would be a TLS handshake against the real API.
+
+Usage:
+    python scripts/benchmark_llm_clients.py
+    python scripts/benchmark_llm_clients.py --calls 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import src.llm_adapter as llm_adapter
+from src.llm_adapter import LLMAdapter, OpenAI
+
+RESPONSE = json.dumps({
+    "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {
+        "role": "assistant",
+        "content": json.dumps({"fine_label": "injection", "confidence": 0.9, "rationale": "bench"}),
+    }}],
+}).encode()
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    wbufsize = -1  # headers + body in one write, no Nagle / delayed-ACK stall
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        FakeOpenAIHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(calls: int, shared: bool):
+    """Classify `calls` times, building an adapter per call like phase1_core does."""
+    FakeOpenAIHandler.connections = 0
+    llm_adapter.clear_provider_clients()
+    setup_s = 0.0
+    start = time.perf_counter()
+    for _ in range(calls):
+        t = time.perf_counter()
+        adapter = LLMAdapter(api_key="sk-bench", model="gpt-4o-mini")
+        if not shared:
+            adapter.client = OpenAI(api_key="sk-bench")  # what every construction used to do
+        setup_s += time.perf_counter() - t
+        adapter.classify_incident("weird syntax on the login page")
+    return time.perf_counter() - start, setup_s, FakeOpenAIHandler.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared vs per-call LLM SDK clients")
+    parser.add_argument("--calls", type=int, default=200, help="Classifications per run")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    print("=" * 74)
+    print(f"LLM CLIENT BENCHMARK - {args.calls} classifications, local fake OpenAI endpoint")
+    print("=" * 74)
+    print(f"{'':22s} {'total (ms)':>11s} {'ms/call':>9s} {'setup ms/call':>14s} {'connections':>12s}")
+    results = {}
+    for name, shared in (("client per call", False), ("shared registry", True)):
+        total, setup, conns = run(args.calls, shared)
+        results[name] = (total, conns)
+        print(f"{name:22s} {total * 1000:11.1f} {total * 1000 / args.calls:9.2f}"
+              f" {setup * 1000 / args.calls:14.3f} {conns:12d}")
+    print("-" * 74)
+    old, new = results["client per call"], results["shared registry"]
+    print(f"Speedup: {old[0] / new[0]:.2f}x   connections (TLS handshakes on the real API): "
+          f"{old[1]} -> {new[1]}")
+    print("=" * 74)
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
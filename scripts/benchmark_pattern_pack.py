@@ -0,0 +1,139 @@
+"""
+Pattern Pack Benchmark
+======================
+
+How the YAML pattern pack scales and how hot reload behaves:
+
+- Load time (parse + validate + compile) and per-detect latency for packs of
+  increasing size. Bigger packs are the shipped pack plus synthetic variants
+  that each bring their own keyword, like a team adding thousands of patterns
+  for new products/log sources. (Patterns sharing keywords with the text still
+  have to be evaluated, so those do add per-detect cost.)
+- Hot swap: detect() runs in a loop on several threads while the pack file is
+  rewritten; reports when the new version shows up and the slowest detect()
+  seen during the reload (it shouldn't wait for the compile).
+
+Usage:
+    python scripts/benchmark_pattern_pack.py
+    python scripts/benchmark_pattern_pack.py --sizes 219 1000 5000 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import yaml
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from src.explicit_detector import ExplicitDetector
+from src.pattern_pack import DEFAULT_PACK_PATH, PatternPackSource, load_pattern_pack
+from test_cases import TEST_CASES
+from accuracy.test_multi_incident_classification_merge import MULTI_INCIDENT_TEST_CASES
+
+
+def write_pack(path: Path, size: int, version: str) -> None:
+    """Shipped pack padded with synthetic patterns up to `size` entries."""
+    base = load_pattern_pack(DEFAULT_PACK_PATH).entries
+    patterns = [{"pattern": p, "label": l, "confidence": c} for p, l, c in base]
+    i = 0
+    while len(patterns) < size:
+        p, l, c = base[i % len(base)]
+        # Long unique leading keyword so the prefilter keys each synthetic pattern on it
+        patterns.append({"pattern": rf"\bsyntheticproduct{i}component.*{p.replace(chr(92) + 'b', '', 1)}",
+                         "label": l, "confidence": c})
+        i += 1
+    # Write-then-rename, the way packs should be deployed
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"version": version, "patterns": patterns[:size]}, f, sort_keys=False)
+    os.replace(tmp, path)
+
+
+def detect_us(detector: ExplicitDetector, texts: List[str], rounds: int = 5) -> float:
+    """Average microseconds per detect_scores() over the corpus (after one warm-up pass)."""
+    for text in texts:
+        detector.detect_scores(text)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            detector.detect_scores(text)
+    return (time.perf_counter() - start) * 1_000_000 / (rounds * len(texts))
+
+
+def hot_swap(workdir: Path, size: int, texts: List[str], threads: int = 4) -> None:
+    """Rewrite the pack under live traffic and watch the swap."""
+    path = workdir / "hot_swap.yaml"
+    write_pack(path, size, "v1")
+    source = PatternPackSource(path, check_interval=0.05)
+    stop = threading.Event()
+    worst = [0.0]
+
+    def traffic():
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            source.current().matcher.label_scores(texts[i % len(texts)])
+            worst[0] = max(worst[0], time.perf_counter() - start)
+            i += 1
+
+    pool = [threading.Thread(target=traffic) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    time.sleep(0.2)
+    steady_worst, worst[0] = worst[0], 0.0
+
+    write_pack(path, size, "v2")
+    written = time.perf_counter()
+    while source.pack.version != "v2" and time.perf_counter() - written < 30:
+        time.sleep(0.005)
+    swapped_ms = (time.perf_counter() - written) * 1000
+    time.sleep(0.1)
+    stop.set()
+    for t in pool:
+        t.join()
+
+    print(f"Hot swap of {size}-pattern pack under {threads} threads of traffic:")
+    print(f"  new version live after      {swapped_ms:8.1f} ms (reload took {source.pack.load_seconds * 1000:.1f} ms)")
+    print(f"  slowest detect, steady       {steady_worst * 1000:8.2f} ms")
+    print(f"  slowest detect, during swap  {worst[0] * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pattern pack loading and hot reload")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[219, 1000, 2500, 5000],
+                        help="Pack sizes (number of patterns) to try")
+    args = parser.parse_args()
+
+    texts = [case["user_input"] for case in TEST_CASES]
+    texts += [case["user_input"] for case in MULTI_INCIDENT_TEST_CASES]
+
+    print("=" * 68)
+    print("PATTERN PACK BENCHMARK")
+    print("=" * 68)
+    print(f"{'patterns':>9s} {'load ms':>10s} {'detect us':>11s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for size in args.sizes:
+            path = workdir / f"pack_{size}.yaml"
+            write_pack(path, size, f"bench-{size}")
+            start = time.perf_counter()
+            detector = ExplicitDetector(pack_path=path)
+            load_ms = (time.perf_counter() - start) * 1000
+            print(f"{size:9d} {load_ms:10.1f} {detect_us(detector, texts):11.1f}")
+        print("-" * 68)
+        hot_swap(workdir, max(args.sizes), texts)
+    print("=" * 68)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
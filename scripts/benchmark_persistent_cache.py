@@ -0,0 +1,114 @@
+"""
+Persistent Cache Warm-Start Benchmark
+=====================================
+
+The classification cache used to live only in process memory, so every
+restart (Streamlit worker, script run, extra replica) started cold. With
+CLASSIFICATION_CACHE_DB set, get_cache() puts a shared SQLite store behind
+the in-memory LRU.
+
+Each run below is a separate Python process that classifies the 50-case
+corpus (tests/test_cases.py) through get_cache() + LLMAdapter against the
+offline fake provider (src/fake_llm.py):
+
+- memory only: first process, then a "restart"
+- with the store: first process fills it, the restart starts warm
+- two processes sharing one store file, the second started halfway through
+  the first one's run
+
+Reports hit rate, L2 (disk) hits and wall time per process.
+
+Usage:
+    python scripts/benchmark_persistent_cache.py
+    python scripts/benchmark_persistent_cache.py --latency-ms 800
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+
+def worker() -> int:
+    """One process: classify the corpus through the global cache, print stats as JSON."""
+    from src.classification_cache import get_cache
+    from src.llm_adapter import LLMAdapter
+    from test_cases import TEST_CASES
+
+    cache = get_cache()
+    adapter = LLMAdapter(model="fake")
+    start = time.perf_counter()
+    for case in TEST_CASES:
+        if cache.get(case["user_input"]) is None:
+            cache.set(case["user_input"], adapter.classify_incident(case["user_input"]))
+    stats = cache.stats()
+    stats["wall_s"] = time.perf_counter() - start
+    print(json.dumps(stats))
+    return 0
+
+
+def run_workers(count: int, db_path, latency_ms: float, stagger: float = 0.0):
+    env = {**os.environ, "FAKE_LLM_LATENCY_MS": str(latency_ms)}
+    env.pop("CLASSIFICATION_CACHE_DB", None)
+    if db_path:
+        env["CLASSIFICATION_CACHE_DB"] = str(db_path)
+    procs = []
+    for i in range(count):
+        if i:
+            time.sleep(stagger)
+        procs.append(subprocess.Popen([sys.executable, __file__, "--worker"], env=env, stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL, text=True))
+    return [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark warm starts with the persistent classification cache")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Fake provider median latency")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker()
+
+    print("=" * 74)
+    print(f"PERSISTENT CACHE WARM START - 50 cases per process, fake provider {args.latency_ms:.0f} ms")
+    print("=" * 74)
+    print(f"{'process':40s} {'hit rate':>9s} {'L2 hits':>8s} {'wall (s)':>9s}")
+
+    def show(label, stats):
+        print(f"{label:40s} {stats['hit_rate']:8.0%} {stats['l2_hits']:8d} {stats['wall_s']:9.2f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        show("memory only - first run", run_workers(1, None, args.latency_ms)[0])
+        cold = run_workers(1, None, args.latency_ms)[0]
+        show("memory only - after restart", cold)
+
+        db_path = Path(tmp) / "classification_cache.db"
+        show("store - first run", run_workers(1, db_path, args.latency_ms)[0])
+        warm = run_workers(1, db_path, args.latency_ms)[0]
+        show("store - after restart", warm)
+
+        shared_db = Path(tmp) / "shared.db"
+        # second one starts while the first is halfway through the corpus
+        stagger = 25 * args.latency_ms / 1000
+        for i, stats in enumerate(run_workers(2, shared_db, args.latency_ms, stagger), 1):
+            show(f"store - 2 processes sharing, #{i}", stats)
+        show("store - a third process afterwards", run_workers(1, shared_db, args.latency_ms)[0])
+
+    print("-" * 74)
+    print(f"Restart: {cold['wall_s']:.1f} s cold vs {warm['wall_s'] * 1000:.0f} ms with the store "
+          f"({warm['hit_rate']:.0%} warm-start hit rate)")
+    print("=" * 74)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Rate Limiter / Retry Benchmark
+==============================
+
+Throws a burst of classifications at a local fake provider (OpenAI-compatible
+HTTP server) that enforces a request quota and answers 429 + retry-after when
+it's exceeded, and compares:
+
+- no retries       - the old behaviour: every 429 is a failed classification
+- retry only       - backoff + jitter, but no client-side pacing
+- limiter + retry  - adaptive token bucket (src/rate_limiter.py) + retries
+
+Reports successes, failures, 429s the provider had to send, and goodput
+(successful classifications per second).
+
+Usage:
+    python scripts/benchmark_rate_limiter.py
+    python scripts/benchmark_rate_limiter.py --calls 200 --quota 10 --concurrency 40
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import src.llm_adapter as llm_adapter
+from src.llm_adapter import LLMAdapter
+from src.rate_limiter import AdaptiveRateLimiter, RetryPolicy
+
+RESPONSE = json.dumps({
+    "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {
+        "role": "assistant",
+        "content": json.dumps({"fine_label": "injection", "confidence": 0.9, "rationale": "bench"}),
+    }}],
+}).encode()
+
+
+class ThrottlingProvider(BaseHTTPRequestHandler):
+    """Fake provider: token-bucket quota, 429 + retry-after when it's empty."""
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    quota = 5.0
+    latency = 0.2
+    lock = threading.Lock()
+    tokens = 0.0
+    updated = 0.0
+    throttled = 0
+
+    @classmethod
+    def reset(cls, quota: float, latency: float):
+        cls.quota, cls.latency = quota, latency
+        cls.tokens, cls.updated, cls.throttled = quota, time.monotonic(), 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = ThrottlingProvider
+        with cls.lock:
+            now = time.monotonic()
+            cls.tokens = min(cls.quota, cls.tokens + (now - cls.updated) * cls.quota)
+            cls.updated = now
+            allowed = cls.tokens >= 1
+            if allowed:
+                cls.tokens -= 1
+            else:
+                cls.throttled += 1
+                retry_ms = int((1 - cls.tokens) / cls.quota * 1000) + 1
+        if not allowed:
+            body = b'{"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}}'
+            self.send_response(429)
+            self.send_header("retry-after-ms", str(retry_ms))
+            self.send_header("retry-after", str(max(1, retry_ms // 1000)))
+        else:
+            time.sleep(cls.latency)
+            body = RESPONSE
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(name, args, limiter, policy):
+    ThrottlingProvider.reset(args.quota, args.latency_ms / 1000)
+    llm_adapter.clear_provider_clients()
+    adapter = LLMAdapter(api_key="sk-bench", model="gpt-4o-mini")
+    adapter.rate_limiter = limiter
+    adapter.retry_policy = policy
+
+    descriptions = [f"weird syntax on login page #{i}" for i in range(args.calls)]
+    start = time.perf_counter()
+    results = adapter.classify_many(
+        descriptions, concurrency=args.concurrency, return_exceptions=True,
+        deadline=time.monotonic() + args.deadline
+    )
+    wall = time.perf_counter() - start
+    ok = sum(not isinstance(r, Exception) for r in results)
+    print(f"{name:18s} {ok:6d} {args.calls - ok:7d} {ThrottlingProvider.throttled:7d}"
+          f" {wall:8.2f}s {ok / wall:8.2f}/s")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM rate limiting + retries against a throttling fake provider")
+    parser.add_argument("--calls", type=int, default=100, help="Classifications in the burst")
+    parser.add_argument("--concurrency", type=int, default=20, help="Max in-flight calls")
+    parser.add_argument("--quota", type=float, default=5.0, help="Provider quota (requests/s)")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Provider latency per call")
+    parser.add_argument("--deadline", type=float, default=40.0, help="Seconds the whole burst may take")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    print("=" * 66)
+    print(f"RATE LIMITER BENCHMARK - {args.calls} calls, concurrency {args.concurrency}, "
+          f"quota {args.quota:g} req/s")
+    print("=" * 66)
+    print(f"{'':18s} {'ok':>6s} {'failed':>7s} {'429s':>7s} {'wall':>9s} {'goodput':>10s}")
+    run("no retries", args, None, RetryPolicy(max_attempts=1))
+    run("retry only", args, None, RetryPolicy())
+    # starts at twice the quota, like a provider default that's too optimistic
+    ok = run("limiter + retry", args, AdaptiveRateLimiter(rate=args.quota * 2), RetryPolicy())
+    print("=" * 66)
+
+    server.shutdown()
+    return 0 if ok == args.calls else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
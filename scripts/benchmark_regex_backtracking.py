@@ -0,0 +1,119 @@
+"""
+Regex Backtracking Benchmark
+============================
+
+Feeds adversarial long inputs (the kind of thing you get when an analyst pastes
+a log excerpt) through ExplicitDetector with safe mode on and off.
+
+Patterns like r"\benter.*(javascript|js|code).*(comment|form|field).*..." backtrack
+roughly with len(text)^4 when the last token never shows up. Safe mode should stay
+linear. Unsafe mode is only run up to --unsafe-max bytes, it gets slow fast.
+
+Also checks safe mode gives the same answers as the plain regexes on the
+accuracy corpora (repeated so they're long enough to take the safe path), and
+prints the profiler's most expensive patterns.
+
+Usage:
+    python scripts/benchmark_regex_backtracking.py
+    python scripts/benchmark_regex_backtracking.py --max-kb 256 --unsafe-max 2048
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from src.explicit_detector import ExplicitDetector
+from test_cases import TEST_CASES
+from accuracy.test_multi_incident_classification_merge import MULTI_INCIDENT_TEST_CASES
+
+
+# Each one keeps hitting the early tokens of a chained pattern but never finishes it
+ADVERSARIAL_UNITS: Dict[str, str] = {
+    "xss chain": "enter javascript comment execute ",
+    "stored xss chain": "script comment stored ",
+    "access chain": "change user id ",
+    "log paste": "2024-01-01 12:00:01 INFO user admin changed account id via url param ",
+}
+
+
+def build_input(unit: str, size: int) -> str:
+    """Repeat unit up to size characters."""
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def time_once(fn: Callable[[], object]) -> float:
+    """Wall time of one call in milliseconds."""
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark regex backtracking guard")
+    parser.add_argument("--max-kb", type=int, default=64, help="Largest adversarial input (KB)")
+    parser.add_argument("--unsafe-max", type=int, default=1024,
+                        help="Largest input (bytes) to try with safe mode off")
+    parser.add_argument("--top", type=int, default=10, help="Patterns to show in the profile")
+    args = parser.parse_args()
+
+    safe = ExplicitDetector()
+    unsafe = ExplicitDetector(safe_mode=False)
+
+    sizes: List[int] = []
+    size = 512
+    while size <= args.max_kb * 1024:
+        sizes.append(size)
+        size *= 2
+
+    print("=" * 72)
+    print("REGEX BACKTRACKING BENCHMARK (detect_scores, all labels)")
+    print("=" * 72)
+    print(f"{'input':18s} {'bytes':>8s} {'safe ms':>10s} {'unsafe ms':>10s}")
+    for name, unit in ADVERSARIAL_UNITS.items():
+        for size in sizes:
+            text = build_input(unit, size)
+            safe_ms = time_once(lambda: safe.detect_scores(text))
+            if size <= args.unsafe_max:
+                unsafe_ms = f"{time_once(lambda: unsafe.detect_scores(text)):10.1f}"
+            else:
+                unsafe_ms = f"{'skipped':>10s}"
+            print(f"{name:18s} {size:8d} {safe_ms:10.1f} {unsafe_ms}")
+
+    # Correctness - safe mode must not change any answer on realistic text
+    texts = [case["user_input"] for case in TEST_CASES]
+    texts += [case["user_input"] for case in MULTI_INCIDENT_TEST_CASES]
+    long_texts = [" ".join([text] * 8) for text in texts]
+    mismatches = [
+        text for text in long_texts
+        if safe.detect_scores(text) != unsafe.detect_scores(text)
+    ]
+
+    # Where does the time go on a big paste?
+    profiler = safe.enable_profiling()
+    for unit in ADVERSARIAL_UNITS.values():
+        safe.detect_scores(build_input(unit, args.max_kb * 1024))
+    for text in long_texts:
+        safe.detect_scores(text)
+    safe.disable_profiling()
+
+    print("-" * 72)
+    print(f"Safe vs unsafe mismatches on {len(long_texts)} long corpus texts: {len(mismatches)}")
+    for text in mismatches[:5]:
+        print(f"  - {text[:70]}")
+    print("-" * 72)
+    print(f"Top {args.top} patterns by worst single call (safe mode):")
+    print(profiler.format_report(args.top, by="worst"))
+    print("=" * 72)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Near-Duplicate Cache Benchmark
+==============================
+
+The classification cache only hits on the exact normalized text. With a
+similarity threshold, ClassificationCache reuses the result of a
+near-duplicate incident (MinHash LSH + exact Jaccard, src/similarity_cache.py).
+
+Measured on the repo's corpora - the 50 single-label cases (tests/test_cases.py)
+and the 50 multi-incident cases (tests/accuracy/test_multi_incident_classification_merge.py),
+each cached with its expected labels as if the LLM had answered it correctly:
+
+- Paraphrase replay: every case comes back reworded a few ways (greetings,
+  filler words, "please help", case/punctuation, a dropped word). Hit rate =
+  rewordings answered from the cache; a reuse is correct when the reused
+  labels are the case's expected ones.
+- Leave-one-out: each case looked up against a cache holding all the other
+  cases - every hit here is some other incident's answer, and a wrong label
+  is accuracy lost to the cache.
+- Lookup cost with 20k cached incidents.
+
+Usage:
+    python scripts/benchmark_similarity_cache.py
+    python scripts/benchmark_similarity_cache.py --thresholds 0.6,0.7,0.8 --variants 5
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+sys.path.insert(0, str(project_root / "tests" / "accuracy"))
+
+from src.classification_cache import ClassificationCache
+from src.similarity_cache import NearDuplicateIndex
+from test_cases import TEST_CASES
+from test_multi_incident_classification_merge import MULTI_INCIDENT_TEST_CASES
+
+PREFIXES = ["", "Hi, ", "Hello team, ", "Quick question: ", "Urgent: ", "Not sure if this matters but "]
+SUFFIXES = ["", " Please help.", " What should I do?", " Any idea?", " Thanks."]
+FILLER = ["the", "really", "just", "so", "also"]
+
+
+def corpus():
+    cases = [(case["user_input"], (case["expected"],)) for case in TEST_CASES]
+    cases += [(case["user_input"], tuple(sorted(case["expected_labels"]))) for case in MULTI_INCIDENT_TEST_CASES]
+    return cases
+
+
+def reword(text, rng):
+    """A report of the same incident, worded a little differently."""
+    words = text.rstrip(".?!").split()
+    for _ in range(rng.randint(0, 2)):
+        words.insert(rng.randint(0, len(words)), rng.choice(FILLER))
+    if len(words) > 8 and rng.random() < 0.5:
+        del words[rng.randrange(len(words))]
+    body = " ".join(words)
+    body = body.lower() if rng.random() < 0.3 else body
+    return rng.choice(PREFIXES) + body + rng.choice([".", "!", ""]) + rng.choice(SUFFIXES)
+
+
+def label_of(result):
+    return tuple(sorted(result["labels"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate reuse in the classification cache")
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.9", help="Jaccard thresholds to try")
+    parser.add_argument("--variants", type=int, default=3, help="Rewordings per case")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for the rewordings")
+    args = parser.parse_args()
+
+    cases = corpus()
+    rng = random.Random(args.seed)
+    rewordings = [(reword(text, rng), labels) for text, labels in cases for _ in range(args.variants)]
+    thresholds = [float(x) for x in args.thresholds.split(",")]
+
+    print("=" * 86)
+    print(f"NEAR-DUPLICATE CACHE - {len(cases)} cases, {len(rewordings)} rewordings")
+    print("=" * 86)
+    print(f"{'':10s} {'paraphrase replay':^36s} {'leave-one-out':^36s}")
+    print(f"{'threshold':>10s} {'exact':>8s} {'near':>8s} {'hit rate':>9s} {'wrong':>8s} "
+          f"{'near':>8s} {'hit rate':>9s} {'wrong':>8s} {'acc loss':>9s}")
+
+    exact_only = None
+    for threshold in thresholds:
+        cache = ClassificationCache(similarity_threshold=threshold)
+        for text, labels in cases:
+            cache.set(text, {"fine_label": labels[0], "labels": list(labels)})
+        exact = near = wrong = 0
+        for text, labels in rewordings:
+            result = cache.get(text)
+            if result is None:
+                continue
+            if "cache_similarity" in result:
+                near += 1
+            else:
+                exact += 1
+            wrong += label_of(result) != labels
+        hit_rate = (exact + near) / len(rewordings)
+        exact_only = exact_only if exact_only is not None else exact / len(rewordings)
+
+        index = NearDuplicateIndex(threshold)
+        for i, (text, _) in enumerate(cases):
+            index.add(str(i), text)
+        loo_hits = loo_wrong = 0
+        for i, (text, labels) in enumerate(cases):
+            index.remove(str(i))
+            match = index.query(text)
+            index.add(str(i), text)
+            if match is not None:
+                loo_hits += 1
+                loo_wrong += cases[int(match[0])][1] != labels
+        print(f"{threshold:10.2f} {exact:8d} {near:8d} {hit_rate:8.1%} {wrong:8d} "
+              f"{loo_hits:8d} {loo_hits / len(cases):8.1%} {loo_wrong:8d} {loo_wrong / len(cases):8.1%}")
+
+    print(f"{'exact-only cache':>10s}: {exact_only:.1%} of rewordings hit")
+
+    index = NearDuplicateIndex()
+    synthetic = [f"{rng.choice(cases)[0]} {rng.choice(cases)[0]} (ticket {i})" for i in range(20_000)]
+    start = time.perf_counter()
+    for i, text in enumerate(synthetic):
+        index.add(str(i), text)
+    add_us = (time.perf_counter() - start) / len(synthetic) * 1e6
+    start = time.perf_counter()
+    for text, _ in rewordings:
+        index.query(text)
+    query_us = (time.perf_counter() - start) / len(rewordings) * 1e6
+    print(f"\n20k cached incidents: {add_us:.0f} us per add, {query_us:.0f} us per lookup")
+    print("=" * 86)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Single-Flight Coalescing Benchmark
+==================================
+
+The classification cache only fills once a call finishes, so identical
+requests arriving together all reach the provider. LLMAdapter now lets the
+first one make the call and the rest wait for its result (src/single_flight.py).
+
+Two bursts against the offline fake provider (src/fake_llm.py):
+
+- Analysts: --analysts threads (Streamlit sessions) all report the same
+  --incidents alerts within a fraction of the provider latency
+- Trials: the 50-case corpus (tests/test_cases.py) x --runs (NUM_RUNS in
+  the latency scripts) sent through aclassify_many() at once
+
+Reports provider calls, calls per request, per-request p50 / p95 and wall
+time, with coalescing off (old behaviour) and on.
+
+Usage:
+    python scripts/benchmark_single_flight.py
+    python scripts/benchmark_single_flight.py --analysts 10 --incidents 3 --runs 3 --latency-ms 1200
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "tests"))
+
+from src.fake_llm import FakeLLMConfig, configure_fake_llm, fake_llm_stats
+from src.llm_adapter import LLMAdapter
+from test_cases import TEST_CASES
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def analysts_burst(adapter, args):
+    """Every analyst reports every incident, in their own order, within ~10% of the latency."""
+    incidents = [case["user_input"] for case in TEST_CASES[:args.incidents]]
+    latencies, lock = [], threading.Lock()
+    rng = random.Random(0)
+    orders = [rng.sample(incidents, len(incidents)) for _ in range(args.analysts)]
+    jitter = args.latency_ms / 1000 * 0.1
+
+    def analyst(order):
+        for text in order:
+            time.sleep(rng.random() * jitter)
+            started = time.perf_counter()
+            adapter.classify_incident(text)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(args.analysts) as pool:
+        list(pool.map(analyst, orders))
+    return latencies
+
+
+def trials_burst(adapter, args):
+    descriptions = [case["user_input"] for case in TEST_CASES] * args.runs
+    latencies = []
+
+    async def one(description):
+        started = time.perf_counter()
+        await adapter.aclassify_incident(description)
+        latencies.append(time.perf_counter() - started)
+
+    async def run():
+        await asyncio.gather(*(one(d) for d in descriptions))
+
+    asyncio.run(run())
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-flight coalescing of identical classifications")
+    parser.add_argument("--analysts", type=int, default=8, help="Concurrent sessions reporting the same alerts")
+    parser.add_argument("--incidents", type=int, default=5, help="Alerts each analyst reports")
+    parser.add_argument("--runs", type=int, default=3, help="Copies of the corpus sent at once")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Fake provider median latency")
+    args = parser.parse_args()
+
+    print("=" * 84)
+    print(f"SINGLE-FLIGHT - fake provider {args.latency_ms:.0f} ms")
+    print("=" * 84)
+    print(f"{'burst':40s} {'requests':>8s} {'calls':>6s} {'calls/req':>9s} {'p50':>7s} {'p95':>7s} {'wall':>7s}")
+    saved = {}
+    for name, burst, requests in (
+        (f"{args.analysts} analysts x {args.incidents} alerts", analysts_burst, args.analysts * args.incidents),
+        (f"{len(TEST_CASES)} cases x {args.runs} runs at once", trials_burst, len(TEST_CASES) * args.runs),
+    ):
+        for coalesce in (False, True):
+            configure_fake_llm(FakeLLMConfig(latency_ms=args.latency_ms))
+            adapter = LLMAdapter(model="fake")
+            adapter.coalesce = coalesce
+            adapter.rate_limiter.rate = adapter.rate_limiter.burst = 1e6  # measure the calls, not the pacing
+            start = time.perf_counter()
+            latencies = burst(adapter, args)
+            wall = time.perf_counter() - start
+            calls = fake_llm_stats()["calls"]
+            label = f"{name} ({'single-flight' if coalesce else 'off'})"
+            print(f"{label:40s} {requests:8d} {calls:6d} {calls / requests:9.2f} "
+                  f"{statistics.median(latencies):6.2f}s {percentile(latencies, 0.95):6.2f}s {wall:6.2f}s")
+            saved.setdefault(name, []).append(calls)
+    print("-" * 84)
+    for name, (before, after) in saved.items():
+        print(f"{name}: {before - after} provider calls saved ({1 - after / before:.0%})")
+    print("=" * 84)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
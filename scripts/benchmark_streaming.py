@@ -0,0 +1,185 @@
+"""
+Streaming Latency Benchmark
+===========================
+
+Compares time to first visible content for the blocking adapter calls
+(classify_incident / generate_clarifying_question) against their streaming
+versions (stream_classify_incident / stream_clarifying_question).
+
+Runs against a local OpenAI-compatible server that "generates" tokens at a
+fixed rate after a fixed time to first token, like a real model does - so it
+needs no API key. The blocking path only sees the response once the last
+token is out; the streaming path can show the label / first words early.
+
+Usage:
+    python scripts/benchmark_streaming.py
+    python scripts/benchmark_streaming.py --ttft-ms 400 --token-ms 20 --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import src.llm_adapter as llm_adapter
+from src.llm_adapter import LLMAdapter
+
+CLASSIFICATION = json.dumps({
+    "incident_type": "A05:2025 - Injection",
+    "fine_label": "sql_injection",
+    "labels": ["sql_injection"],
+    "confidence": 0.85,
+    "rationale": "The user reports odd syntax and database errors on the login form right after "
+                 "submitting special characters, which is the typical sign of an SQL injection "
+                 "attempt. It could also be a misconfiguration that leaks verbose errors, but the "
+                 "timing and the login context make injection the most likely cause.",
+    "owasp_version": "2025",
+})
+QUESTION = ("I know this is stressful - can you tell me what exactly appeared on the login page "
+            "when it broke, for example an error message mentioning SQL or the database, and "
+            "whether it happened for every user or only after someone typed something unusual?")
+
+
+def tokens(text: str, size: int = 4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeStreamingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    ttft = 0.3
+    token_s = 0.02
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        text = CLASSIFICATION if body.get("response_format") else QUESTION
+        pieces = tokens(text)
+        time.sleep(self.ttft)
+        if not body.get("stream"):
+            time.sleep(self.token_s * len(pieces))
+            payload = json.dumps({
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self.token_s)
+            self._event({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        self._event({"choices": [], "usage": {"prompt_tokens": 1500, "completion_tokens": len(pieces),
+                                              "total_tokens": 1500 + len(pieces)}})
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _event(self, data: dict):
+        data.update({"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o-mini"})
+        self._send_chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def measure_classification(adapter: LLMAdapter, streaming: bool):
+    """(first visible content s, label visible s, done s)"""
+    start = time.perf_counter()
+    if not streaming:
+        adapter.classify_incident("weird syntax on the login page")
+        done = time.perf_counter() - start
+        return done, done, done
+    first = label = None
+    for chunk in adapter.stream_classify_incident("weird syntax on the login page"):
+        now = time.perf_counter() - start
+        if first is None and chunk.text:
+            first = now
+        if label is None and chunk.label:
+            label = now
+    return first, label, time.perf_counter() - start
+
+
+def measure_question(adapter: LLMAdapter, streaming: bool):
+    """(first visible content s, done s)"""
+    classification = {"confidence": 0.45, "incident_type": "A05:2025 - Injection"}
+    start = time.perf_counter()
+    if not streaming:
+        adapter.generate_clarifying_question("weird syntax on the login page", classification)
+        done = time.perf_counter() - start
+        return done, done
+    first = None
+    for _ in adapter.stream_clarifying_question("weird syntax on the login page", classification):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs streaming LLM calls (time to first content)")
+    parser.add_argument("--runs", type=int, default=3, help="Calls per mode (median is reported)")
+    parser.add_argument("--ttft-ms", type=float, default=300, help="Fake model time to first token")
+    parser.add_argument("--token-ms", type=float, default=20, help="Fake model time per token")
+    args = parser.parse_args()
+
+    FakeStreamingHandler.ttft = args.ttft_ms / 1000
+    FakeStreamingHandler.token_s = args.token_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStreamingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    llm_adapter.clear_provider_clients()
+    adapter = LLMAdapter(api_key="sk-bench", model="gpt-4o-mini")
+    adapter.rate_limiter = None
+
+    def median(rows, i):
+        return statistics.median(r[i] for r in rows) * 1000
+
+    print("=" * 74)
+    print(f"STREAMING BENCHMARK - fake model: {args.ttft_ms:.0f} ms to first token, "
+          f"{args.token_ms:.0f} ms/token, median of {args.runs}")
+    print("=" * 74)
+    print(f"{'':30s} {'first content':>14s} {'label shown':>12s} {'complete':>10s}")
+    results = {}
+    for name, streaming in (("classify (blocking)", False), ("classify (streaming)", True)):
+        rows = [measure_classification(adapter, streaming) for _ in range(args.runs)]
+        results[name] = rows
+        print(f"{name:30s} {median(rows, 0):12.0f}ms {median(rows, 1):10.0f}ms {median(rows, 2):8.0f}ms")
+    for name, streaming in (("question (blocking)", False), ("question (streaming)", True)):
+        rows = [measure_question(adapter, streaming) for _ in range(args.runs)]
+        results[name] = rows
+        print(f"{name:30s} {median(rows, 0):12.0f}ms {'-':>12s} {median(rows, 1):8.0f}ms")
+    print("-" * 74)
+    label_speedup = median(results["classify (blocking)"], 1) / median(results["classify (streaming)"], 1)
+    question_speedup = median(results["question (blocking)"], 0) / median(results["question (streaming)"], 0)
+    print(f"Label visible {label_speedup:.1f}x sooner, clarifying question starts {question_speedup:.1f}x sooner")
+    if adapter.last_usage is not None:
+        print(f"Last streamed call: ttft {adapter.last_usage.ttft_s * 1000:.0f} ms, "
+              f"{adapter.last_usage.output_tokens} output tokens")
+    print("=" * 74)
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -294,6 +294,13 @@ def evaluate_system(
     all_results = []
     rubric_scores = []
     
+    # Baseline is pure keyword matching - classify each split in one batch call
+    if use_baseline:
+        from src.baseline_keyword_classifier import BaselineKeywordClassifier
+        classifier = BaselineKeywordClassifier()
+        single_predictions = classifier.classify_many([c["user_input"] for c in single_cases])
+        ambiguous_predictions = classifier.classify_many([c["user_input"] for c in ambiguous_cases])
+    
     # Evaluate single cases
     print("Evaluating Single Incident Cases...")
     for i, case in enumerate(single_cases, 1):
@@ -301,9 +308,7 @@ def evaluate_system(
         
         try:
             if use_baseline:
-                from src.baseline_keyword_classifier import BaselineKeywordClassifier
-                classifier = BaselineKeywordClassifier()
-                prediction = classifier.classify(case["user_input"])
+                prediction = single_predictions[i - 1]
                 prediction["label"] = canonicalize_label(prediction["label"])
             else:
                 prediction = run_phase1_classification(case["user_input"])
@@ -339,9 +344,7 @@ def evaluate_system(
         
         try:
             if use_baseline:
-                from src.baseline_keyword_classifier import BaselineKeywordClassifier
-                classifier = BaselineKeywordClassifier()
-                prediction = classifier.classify(case["user_input"])
+                prediction = ambiguous_predictions[i - 1]
                 prediction["label"] = canonicalize_label(prediction["label"])
             else:
                 prediction = run_phase1_classification(case["user_input"])
@@ -26,6 +26,7 @@ if sys.platform == "win32":
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.llm_adapter import LLMAdapter
+from src.batch_inference import case_request_id, case_requests
 from src.classification_rules import canonicalize_label
 from test_cases import TEST_CASES
 
@@ -34,6 +35,10 @@ GEMINI_RATE_LIMIT = 4.5  # seconds
 CLAUDE_RATE_LIMIT = 1.0  # seconds
 OPENAI_RATE_LIMIT = 1.0  # seconds
 
+# --batch: results are checkpointed here per model - a rerun resumes,
+# delete the file to start over
+BATCH_DIR = "reports/batch"
+
 
 def normalize_label(label: str) -> str:
     """Normalize label for comparison."""
@@ -44,11 +49,16 @@ def run_experiment_for_model(
     model_name: str,
     provider: str,
     test_cases: List[Dict[str, Any]],
-    api_key: str = None
+    api_key: str = None,
+    batch: str = None
 ) -> Dict[str, Any]:
     """
     Run controlled experiment for a single model.
     
+    batch = "auto" / "provider" / "local" classifies every case up front with
+    LLMAdapter.classify_batch() (provider batch endpoint or a worker pool,
+    checkpointed in BATCH_DIR) instead of one rate-limited call at a time.
+    
     Returns:
         Dict with detailed results including:
         - Overall accuracy
@@ -90,6 +100,12 @@ def run_experiment_for_model(
         "openai": OPENAI_RATE_LIMIT
     }.get(provider, 1.0)
     
+    batch_results = None
+    if batch:
+        batch_file = os.path.join(BATCH_DIR, f"{model_name}.jsonl")
+        print(f"[BATCH] Classifying {len(test_cases)} cases ({batch} mode), checkpoint: {batch_file}")
+        batch_results = adapter.classify_batch(case_requests(test_cases), batch_file, mode=batch)
+    
     for idx, test_case in enumerate(test_cases, 1):
         test_id = test_case.get("id", f"test_{idx}")
         user_input = test_case.get("user_input", "")
@@ -102,14 +118,20 @@ def run_experiment_for_model(
         start_time = time.time()
         
         try:
-            # Classify incident
-            classification = adapter.classify_incident(
-                description=user_input,
-                context="",
-                conversation_history=None
-            )
-            
-            elapsed = time.time() - start_time
+            if batch_results is not None:
+                entry = batch_results[case_request_id(idx, test_id)]
+                if "error" in entry:
+                    raise RuntimeError(entry["error"])
+                classification = entry["result"]
+                elapsed = entry.get("latency_s", 0.0)  # provider batches don't time single requests
+            else:
+                # Classify incident
+                classification = adapter.classify_incident(
+                    description=user_input,
+                    context="",
+                    conversation_history=None
+                )
+                elapsed = time.time() - start_time
             total_time += elapsed
             
             # Extract results
@@ -174,7 +196,7 @@ def run_experiment_for_model(
         results.append(result)
         
         # Rate limiting
-        if idx < len(test_cases):
+        if idx < len(test_cases) and batch_results is None:
             time.sleep(rate_limit)
     
     # Calculate statistics
@@ -223,7 +245,8 @@ def run_baseline_experiment(
     gemini_key: str = None,
     claude_key: str = None,
     openai_key: str = None,
-    baseline_models: List[str] = None
+    baseline_models: List[str] = None,
+    batch: str = None
 ) -> Dict[str, Any]:
     """
     Run complete baseline comparison experiment.
@@ -234,6 +257,7 @@ def run_baseline_experiment(
         claude_key: Claude API key
         openai_key: OpenAI API key
         baseline_models: List of baseline models to test (e.g., ["claude", "openai"])
+        batch: Batch mode for every model ("auto", "provider", "local"), None = one call at a time
     
     Returns:
         Complete experiment results in IEEE format
@@ -262,7 +286,8 @@ def run_baseline_experiment(
         model_name="gemini-2.5-pro",
         provider="gemini",
         test_cases=test_cases,
-        api_key=gemini_key or os.getenv("GEMINI_API_KEY")
+        api_key=gemini_key or os.getenv("GEMINI_API_KEY"),
+        batch=batch
     )
     
     # Test baseline models
@@ -275,7 +300,8 @@ def run_baseline_experiment(
                 model_name="claude-3-5-sonnet-20241022",
                 provider="anthropic",
                 test_cases=test_cases,
-                api_key=claude_key
+                api_key=claude_key,
+                batch=batch
             )
         else:
             print("[WARNING] Claude API key not available")
@@ -287,7 +313,8 @@ def run_baseline_experiment(
                 model_name="gpt-4o",
                 provider="openai",
                 test_cases=test_cases,
-                api_key=openai_key
+                api_key=openai_key,
+                batch=batch
             )
         else:
             print("[WARNING] OpenAI API key not available")
@@ -365,6 +392,8 @@ def main():
     parser.add_argument("--gemini-key", help="Gemini API key")
     parser.add_argument("--claude-key", help="Claude API key")
     parser.add_argument("--openai-key", help="OpenAI API key")
+    parser.add_argument("--batch", choices=["auto", "provider", "local"],
+                       help="Classify in batch (provider batch API / worker pool), resumable")
     
     args = parser.parse_args()
     
@@ -380,7 +409,8 @@ def main():
         gemini_key=args.gemini_key,
         claude_key=args.claude_key,
         openai_key=args.openai_key,
-        baseline_models=args.baseline
+        baseline_models=args.baseline,
+        batch=args.batch
     )
     
     # Save results
@@ -16,7 +16,7 @@ import json
 import time
 import numpy as np
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List
 from datetime import datetime
 from collections import defaultdict
 from sklearn.metrics import precision_recall_fscore_support, confusion_matrix
@@ -31,6 +31,7 @@ if sys.platform == "win32":
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.llm_adapter import LLMAdapter
+from src.batch_inference import case_request_id, case_requests
 from src.classification_rules import canonicalize_label
 from src.phase1_core import run_phase1_classification
 
@@ -89,6 +90,9 @@ CONFIDENCE_LEVEL = 0.95
 GEMINI_RATE_LIMIT = 2.0  # seconds between Gemini requests (reduced for speed)
 OPENAI_RATE_LIMIT = 0.5  # seconds between OpenAI requests (reduced for speed)
 USE_FAST_MODE = True  # Fast mode: fewer test cases, single run
+# BATCH_MODE=auto|provider|local - baseline runs go through LLMAdapter.classify_batch()
+# (checkpointed in BATCH_DIR, a rerun resumes - delete the file to start over)
+BATCH_DIR = "reports/batch"
 
 def normalize_label(label) -> str:
     """Normalize label to canonical form for comparison."""
@@ -200,7 +204,7 @@ def test_chatops(test_cases: List[Dict[str, Any]], num_runs: int = 1) -> Dict[st
         "ci_95_upper": float(ci_upper * 100),
     }
 
-def test_chatgpt(test_cases: List[Dict[str, Any]], num_runs: int = 1, api_key: str = None, model_name: str = None, provider_name: str = None) -> Dict[str, Any]:
+def test_chatgpt(test_cases: List[Dict[str, Any]], num_runs: int = 1, api_key: str = None, model_name: str = None, provider_name: str = None, batch: str = None) -> Dict[str, Any]:
     """Test ChatGPT (GPT-4o) or Claude."""
     print(f"\n{'='*70}")
     
@@ -234,6 +238,12 @@ def test_chatgpt(test_cases: List[Dict[str, Any]], num_runs: int = 1, api_key: s
             "total_tests": 0
         }
     
+    batch_results = None
+    if batch:
+        batch_file = os.path.join(BATCH_DIR, f"improved_{model_name}_{num_runs}runs.jsonl")
+        print(f"[BATCH] Classifying {len(test_cases) * num_runs} requests ({batch} mode), checkpoint: {batch_file}")
+        batch_results = adapter.classify_batch(case_requests(test_cases, num_runs), batch_file, mode=batch)
+    
     all_results = []
     per_case_results = defaultdict(list)
     
@@ -251,11 +261,17 @@ def test_chatgpt(test_cases: List[Dict[str, Any]], num_runs: int = 1, api_key: s
         case_runs = []
         for run in range(num_runs):
             try:
-                classification = adapter.classify_incident(
-                    description=user_input,
-                    context="",
-                    conversation_history=None
-                )
+                if batch_results is not None:
+                    entry = batch_results[case_request_id(idx, test_id, run + 1)]
+                    if "error" in entry:
+                        raise RuntimeError(entry["error"])
+                    classification = entry["result"]
+                else:
+                    classification = adapter.classify_incident(
+                        description=user_input,
+                        context="",
+                        conversation_history=None
+                    )
                 
                 predicted = normalize_label(classification.get("fine_label", "other"))
                 expected_norm = normalize_label(expected)
@@ -285,7 +301,7 @@ def test_chatgpt(test_cases: List[Dict[str, Any]], num_runs: int = 1, api_key: s
                 })
             
             # Rate limiting
-            if idx < len(test_cases) or run < num_runs - 1:
+            if batch_results is None and (idx < len(test_cases) or run < num_runs - 1):
                 time.sleep(OPENAI_RATE_LIMIT)
         
         per_case_results[test_id] = case_runs
@@ -434,7 +450,8 @@ def main():
     
     # Test baseline (ChatGPT or Claude)
     if baseline_key:
-        chatgpt_results = test_chatgpt(test_cases, NUM_RUNS, baseline_key, baseline_model, baseline_name)
+        chatgpt_results = test_chatgpt(test_cases, NUM_RUNS, baseline_key, baseline_model, baseline_name,
+                                       batch=os.getenv("BATCH_MODE") or None)
     else:
         chatgpt_results = {
             "model": baseline_model or "unknown",
@@ -4,9 +4,9 @@ Phase-1 incident classification and entity extraction modules.
 """
 
 from .llm_adapter import LLMAdapter
-from .extractor import SecurityExtractor, ExtractedEntities
+from .extractor import SecurityExtractor, ExtractedEntities, ExtractionProgress
 from .dialogue_state import DialogueState, Turn
-from .explicit_detector import ExplicitDetector
+from .explicit_detector import ExplicitDetector, get_detector
 from .classification_rules import ClassificationRules
 from .nvd import NVDClient
 from .lc_retriever import KnowledgeBaseRetriever
@@ -20,9 +20,11 @@ __all__ = [
     "LLMAdapter",
     "SecurityExtractor",
     "ExtractedEntities",
+    "ExtractionProgress",
     "DialogueState",
     "Turn",
     "ExplicitDetector",
+    "get_detector",
     "ClassificationRules",
     "NVDClient",
     "KnowledgeBaseRetriever",
@@ -11,8 +11,9 @@ Pattern examples:
 - Encryption-related terms → A04 Cryptographic Failure
 """
 
-import re
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, List, Optional
+
+from .pattern_matcher import batch_map, compile_patterns
 
 
 class BaselineKeywordClassifier:
@@ -56,6 +57,9 @@ class BaselineKeywordClassifier:
             (r"weak.*crypto", "cryptographic_failures", 0.6),
             (r"md5.*hash", "cryptographic_failures", 0.6),
         ]
+        
+        # Shared compiled matcher - same first-match-in-order behavior, just faster
+        self._matcher = compile_patterns(self.patterns)
     
     def classify(self, text: str) -> Dict[str, any]:
         """
@@ -70,17 +74,16 @@ class BaselineKeywordClassifier:
                 - confidence: fixed 0.7 (baseline doesn't calibrate confidence)
                 - rationale: which pattern matched
         """
-        text_lower = text.lower()
-        
         # Check patterns in order
-        for pattern, label, conf in self.patterns:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return {
-                    "label": label,
-                    "confidence": 0.7,  # Fixed confidence (baseline weakness)
-                    "rationale": f"Keyword match: {pattern}",
-                    "method": "baseline_keyword"
-                }
+        idx = self._matcher.first_match(text)
+        if idx is not None:
+            pattern, label, conf = self.patterns[idx]
+            return {
+                "label": label,
+                "confidence": 0.7,  # Fixed confidence (baseline weakness)
+                "rationale": f"Keyword match: {pattern}",
+                "method": "baseline_keyword"
+            }
         
         # Default: can't classify
         return {
@@ -90,6 +93,34 @@ class BaselineKeywordClassifier:
             "method": "baseline_keyword"
         }
 
+    
+    def classify_many(
+        self,
+        texts: Iterable[str],
+        workers: Optional[int] = 1,
+        chunk_size: Optional[int] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Batch version of classify() for experiment corpora.
+        
+        Args:
+            texts: Incident descriptions
+            workers: 1 = in this process, None = one process per CPU core,
+                     N = process pool of N workers (chunks the corpus)
+            chunk_size: Texts per worker task (default picks one)
+            
+        Returns:
+            List of classification dicts, same order as texts
+        """
+        if workers == 1:
+            return [self.classify(text) for text in texts]
+        return batch_map(_classify_chunk, texts, workers=workers, chunk_size=chunk_size)
+
+
+def _classify_chunk(texts: List[str]) -> List[Dict[str, any]]:
+    """Process-pool worker for classify_many (module level so it pickles)."""
+    return BaselineKeywordClassifier().classify_many(texts)
+
 
 def run_baseline_classification(text: str) -> Dict[str, any]:
     """
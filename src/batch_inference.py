@@ -0,0 +1,321 @@
+# src/batch_inference.py
+"""
+Offline batch classification for evaluation runs.
+
+Input is a JSONL file (or list) of requests:
+
+    {"id": "0003_A01_03_run1", "description": "...", "context": "", "conversation_history": null}
+
+Results go to an output JSONL, one line per finished request:
+
+    {"id": "0003_A01_03_run1", "result": {...classify_incident() dict...}, "latency_s": 1.23}
+    {"id": "0017_A05_07_run1", "error": "RateLimitError: ..."}
+
+The output file is the checkpoint - it's appended as results come in, so an
+interrupted run picks up where it stopped: ids with a result are skipped,
+failed ones are tried again.
+
+Two ways to run:
+- "local": bounded async worker pool through the normal adapter calls
+  (rate limiter + retries), any provider
+- "provider": the provider's batch endpoint (OpenAI Batch API, Anthropic
+  Message Batches) - half the price and no rate-limit juggling, but results
+  can take minutes to hours. The submitted batch id is kept next to the
+  output (<output>.batch.json) so a rerun polls the same batch instead of
+  paying for a second one. Gemini has no batch endpoint in this SDK and
+  always runs locally.
+"""
+
+import asyncio
+import io
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+# Provider batch jobs - how often to check on them
+BATCH_POLL_INTERVAL = 30.0
+OPENAI_BATCH_WINDOW = "24h"
+
+BATCH_PROVIDERS = ("openai", "anthropic")
+
+RequestSource = Union[str, Path, Iterable[Dict[str, Any]]]
+
+
+def read_requests(source: RequestSource) -> List[Dict[str, Any]]:
+    """
+    Load batch requests (JSONL path or dicts) and check their ids.
+
+    Raises:
+        ValueError: Missing/duplicate id or missing description
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "r", encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+    else:
+        requests = list(source)
+    seen = set()
+    for i, request in enumerate(requests):
+        request_id = request.get("id")
+        if not request_id or not isinstance(request_id, str):
+            raise ValueError(f"Batch request {i} has no string id")
+        if request_id in seen:
+            raise ValueError(f"Duplicate batch request id: {request_id}")
+        if "description" not in request:
+            raise ValueError(f"Batch request {request_id} has no description")
+        seen.add(request_id)
+    return requests
+
+
+def case_request_id(index: int, test_id: str, run: int = 1) -> str:
+    """Batch request id for run `run` of test case number `index` (Anthropic allows [A-Za-z0-9_-], max 64)."""
+    return re.sub(r"[^A-Za-z0-9_-]", "_", f"{index:04d}_{test_id}")[:56] + f"_run{run}"
+
+
+def case_requests(test_cases: List[Dict[str, Any]], num_runs: int = 1) -> List[Dict[str, Any]]:
+    """Batch requests for test cases (test_cases.py format), num_runs each."""
+    return [
+        {"id": case_request_id(index, case.get("id", f"test_{index}"), run), "description": case.get("user_input", "")}
+        for index, case in enumerate(test_cases, 1)
+        for run in range(1, num_runs + 1)
+    ]
+
+
+def write_requests(path: Union[str, Path], requests: Iterable[Dict[str, Any]]) -> None:
+    """Write batch requests as JSONL."""
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+def load_results(output_path: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    Results recorded in an output JSONL, by request id (last line per id wins).
+    A half-written last line (run killed mid-write) is ignored.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(output_path):
+        return results
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "id" in record:
+                results[record["id"]] = record
+    return results
+
+
+def run_batch(
+    adapter,
+    requests: RequestSource,
+    output_path: Union[str, Path],
+    mode: str = "auto",
+    concurrency: int = 8,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    progress=None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Classify a batch of requests, checkpointing to output_path.
+
+    Args:
+        adapter: LLMAdapter to classify with
+        requests: JSONL path or request dicts (see module docstring)
+        output_path: Output JSONL - also the checkpoint to resume from
+        mode: "local", "provider", or "auto" (provider batch endpoint when the
+              adapter's provider has one)
+        concurrency: Max in-flight calls in local mode
+        poll_interval: Seconds between provider batch status checks
+        progress: Optional callback(done, total) after each finished request
+
+    Returns:
+        {request id: output record} for every request
+    """
+    requests = read_requests(requests)
+    if mode == "auto":
+        mode = "provider" if adapter.provider in BATCH_PROVIDERS else "local"
+    if mode == "provider" and adapter.provider not in BATCH_PROVIDERS:
+        raise ValueError(f"{adapter.provider} has no batch endpoint - use mode='local'")
+    if mode not in ("local", "provider"):
+        raise ValueError(f"Unknown batch mode: {mode}")
+
+    done = {
+        request_id: record for request_id, record in load_results(output_path).items()
+        if "result" in record
+    }
+    todo = [r for r in requests if r["id"] not in done]
+    if todo:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        torn = _ends_mid_line(output_path)
+        with open(output_path, "a", encoding="utf-8") as out:
+            if torn:
+                out.write("\n")  # killed mid-write last time - don't glue the next record onto it
+            def record(entry: Dict[str, Any]) -> None:
+                out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                out.flush()  # checkpoint - survives a kill right after
+                if "result" in entry:
+                    done[entry["id"]] = entry
+                if progress is not None:
+                    progress(len(done), len(requests))
+
+            if mode == "local":
+                _run_local(adapter, todo, record, concurrency)
+            else:
+                _run_provider(adapter, todo, record, output_path, poll_interval)
+
+    results = load_results(output_path)
+    return {r["id"]: results.get(r["id"], {"id": r["id"], "error": "no result"}) for r in requests}
+
+
+def _ends_mid_line(path: Union[str, Path]) -> bool:
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+# ============================================
+# Local worker pool
+# ============================================
+
+def _run_local(adapter, requests: List[Dict[str, Any]], record, concurrency: int) -> None:
+    from .llm_adapter import aclose_provider_clients
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+
+    async def run() -> None:
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(request: Dict[str, Any]) -> None:
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    result = await adapter.aclassify_incident(
+                        request["description"],
+                        context=request.get("context") or "",
+                        conversation_history=request.get("conversation_history"),
+                    )
+                    entry = {"id": request["id"], "result": result,
+                             "latency_s": round(time.perf_counter() - started, 3)}
+                except Exception as e:
+                    entry = {"id": request["id"], "error": f"{type(e).__name__}: {str(e)[:200]}"}
+            record(entry)  # one event loop thread - no lock needed
+
+        try:
+            await asyncio.gather(*(one(r) for r in requests))
+        finally:
+            await aclose_provider_clients()
+
+    asyncio.run(run())
+
+
+# ============================================
+# Provider batch endpoints
+# ============================================
+
+def _run_provider(adapter, requests: List[Dict[str, Any]], record, output_path, poll_interval: float) -> None:
+    state_path = Path(f"{output_path}.batch.json")
+    state = None
+    if state_path.exists():
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("provider") != adapter.provider or state.get("model") != adapter.model_name:
+            state = None  # checkpoint from another model - start a new batch
+    pending = {r["id"] for r in requests}
+    if state is None or not pending & set(state["ids"]):
+        batch_id = _submit(adapter, requests)
+        state = {"provider": adapter.provider, "model": adapter.model_name,
+                 "batch_id": batch_id, "ids": sorted(pending)}
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        print(f"[BATCH] Submitted {len(requests)} requests to the {adapter.provider} batch API: {batch_id}")
+    else:
+        print(f"[BATCH] Resuming {adapter.provider} batch {state['batch_id']}")
+
+    while True:
+        outputs = _collect(adapter, state["batch_id"])
+        if outputs is not None:
+            break
+        time.sleep(poll_interval)
+    for request_id, output in outputs.items():
+        if request_id in pending:
+            record({"id": request_id, **output})
+    # anything the provider dropped (expired batch) gets an error line and a
+    # fresh batch on the next run
+    for request_id in pending - set(outputs):
+        record({"id": request_id, "error": "missing from batch output"})
+    state_path.unlink()
+
+
+def _submit(adapter, requests: List[Dict[str, Any]]) -> str:
+    """Submit requests to the provider's batch endpoint, return the batch id."""
+    bodies = {}
+    for request in requests:
+        llm_request = adapter._classification_request(
+            request["description"], request.get("context") or "", None, request.get("conversation_history")
+        )
+        bodies[request["id"]] = adapter._request_kwargs(llm_request)
+
+    if adapter.provider == "openai":
+        lines = "".join(
+            json.dumps({"custom_id": request_id, "method": "POST", "url": "/v1/chat/completions", "body": body}) + "\n"
+            for request_id, body in bodies.items()
+        )
+        batch_file = adapter.client.files.create(
+            file=("classification_batch.jsonl", io.BytesIO(lines.encode("utf-8"))), purpose="batch"
+        )
+        batch = adapter.client.batches.create(
+            input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window=OPENAI_BATCH_WINDOW
+        )
+        return batch.id
+    batch = adapter.client.messages.batches.create(
+        requests=[{"custom_id": request_id, "params": body} for request_id, body in bodies.items()]
+    )
+    return batch.id
+
+
+def _collect(adapter, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Output entries by request id once the batch has ended, None while it's still running."""
+    outputs: Dict[str, Dict[str, Any]] = {}
+    if adapter.provider == "openai":
+        batch = adapter.client.batches.retrieve(batch_id)
+        if batch.status not in ("completed", "failed", "expired", "cancelled"):
+            return None
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in adapter.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                body = response.get("body") or {}
+                if response.get("status_code") == 200 and body.get("choices"):
+                    outputs[entry["custom_id"]] = _parsed(adapter, body["choices"][0]["message"]["content"])
+                else:
+                    error = entry.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+                    outputs[entry["custom_id"]] = {"error": str(error)[:200]}
+        return outputs
+
+    batch = adapter.client.messages.batches.retrieve(batch_id)
+    if batch.processing_status != "ended":
+        return None
+    for entry in adapter.client.messages.batches.results(batch_id):
+        if entry.result.type == "succeeded":
+            outputs[entry.custom_id] = _parsed(adapter, adapter._response_text(entry.result.message))
+        else:
+            error = getattr(entry.result, "error", None) or entry.result.type
+            outputs[entry.custom_id] = {"error": str(error)[:200]}
+    return outputs
+
+
+def _parsed(adapter, content: str) -> Dict[str, Any]:
+    try:
+        return {"result": adapter._parse_classification(content)}
+    except ValueError as e:
+        return {"error": str(e)[:200]}
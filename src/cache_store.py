@@ -0,0 +1,193 @@
+# src/cache_store.py
+"""
+Persistent classification cache store (L2 behind ClassificationCache).
+
+One SQLite file in WAL mode, shared by every process pointed at it -
+Streamlit workers, replicas on the same disk, script runs. WAL lets readers
+carry on while one process writes; busy_timeout queues concurrent writers
+instead of failing them.
+
+Entries carry an absolute expiry (wall clock, so it means the same in every
+process) and a last-used time. Expired rows are deleted when they're read
+and in compaction; compaction also drops the least recently used rows once
+the stored results pass max_bytes, then hands the freed pages back to the
+filesystem (incremental vacuum).
+
+It also holds the cache namespace versions (ClassificationCache.invalidate())
+so a bump in one process retires the namespace in all of them.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Default size bound for the stored results
+DEFAULT_STORE_MAX_BYTES = 256 * 1024 * 1024
+
+# Compact after this many writes (and when the store is opened)
+COMPACT_EVERY = 500
+
+# Compaction trims to this fraction of max_bytes so it doesn't run again
+# on the very next write
+COMPACT_TARGET = 0.9
+
+# How long a writer waits for another process's write to finish
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    nbytes INTEGER NOT NULL
+)
+"""
+
+_NAMESPACE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS namespaces (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+)
+"""
+
+
+class SQLiteCacheStore:
+    """Disk-backed key -> result store with TTL and size-based compaction."""
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = DEFAULT_STORE_MAX_BYTES):
+        """
+        Open (or create) a store.
+
+        Args:
+            path: SQLite file - every process sharing the cache uses the same one
+            max_bytes: Size bound for the stored results
+        """
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()  # one connection, shared by this process's threads
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                                     check_same_thread=False, isolation_level=None)
+        with self._lock:
+            # auto_vacuum only takes effect on a new file, before the first table
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, no fsync per write
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(_NAMESPACE_SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.compact()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Stored result for a key.
+
+        Returns:
+            (result, seconds until it expires), or None if missing/expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?", (key, now))
+                return None
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), row[1] - now
+
+    def set(self, key: str, result: Dict[str, Any], ttl: float) -> None:
+        """Store a result for ttl seconds."""
+        value = json.dumps(result, default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_used, nbytes) VALUES (?, ?, ?, ?, ?)",
+                (key, value, now + ttl, now, len(key) + len(value)),
+            )
+            self._writes += 1
+            due = self._writes % COMPACT_EVERY == 0
+        if due:
+            self.compact()
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Drop expired rows, then least recently used ones down to the size bound.
+
+        Returns:
+            {"expired": rows, "evicted": rows} deleted
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # one process compacts at a time
+            try:
+                expired = self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+                evicted = 0
+                total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - int(self.max_bytes * COMPACT_TARGET)
+                    # last_used of the row where the LRU end covers the excess
+                    cutoff = self._conn.execute(
+                        "SELECT last_used FROM (SELECT last_used, SUM(nbytes) OVER (ORDER BY last_used) AS running"
+                        " FROM entries) WHERE running >= ? LIMIT 1", (excess,)
+                    ).fetchone()[0]
+                    evicted = self._conn.execute("DELETE FROM entries WHERE last_used <= ?", (cutoff,)).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if expired or evicted:
+                self._conn.execute("PRAGMA incremental_vacuum")
+        return {"expired": expired, "evicted": evicted}
+
+    def namespace_versions(self) -> Dict[str, int]:
+        """Current version of every namespace that has been bumped."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, version FROM namespaces").fetchall())
+
+    def bump_namespace(self, name: str) -> int:
+        """Increment a namespace's version (atomically across processes), return the new one."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO namespaces (name, version) VALUES (?, 1)"
+                    " ON CONFLICT(name) DO UPDATE SET version = version + 1", (name,)
+                )
+                version = self._conn.execute("SELECT version FROM namespaces WHERE name = ?", (name,)).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("PRAGMA incremental_vacuum")
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_store_from_env() -> Optional[SQLiteCacheStore]:
+    """The store named by CLASSIFICATION_CACHE_DB (size: CLASSIFICATION_CACHE_DB_MB), if set."""
+    path = os.getenv("CLASSIFICATION_CACHE_DB")
+    if not path:
+        return None
+    max_mb = os.getenv("CLASSIFICATION_CACHE_DB_MB")
+    return SQLiteCacheStore(path, int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_STORE_MAX_BYTES)
@@ -4,12 +4,71 @@ Classification Cache Module
 
 Simple in-memory cache for LLM classification results to improve performance.
 Preserves all algorithm logic - just adds caching layer.
+
+LRU with lazy TTL expiry: an OrderedDict keeps entries in use order, so a
+hit, an insert and an eviction are all O(1) - no scan over the cache however
+big it gets. Expired entries are dropped when they're looked up (or when
+they reach the LRU end). Bounded by the approximate memory the entries take
+(max_bytes), optionally by entry count too. One lock per cache - the global
+instance is shared by every Streamlit session in the process.
+
+Optionally backed by a persistent store (src/cache_store.py, SQLite) as L2:
+lookups that miss in memory go to disk and are promoted back into memory,
+writes go to both. Processes sharing the file share results, and a restarted
+process starts warm. get_cache() opens it when CLASSIFICATION_CACHE_DB is set.
+
+With a similarity threshold, a text with no exact entry can reuse the
+classification of a near-duplicate one (src/similarity_cache.py - MinHash
+LSH over the word sets, exact Jaccard check). Such a hit comes back as a
+copy with "cache_similarity" set, so callers can tell it from an exact one.
+get_cache() turns it on with CLASSIFICATION_CACHE_SIMILARITY=<threshold>.
+
+Keys are composite: the normalized message plus a fingerprint of the
+context that shaped the answer (conversation history, extra context such as
+keyword hints / CVE details), the model, a hash of the prompt, and the
+namespace version. Change any of them and it's a different entry, so
+multi-turn flows can cache without reusing an answer given for another
+conversation state. invalidate() bumps a namespace's version - O(1), no
+scan: entries under the old version are simply never looked up again and
+age out of the LRU / TTL (and, with a store, out of every process).
 """
 
 import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
-from functools import lru_cache
+
+from .cache_store import SQLiteCacheStore, open_store_from_env
+from .similarity_cache import NearDuplicateIndex
+
+# Default memory bound - ~1 KB per classification, so roughly 64k entries
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Rough per-entry cost on top of the key and result text (OrderedDict node,
+# entry tuple, dict objects)
+ENTRY_OVERHEAD = 240
+
+DEFAULT_NAMESPACE = "classification"
+
+# How often namespace versions are re-read from the store - a bump in another
+# process takes at most this long to show up here
+NAMESPACE_REFRESH = 5.0
+
+
+def normalize_message(text: str) -> str:
+    """Lowercase, whitespace collapsed - what the exact key is built from."""
+    return " ".join(text.lower().split())
+
+
+def context_fingerprint(*parts: Optional[str]) -> str:
+    """Short hash of the context around a message ("-" when there is none)."""
+    normalized = [normalize_message(part or "") for part in parts]
+    if not any(normalized):
+        return "-"
+    return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()[:16]
 
 
 class ClassificationCache:
@@ -19,85 +78,262 @@ class ClassificationCache:
     Uses text hash as cache key to handle similar inputs efficiently.
     """
     
-    def __init__(self, ttl_hours: int = 24, max_size: int = 100):
+    def __init__(
+        self,
+        ttl_hours: float = 24,
+        max_size: Optional[int] = None,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        store: Optional[SQLiteCacheStore] = None,
+        similarity_threshold: Optional[float] = None
+    ):
         """
         Initialize cache.
         
         Args:
             ttl_hours: Time-to-live for cache entries (default: 24 hours)
-            max_size: Maximum number of cached entries (default: 100)
+            max_size: Maximum number of cached entries (default: no count limit)
+            max_bytes: Approximate memory limit for the entries (default: 64 MB,
+                       None = no limit)
+            store: Persistent L2 store shared with other processes (default: none)
+            similarity_threshold: Jaccard similarity for reusing a near-duplicate's
+                                  result (default: exact matches only)
         """
-        self.cache: Dict[str, tuple] = {}  # {hash: (result, timestamp)}
-        self.ttl = timedelta(hours=ttl_hours)
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()  # {hash: (result, expires_at, nbytes)}, LRU first
+        self.ttl = ttl_hours * 3600
         self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.store = store
+        self.similar = NearDuplicateIndex(similarity_threshold) if similarity_threshold is not None else None
+        self.nbytes = 0
+        self.hits = 0
+        self.l2_hits = 0  # subset of hits served from the store
+        self.near_hits = 0  # subset of hits from a near-duplicate text
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, int] = {}
+        self._namespaces_read = float("-inf")
     
-    def _get_hash(self, text: str) -> str:
-        """Generate hash for text input."""
-        # Normalize text (lowercase, strip whitespace)
-        normalized = text.lower().strip()
-        return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+    def _scope(
+        self,
+        context: str,
+        conversation_history: Optional[str],
+        model: str,
+        prompt: str,
+        namespace: str
+    ) -> str:
+        """Everything but the message that goes into a key."""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12] if prompt else "-"
+        return (f"{namespace}@{self.namespace_version(namespace)}|{model or '-'}|{prompt_hash}|"
+                f"{context_fingerprint(context, conversation_history)}")
     
-    def get(self, text: str) -> Optional[Dict[str, Any]]:
+    def _get_hash(self, text: str, scope: str = "") -> str:
+        """Generate hash for text input within a scope."""
+        return hashlib.md5(f"{scope}\n{normalize_message(text)}".encode('utf-8')).hexdigest()
+    
+    def get(
+        self,
+        text: str,
+        context: str = "",
+        conversation_history: Optional[str] = None,
+        model: str = "",
+        prompt: str = "",
+        namespace: str = DEFAULT_NAMESPACE
+    ) -> Optional[Dict[str, Any]]:
         """
         Get cached classification result if available and not expired.
         
         Args:
             text: Input text to classify
-            
+            context: Extra context the classification was given (hints, CVE details)
+            conversation_history: Conversation so far
+            model: Model name
+            prompt: Prompt text or version (hashed) - see LLMAdapter.prompt_fingerprint()
+            namespace: Cache namespace (see invalidate())
+        
         Returns:
-            Cached result dict or None if not found/expired
+            Cached result dict or None if not found/expired (a near-duplicate's
+            result has "cache_similarity" added)
         """
-        cache_key = self._get_hash(text)
+        scope = self._scope(context, conversation_history, model, prompt, namespace)
+        cache_key = self._get_hash(text, scope)
         
-        if cache_key in self.cache:
-            result, cached_time = self.cache[cache_key]
-            
-            # Check if cache entry is still valid
-            if datetime.now() - cached_time < self.ttl:
+        with self._lock:
+            result = self._lookup(cache_key)
+            if result is not None:
                 return result
-            else:
-                # Expired - remove from cache
-                del self.cache[cache_key]
         
+        # Memory miss - try the shared store (outside the lock, it's disk I/O)
+        if self.store is not None:
+            stored = self.store.get(cache_key)
+            if stored is not None:
+                result, ttl_left = stored
+                with self._lock:
+                    self._put(cache_key, result, min(ttl_left, self.ttl))
+                    self.hits += 1
+                    self.l2_hits += 1
+                if self.similar is not None:
+                    self.similar.add(cache_key, text, scope)
+                return result
+        
+        if self.similar is not None:
+            match = self.similar.query(text, scope)
+            if match is not None:
+                with self._lock:
+                    result = self._lookup(match[0])
+                    if result is not None:
+                        self.near_hits += 1
+                        return {**result, "cache_similarity": round(match[1], 3)}
+        
+        with self._lock:
+            self.misses += 1
         return None
     
-    def set(self, text: str, result: Dict[str, Any]) -> None:
+    def _lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Live in-memory entry's result, counted as a hit (caller holds the lock)."""
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[1]:
+            # Expired - remove from cache
+            self._drop(cache_key)
+            self.expirations += 1
+            return None
+        self.cache.move_to_end(cache_key)
+        self.hits += 1
+        return entry[0]
+    
+    def set(
+        self,
+        text: str,
+        result: Dict[str, Any],
+        context: str = "",
+        conversation_history: Optional[str] = None,
+        model: str = "",
+        prompt: str = "",
+        namespace: str = DEFAULT_NAMESPACE
+    ) -> None:
         """
         Store classification result in cache.
         
         Args:
             text: Input text
             result: Classification result to cache
+            context, conversation_history, model, prompt, namespace: As for get()
         """
-        cache_key = self._get_hash(text)
+        scope = self._scope(context, conversation_history, model, prompt, namespace)
+        cache_key = self._get_hash(text, scope)
+        with self._lock:
+            self._put(cache_key, result, self.ttl)
+        if self.similar is not None:
+            self.similar.add(cache_key, text, scope)
+        if self.store is not None:
+            self.store.set(cache_key, result, self.ttl)
+    
+    def _put(self, cache_key: str, result: Dict[str, Any], ttl: float) -> None:
+        """Store in memory and evict down to the limits (caller holds the lock)."""
+        nbytes = len(cache_key) + len(json.dumps(result, default=str)) + ENTRY_OVERHEAD
+        if cache_key in self.cache:
+            self._drop(cache_key)
+        self.cache[cache_key] = (result, time.monotonic() + ttl, nbytes)
+        self.nbytes += nbytes
         
-        # Evict oldest entry if cache is full
-        if len(self.cache) >= self.max_size:
-            # Remove oldest entry (simple FIFO)
-            oldest_key = min(self.cache.keys(), 
-                           key=lambda k: self.cache[k][1])
-            del self.cache[oldest_key]
+        # Evict least recently used entries until back under the limits
+        # (never the one just stored)
+        while len(self.cache) > 1 and self._over_limit():
+            oldest_key, (_, expires_at, _) = next(iter(self.cache.items()))
+            self._drop(oldest_key)
+            if time.monotonic() >= expires_at:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+    
+    def _over_limit(self) -> bool:
+        if self.max_size is not None and len(self.cache) > self.max_size:
+            return True
+        return self.max_bytes is not None and self.nbytes > self.max_bytes
+    
+    def _drop(self, cache_key: str) -> None:
+        """Remove an entry (caller holds the lock)."""
+        self.nbytes -= self.cache.pop(cache_key)[2]
+        if self.similar is not None:
+            self.similar.remove(cache_key)
+    
+    def namespace_version(self, namespace: str = DEFAULT_NAMESPACE) -> int:
+        """Current version of a namespace (shared through the store, if there is one)."""
+        if self.store is not None and time.monotonic() >= self._namespaces_read + NAMESPACE_REFRESH:
+            versions = self.store.namespace_versions()
+            with self._lock:
+                self._namespaces = versions
+                self._namespaces_read = time.monotonic()
+        return self._namespaces.get(namespace, 0)
+    
+    def invalidate(self, namespace: str = DEFAULT_NAMESPACE) -> int:
+        """
+        Retire every entry in a namespace by bumping its version - O(1).
+        
+        Old entries stay where they are until the LRU / TTL / store compaction
+        drops them, but no key leads to them any more.
         
-        # Store new entry
-        self.cache[cache_key] = (result, datetime.now())
+        Returns:
+            The namespace's new version
+        """
+        if self.store is not None:
+            version = self.store.bump_namespace(namespace)
+            with self._lock:
+                self._namespaces = {**self._namespaces, namespace: version}
+            return version
+        with self._lock:
+            version = self._namespaces.get(namespace, 0) + 1
+            self._namespaces = {**self._namespaces, namespace: version}
+        return version
     
     def clear(self) -> None:
-        """Clear all cache entries."""
-        self.cache.clear()
+        """Clear all cache entries (the persistent store's too)."""
+        with self._lock:
+            self.cache.clear()
+            self.nbytes = 0
+            if self.similar is not None:
+                self.similar.clear()
+        if self.store is not None:
+            self.store.clear()
     
     def size(self) -> int:
         """Get current cache size."""
         return len(self.cache)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction/expiry counters since the cache was created."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.cache),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "l2_hits": self.l2_hits,
+                "near_hits": self.near_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
 
 
 # Global cache instance (singleton pattern)
 _global_cache: Optional[ClassificationCache] = None
+_global_cache_lock = threading.Lock()
 
 
 def get_cache() -> ClassificationCache:
     """Get or create global cache instance."""
     global _global_cache
     if _global_cache is None:
-        _global_cache = ClassificationCache()
+        with _global_cache_lock:
+            if _global_cache is None:
+                similarity = os.getenv("CLASSIFICATION_CACHE_SIMILARITY")
+                _global_cache = ClassificationCache(
+                    store=open_store_from_env(),
+                    similarity_threshold=float(similarity) if similarity else None,
+                )
     return _global_cache
-
@@ -5,23 +5,52 @@ Tracks confidence and determines when to proceed to Phase-2.
 Originally had this simpler but needed to track conversation history better.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 from dataclasses import dataclass, field
+import re
 import time
 
 
+# Token budget for the history sent with each LLM call - the static prompt is
+# ~3.6k tokens already, history shouldn't dwarf it
+DEFAULT_HISTORY_TOKENS = 2000
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count without a tokenizer.
+    
+    ~1 token per word or punctuation mark, but at least 1 per 4 chars so long
+    runs (hashes, base64, paths in pasted logs) aren't undercounted too badly.
+    Close enough for budgeting across Gemini/OpenAI/Claude.
+    """
+    return max(len(_TOKEN_PIECES.findall(text)), (len(text) + 3) // 4)
+
+
 @dataclass
 class Turn:
     """Single conversation turn."""
     user_input: str
     classification: Dict[str, Any]
     timestamp: float = field(default_factory=time.time)
+    # This turn's lines in the history text and their token count - worked
+    # out once, reused every time the history is built
+    history_text: Optional[str] = field(default=None, repr=False, compare=False)
+    tokens: int = field(default=0, repr=False, compare=False)
 
 
 class DialogueState:
     """Manages multi-turn conversation state and confidence tracking."""
     
-    def __init__(self):
+    def __init__(self, token_counter: Callable[[str], int] = estimate_tokens):
+        """
+        Args:
+            token_counter: Counts tokens in a string - estimate_tokens by default,
+                           plug in a real tokenizer for exact budgets
+        """
+        self.token_counter = token_counter
         self.turns: List[Turn] = []
         self.current_incident: Optional[Dict[str, Any]] = None
         self.refinement_count: int = 0
@@ -29,6 +58,7 @@ class DialogueState:
     def add_turn(self, user_input: str, classification: Dict[str, Any]):
         """Add a new conversation turn."""
         turn = Turn(user_input=user_input, classification=classification)
+        self._prepare(turn)
         self.turns.append(turn)
         self.current_incident = classification
         self.refinement_count += 1
@@ -85,7 +115,11 @@ class DialogueState:
         
         return "\n".join(context_parts)
     
-    def get_full_conversation_history(self, max_turns: int = 50) -> str:
+    def get_full_conversation_history(
+        self,
+        max_turns: int = 50,
+        max_tokens: Optional[int] = DEFAULT_HISTORY_TOKENS
+    ) -> str:
         """
         Get full conversation as a natural dialogue.
         
@@ -93,6 +127,9 @@ class DialogueState:
             max_turns: Maximum number of recent turns to include (default: 50)
                       This prevents extremely long conversations from hitting token limits.
                       Most recent turns are prioritized.
+            max_tokens: Token budget for the whole history (None = turns limit only).
+                        Filled newest-first; a single turn bigger than the budget
+                        (e.g. a pasted log) is clipped to fit.
         
         Returns:
             Conversation history as natural dialogue text
@@ -100,22 +137,53 @@ class DialogueState:
         if not self.turns:
             return ""
         
-        # For very long conversations, use only the most recent turns
-        # This ensures we stay within token limits while keeping recent context
-        turns_to_use = self.turns[-max_turns:] if len(self.turns) > max_turns else self.turns
-        
-        history = []
-        for turn in turns_to_use:
-            history.append(f"User: {turn.user_input}")
-            if turn.classification:
-                label = turn.classification.get('fine_label', 'unknown')
-                history.append(f"Assistant: I understood this as {label}")
+        # Walk back from the newest turn until either limit is hit - token
+        # counts and text are cached on each turn, so this is just a sum
+        budget = max_tokens if max_tokens is not None else float("inf")
+        used = 0
+        picked = []
+        for turn in reversed(self.turns):
+            if len(picked) >= max_turns:
+                break
+            if turn.history_text is None:
+                self._prepare(turn)  # turn added without add_turn()
+            if used + turn.tokens > budget:
+                if not picked:
+                    # Newest turn alone is over budget - clip it rather than send nothing
+                    picked.append(self._clip(turn, budget))
+                break
+            picked.append(turn.history_text)
+            used += turn.tokens
+        picked.reverse()
         
         # If we truncated, add a note
-        if len(self.turns) > max_turns:
-            history.insert(0, f"[Note: Showing last {max_turns} turns of {len(self.turns)} total turns]")
+        if len(picked) < len(self.turns):
+            picked.insert(0, f"[Note: Showing last {len(picked)} turns of {len(self.turns)} total turns]")
         
-        return "\n".join(history)
+        return "\n".join(picked)
+    
+    def get_history_tokens(self) -> int:
+        """Token count of the whole (untrimmed) history."""
+        return sum(turn.tokens for turn in self.turns)
+    
+    def _prepare(self, turn: Turn) -> None:
+        """Render a turn's history lines and count their tokens (once per turn)."""
+        lines = [f"User: {turn.user_input}"]
+        if turn.classification:
+            label = turn.classification.get('fine_label', 'unknown')
+            lines.append(f"Assistant: I understood this as {label}")
+        turn.history_text = "\n".join(lines)
+        turn.tokens = self.token_counter(turn.history_text)
+    
+    def _clip(self, turn: Turn, budget: int) -> str:
+        """Cut a turn's user text down to roughly `budget` tokens."""
+        keep = int(len(turn.user_input) * budget / max(turn.tokens, 1) * 0.9)
+        clipped = Turn(
+            user_input=f"{turn.user_input[:keep]} [... truncated, message too long]",
+            classification=turn.classification,
+        )
+        self._prepare(clipped)
+        return clipped.history_text
     
     def reset(self):
         """Clear all state for a new conversation."""
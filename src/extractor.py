@@ -1,11 +1,23 @@
 # src/extractor.py
 """
 Entity extraction for security incidents.
-Extracts IOCs (IPs, URLs, hashes, CVEs) from text.
+Extracts IOCs (IPs, URLs, domains, hashes, CVEs, emails, filenames) from text.
+
+extract_stream() does the same over files/streams of any size in bounded
+memory, reporting progress as it goes.
+
+Everything comes out of one combined regex scan - each match is classified
+by which named group hit, instead of one findall pass per entity type. The
+scan only runs over whitespace-separated tokens that could hold an IOC (no
+IOC spans whitespace, and plain words are skipped without touching the regex).
 """
 
+import codecs
+import io
+import mmap
+import os
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Iterator, Optional, Tuple, Union, BinaryIO, TextIO
 from dataclasses import dataclass, field
 
 
@@ -32,6 +44,54 @@ class ExtractedEntities:
         }
 
 
+@dataclass
+class ExtractionProgress:
+    """One update from SecurityExtractor.extract_stream()."""
+    position: int                 # bytes (chars for text streams) scanned so far
+    total: Optional[int]          # input size if known
+    new: ExtractedEntities        # entities first seen in this chunk
+    counts: Dict[str, int]        # unique entities so far, per field
+    dropped: int = 0              # new-looking entities not kept (per-field cap reached)
+    done: bool = False
+    entities: Optional[ExtractedEntities] = None  # full result, on the final update only
+
+
+# Streaming defaults - 1 MiB chunks, and a cap per field so a huge log full of
+# unique IPs can't grow memory without bound
+STREAM_CHUNK_SIZE = 1 << 20
+MAX_ENTITIES_PER_FIELD = 10_000
+
+# A chunk with no whitespace at all (one giant token) is scanned anyway, keeping
+# this many trailing chars for the next chunk so IOCs on the edge aren't cut
+STREAM_OVERLAP = 4096
+
+# found-dict kind -> ExtractedEntities field
+_FIELDS = (
+    ("ip", "ips"), ("url", "urls"), ("domain", "domains"), ("hash", "hashes"),
+    ("cve", "cves"), ("email", "emails"), ("filename", "filenames"),
+)
+
+
+# File extensions worth reporting (scripts, binaries, docs/archives used as droppers, logs/configs)
+FILE_EXTENSIONS = (
+    "exe", "dll", "sys", "scr", "msi", "bat", "cmd", "ps1", "vbs", "js", "jar",
+    "sh", "py", "pl", "rb", "php", "asp", "aspx", "jsp", "elf", "bin", "so",
+    "doc", "docx", "docm", "xls", "xlsx", "xlsm", "ppt", "pptx", "pdf", "rtf",
+    "zip", "rar", "7z", "tar", "gz", "tgz", "iso", "img", "lnk", "hta",
+    "txt", "log", "csv", "json", "xml", "yaml", "yml", "conf", "cfg", "ini",
+    "env", "sql", "db", "bak", "key", "pem", "crt", "html", "htm",
+)
+
+# Domains need a real-looking TLD, otherwise "e.g", "login.then" etc turn into domains.
+# Any two-letter country code, plus common generic TLDs.
+DOMAIN_TLDS = (
+    "com", "net", "org", "edu", "gov", "mil", "int", "info", "biz", "io",
+    "xyz", "top", "site", "online", "app", "dev", "cloud", "shop", "club",
+    "live", "tech", "store", "link", "click", "pro", "name", "mobi", "asia",
+    "local", "internal", "corp", "lan", "onion",
+)
+
+
 class SecurityExtractor:
     """Extract security indicators and entities from text."""
     
@@ -41,45 +101,261 @@ class SecurityExtractor:
     CVE_PATTERN = r'CVE-\d{4}-\d{4,7}'
     EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
     HASH_MD5_PATTERN = r'\b[a-fA-F0-9]{32}\b'
+    HASH_SHA1_PATTERN = r'\b[a-fA-F0-9]{40}\b'
     HASH_SHA256_PATTERN = r'\b[a-fA-F0-9]{64}\b'
+    FILENAME_PATTERN = r'\b[\w-]+(?:\.[\w-]+)*\.(?:' + "|".join(FILE_EXTENSIONS) + r')\b'
+    DOMAIN_PATTERN = (
+        r'\b(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2}|'
+        + "|".join(DOMAIN_TLDS) + r')\b(?![.-]?\w)'
+    )
+    
+    # Entity types in scan order - URLs and emails first so their hosts don't
+    # come out as bare domains, hashes before IPs, filenames before domains
+    # ("dropper.sh" is a file, not a .sh domain)
+    SCAN_ORDER = (
+        ("url", URL_PATTERN),
+        ("email", EMAIL_PATTERN),
+        ("cve", CVE_PATTERN),
+        ("hash", f"{HASH_SHA256_PATTERN}|{HASH_SHA1_PATTERN}|{HASH_MD5_PATTERN}"),
+        ("ip", IP_PATTERN),
+        ("filename", FILENAME_PATTERN),
+        ("domain", DOMAIN_PATTERN),
+    )
+    
+    # What else to pick out of a URL (an IP host, a hash or file in a download path...)
+    URL_INNER_SCANNER = re.compile(
+        "|".join([
+            f"(?P<email>{EMAIL_PATTERN})",
+            f"(?P<cve>{CVE_PATTERN})",
+            f"(?P<hash>{HASH_SHA256_PATTERN}|{HASH_SHA1_PATTERN}|{HASH_MD5_PATTERN})",
+            f"(?P<ip>{IP_PATTERN})",
+            f"(?P<filename>{FILENAME_PATTERN})",
+        ]),
+        re.IGNORECASE,
+    )
+    DOMAIN_RE = re.compile(DOMAIN_PATTERN, re.IGNORECASE)
     
     def extract(self, text: str) -> ExtractedEntities:
-        """Extract all entities from text using regex patterns."""
-        entities = ExtractedEntities()
+        """
+        Extract all entities from text in a single scan.
         
-        entities.ips = self._extract_ips(text)
-        entities.urls = self._extract_urls(text)
-        entities.cves = self._extract_cves(text)
-        entities.emails = self._extract_emails(text)
-        entities.hashes = self._extract_hashes(text)
+        Args:
+            text: Incident description / pasted logs
         
-        return entities
+        Returns:
+            ExtractedEntities, each list deduplicated in first-seen order
+        """
+        found = _new_found()
+        self._scan(text, found)
+        return _to_entities(found)
     
-    def _extract_ips(self, text: str) -> List[str]:
-        """Extract IP addresses."""
-        ips = re.findall(self.IP_PATTERN, text)
-        # Filter out invalid IPs (e.g., 999.999.999.999)
-        valid_ips = []
-        for ip in ips:
-            parts = ip.split('.')
-            if all(0 <= int(part) <= 255 for part in parts):
-                valid_ips.append(ip)
-        return list(set(valid_ips))
+    def extract_stream(
+        self,
+        source: Union[str, os.PathLike, BinaryIO, TextIO],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        max_per_field: Optional[int] = MAX_ENTITIES_PER_FIELD,
+        encoding: str = "utf-8",
+    ) -> Iterator[ExtractionProgress]:
+        """
+        Extract entities from a big log file/stream chunk by chunk.
+        
+        Files on disk are read through mmap; memory stays around chunk_size plus
+        the kept entities no matter how big the input is. Chunks are cut at the
+        last whitespace, and the partial token is carried into the next chunk,
+        so nothing straddling a chunk edge is lost. Results match extract() on
+        the whole text (up to max_per_field).
+        
+        Args:
+            source: Path to a file, or an open file object (binary or text)
+            chunk_size: Bytes/chars to read per chunk
+            max_per_field: Keep at most this many unique entities per field
+                           (None = no cap)
+            encoding: Encoding for binary input (undecodable bytes are replaced)
+        
+        Yields:
+            ExtractionProgress after every chunk - the last one has done=True
+            and the full ExtractedEntities
+        """
+        seen = _new_found()
+        dropped = 0
+        carry = ""
+        position, total = 0, None
+        
+        def merge(text: str) -> ExtractedEntities:
+            nonlocal dropped
+            chunk_found = _new_found()
+            self._scan(text, chunk_found)
+            for kind, values in chunk_found.items():
+                kept = seen[kind]
+                fresh = {}
+                for value in values:
+                    if value in kept:
+                        continue
+                    if max_per_field is not None and len(kept) >= max_per_field:
+                        dropped += 1
+                        continue
+                    kept[value] = None
+                    fresh[value] = None
+                chunk_found[kind] = fresh
+            return _to_entities(chunk_found)
+        
+        def progress(new: ExtractedEntities, done: bool = False) -> ExtractionProgress:
+            return ExtractionProgress(
+                position=position,
+                total=total,
+                new=new,
+                counts={name: len(seen[kind]) for kind, name in _FIELDS},
+                dropped=dropped,
+                done=done,
+                entities=_to_entities(seen) if done else None,
+            )
+        
+        for text, position, total in _read_chunks(source, chunk_size, encoding):
+            text = carry + text
+            cut = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"), text.rfind("\r"))
+            if cut == -1:
+                if len(text) <= chunk_size:
+                    carry = text
+                    continue
+                # One huge token - scan it, keep an overlap for the next chunk
+                carry = text[-STREAM_OVERLAP:]
+                yield progress(merge(text))
+                continue
+            carry = text[cut + 1:]
+            yield progress(merge(text[:cut]))
+        
+        yield progress(merge(carry), done=True)
     
-    def _extract_urls(self, text: str) -> List[str]:
-        """Extract URLs."""
-        return list(set(re.findall(self.URL_PATTERN, text)))
+    def _scan(self, text: str, found: Dict[str, Dict[str, None]]) -> None:
+        """The single-scan loop behind extract() and extract_stream()."""
+        scanners = _SCANNERS
+        for token in text.split():
+            # Which entity types could possibly be in this token? Every IOC has
+            # a "." in it, except URLs ("://"), CVEs ("cve-") and bare hashes
+            # (32+ chars) - plain words and timestamps rule out everything.
+            if "." in token:
+                key = ("://" in token, "@" in token, "cve-" in token.lower(),
+                       len(token) >= 32, token.count(".") >= 3, True)
+            elif "-" in token or ":" in token or len(token) >= 32:
+                key = ("://" in token, False, "cve-" in token.lower(),
+                       len(token) >= 32, False, False)
+                if not (key[0] or key[2] or key[3]):
+                    continue
+            else:
+                continue
+            scanner = scanners.get(key)
+            if scanner is None:
+                scanner = scanners[key] = _build_scanner(self.SCAN_ORDER, key)
+            for m in scanner.finditer(token):
+                kind = m.lastgroup
+                if kind == "url":
+                    found["url"][m.group()] = None
+                    self._scan_url(token, m, found)
+                elif kind in _NORMALIZED:
+                    _add(found, kind, m.group())
+                else:
+                    found[kind][m.group()] = None
     
-    def _extract_cves(self, text: str) -> List[str]:
-        """Extract CVE identifiers."""
-        return list(set(re.findall(self.CVE_PATTERN, text, re.IGNORECASE)))
+    def _scan_url(self, text: str, m: "re.Match", found: Dict[str, Dict[str, None]]) -> None:
+        """Host of a URL goes to domains (or ips), plus any IOCs inside the URL."""
+        host = _url_host(m.group())
+        if host and self.DOMAIN_RE.fullmatch(host):
+            found["domain"][host] = None
+        # pos/endpos instead of slicing so \b still sees the surrounding text
+        for inner in self.URL_INNER_SCANNER.finditer(text, m.start(), m.end()):
+            _add(found, inner.lastgroup, inner.group())
+
+
+def _new_found() -> Dict[str, Dict[str, None]]:
+    # dicts as ordered sets
+    return {kind: {} for kind, _ in _FIELDS}
+
+
+def _to_entities(found: Dict[str, Dict[str, None]]) -> ExtractedEntities:
+    return ExtractedEntities(**{name: list(found[kind]) for kind, name in _FIELDS})
+
+
+def _read_chunks(
+    source: Union[str, os.PathLike, BinaryIO, TextIO],
+    chunk_size: int,
+    encoding: str,
+) -> Iterator[Tuple[str, int, Optional[int]]]:
+    """Yield (text, position after chunk, total size or None) for a path or file object."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
     
-    def _extract_emails(self, text: str) -> List[str]:
-        """Extract email addresses."""
-        return list(set(re.findall(self.EMAIL_PATTERN, text)))
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            total = os.fstat(f.fileno()).st_size
+            if total == 0:
+                return  # can't mmap an empty file
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start in range(0, total, chunk_size):
+                    end = min(start + chunk_size, total)
+                    yield decoder.decode(mm[start:end], final=end == total), end, total
+        return
     
-    def _extract_hashes(self, text: str) -> List[str]:
-        """Extract MD5 and SHA256 hashes."""
-        md5_hashes = re.findall(self.HASH_MD5_PATTERN, text)
-        sha256_hashes = re.findall(self.HASH_SHA256_PATTERN, text)
-        return list(set(md5_hashes + sha256_hashes))
+    total = getattr(source, "size", None)  # e.g. Streamlit UploadedFile
+    if total is None:
+        try:
+            total = os.fstat(source.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            total = None
+    position = 0
+    while True:
+        data = source.read(chunk_size)
+        if not data:
+            break
+        position += len(data)
+        yield (data if isinstance(data, str) else decoder.decode(data)), position, total
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail, position, total
+
+
+# Combined scanner per "which types are possible" key, built on first use.
+# Leaving out branches that can't match anywhere in the token doesn't change
+# what the full alternation would find, it just stops trying them at every position.
+_SCANNERS: Dict[tuple, "re.Pattern"] = {}
+
+
+def _build_scanner(scan_order, key: tuple) -> "re.Pattern":
+    has_url, has_at, has_cve, long_token, three_dots, has_dot = key
+    possible = {
+        "url": has_url,
+        "email": has_at,
+        "cve": has_cve,
+        "hash": long_token,
+        "ip": three_dots,
+        "filename": has_dot,
+        "domain": has_dot,
+    }
+    return re.compile(
+        "|".join(f"(?P<{kind}>{pattern})" for kind, pattern in scan_order if possible[kind]),
+        re.IGNORECASE,
+    )
+
+
+# Kinds that need a check or normalization before being recorded
+_NORMALIZED = frozenset(("ip", "cve", "domain"))
+
+
+def _add(found: Dict[str, Dict[str, None]], kind: str, value: str) -> None:
+    """Record one match (first-seen order), normalizing where it matters."""
+    if kind == "ip":
+        # Filter out invalid IPs (e.g., 999.999.999.999)
+        if max(map(int, value.split('.'))) > 255:
+            return
+    elif kind == "cve":
+        value = value.upper()
+    elif kind == "domain":
+        value = value.lower()
+    found[kind][value] = None
+
+
+def _url_host(url: str) -> Optional[str]:
+    """Lowercased host of a URL (no credentials or port), or None."""
+    rest = url.split("://", 1)[-1]
+    for sep in "/?#":
+        rest = rest.split(sep, 1)[0]
+    host = rest.rsplit("@", 1)[-1].split(":", 1)[0].strip(".").lower()
+    return host or None
@@ -0,0 +1,333 @@
+# src/fake_llm.py
+"""
+Deterministic fake LLM provider for offline load and latency testing.
+
+LLMAdapter uses it for provider "fake" - a model name starting with "fake"
+(LLMAdapter(model="fake")) or LLM_PROVIDER=fake in the environment, which
+switches every adapter in the process (app, phase1_core, scripts) over
+without touching their model names. No API key or network needed.
+
+The client looks like the OpenAI SDK (chat.completions.create, sync and
+async, streaming), so the adapter's whole request path - rate limiter,
+retries, deadlines, JSON parsing, streaming - runs the same as for a real
+provider. Answers are:
+- replayed from recordings (description -> response), when one matches
+- otherwise synthesized: keyword classification (ExplicitDetector /
+  BaselineKeywordClassifier), regex entity extraction, a canned question
+
+Timing and failures come from FakeLLMConfig - lognormal latency, per-token
+streaming delay, random 5xx errors and a token bucket that answers 429 with
+retry-after. All randomness comes from one seeded RNG, so a run with the
+same seed and request order sees the same latencies and errors.
+
+Env config (FakeLLMConfig.from_env): FAKE_LLM_LATENCY_MS, FAKE_LLM_LATENCY_SIGMA,
+FAKE_LLM_TOKEN_MS, FAKE_LLM_ERROR_RATE, FAKE_LLM_RATE_LIMIT, FAKE_LLM_SEED,
+FAKE_LLM_RECORDINGS (JSONL of {"description", "response"} lines).
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, Optional
+
+from .extractor import SecurityExtractor
+from .latency_budget import keyword_classification
+
+FAKE_QUESTION = (
+    "I'm sorry you're dealing with this - can you tell me what exactly you saw, "
+    "for example an error message, an unexpected page, or activity in the logs?"
+)
+
+# Pull the user's message back out of the adapter's prompts
+_DESCRIPTION_RES = (
+    re.compile(r"CURRENT USER MESSAGE: (.*?)\n(?:\nADDITIONAL CONTEXT:|\n\nAnalyze the CURRENT)", re.DOTALL),
+    re.compile(r"\nText: (.*?)\n\nRespond with valid JSON only\.", re.DOTALL),
+)
+_THRESHOLD_RE = re.compile(r"if your confidence is below ([0-9.]+)")
+
+_CLASSIFICATION_KEYS = ("incident_type", "fine_label", "labels", "confidence", "rationale", "owasp_version")
+_ENTITY_KEYS = ("ips", "urls", "domains", "hashes", "cves", "emails", "filenames")
+
+
+@dataclass
+class FakeLLMConfig:
+    """Timing / failure behaviour of the fake provider."""
+    latency_ms: float = 800.0       # median time to a full (or first streamed) response
+    latency_sigma: float = 0.35     # lognormal spread - 0 = always latency_ms
+    token_ms: float = 0.0           # per ~4 characters of output (streamed and blocking)
+    error_rate: float = 0.0         # fraction of calls failing with a 500
+    rate_limit: Optional[float] = None  # requests/second before 429s (None = unlimited)
+    retry_after: float = 1.0        # retry-after sent with a 429
+    seed: Optional[int] = 0
+    recordings: Dict[str, Any] = field(default_factory=dict)  # normalized description -> response
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        rate_limit = os.getenv("FAKE_LLM_RATE_LIMIT")
+        seed = os.getenv("FAKE_LLM_SEED", "0")
+        recordings_path = os.getenv("FAKE_LLM_RECORDINGS")
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "800")),
+            latency_sigma=float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.35")),
+            token_ms=float(os.getenv("FAKE_LLM_TOKEN_MS", "0")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            rate_limit=float(rate_limit) if rate_limit else None,
+            seed=int(seed) if seed else None,
+            recordings=load_recordings(recordings_path) if recordings_path else {},
+        )
+
+
+class FakeAPIError(Exception):
+    """Looks like an SDK APIStatusError to rate_limiter.classify_error()."""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class FakeTimeoutError(TimeoutError):
+    """The call ran past its per-attempt timeout."""
+
+
+def normalize_description(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def load_recordings(path: str) -> Dict[str, Any]:
+    """
+    Load recorded responses from JSONL - {"description": ..., "response": {...} or "..."}
+    per line ("result" works too, so classify_batch() outputs joined with their
+    requests can be replayed).
+    """
+    recordings = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response", entry.get("result"))
+            if "description" in entry and response is not None:
+                recordings[normalize_description(entry["description"])] = response
+    return recordings
+
+
+_config: Optional[FakeLLMConfig] = None
+_config_lock = threading.Lock()
+_extractor: Optional[SecurityExtractor] = None  # built on first entity request
+
+
+def configure_fake_llm(config: Optional[FakeLLMConfig] = None, **changes) -> FakeLLMConfig:
+    """
+    Set the fake provider's behaviour for the whole process (shared clients
+    pick it up on their next call). Without a config, changes are applied to
+    the current one, e.g. configure_fake_llm(error_rate=0.1).
+    """
+    global _config
+    with _config_lock:
+        base = config or _config or FakeLLMConfig.from_env()
+        _config = FakeLLMConfig(**{**asdict(base), "recordings": base.recordings, **changes})
+        _state.reset(_config)
+        return _config
+
+
+def get_fake_config() -> FakeLLMConfig:
+    if _config is None:
+        return configure_fake_llm()
+    return _config
+
+
+class _FakeState:
+    """RNG + throttling bucket shared by every fake client in the process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rng = random.Random(0)
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.stats = {"calls": 0, "throttled": 0, "errors": 0}
+
+    def reset(self, config: FakeLLMConfig) -> None:
+        with self.lock:
+            self.rng = random.Random(config.seed)
+            self.tokens = max(1.0, config.rate_limit or 0.0)
+            self.updated = time.monotonic()
+            self.stats = {"calls": 0, "throttled": 0, "errors": 0}
+
+    def admit(self, config: FakeLLMConfig) -> Dict[str, Any]:
+        """Decide one call's fate up front: (latency s, error or None)."""
+        with self.lock:
+            self.stats["calls"] += 1
+            if config.rate_limit:
+                now = time.monotonic()
+                burst = max(1.0, config.rate_limit)
+                self.tokens = min(burst, self.tokens + (now - self.updated) * config.rate_limit)
+                self.updated = now
+                if self.tokens < 1.0:
+                    self.stats["throttled"] += 1
+                    return {"latency": 0.02, "error": FakeAPIError(429, "Rate limit reached", config.retry_after)}
+                self.tokens -= 1.0
+            latency = config.latency_ms / 1000
+            if config.latency_sigma > 0:
+                latency *= math.exp(self.rng.gauss(0.0, config.latency_sigma))
+            error = None
+            if config.error_rate and self.rng.random() < config.error_rate:
+                error = FakeAPIError(500, "The server had an error while processing your request")
+                self.stats["errors"] += 1
+            return {"latency": latency, "error": error}
+
+
+_state = _FakeState()
+
+
+def fake_llm_stats() -> Dict[str, int]:
+    """Calls the fake has seen since it was last configured (throttled = 429s, errors = 500s)."""
+    with _state.lock:
+        return dict(_state.stats)
+
+
+def fake_response_text(kwargs: Dict[str, Any], config: FakeLLMConfig) -> str:
+    """What the fake model 'writes' for a chat.completions.create() request."""
+    global _extractor
+    user = kwargs["messages"][-1]["content"]
+    description = user
+    for pattern in _DESCRIPTION_RES:
+        m = pattern.search(user)
+        if m:
+            description = m.group(1).strip()
+            break
+    response_format = kwargs.get("response_format") or {}
+    schema = (response_format.get("json_schema") or {}).get("name")
+    if schema is None and response_format.get("type") == "json_object":
+        schema = "security_entities" if "ips, urls, domains" in user else "incident_classification"
+
+    recorded = config.recordings.get(normalize_description(description))
+    if isinstance(recorded, str):
+        return recorded
+    if schema is None:
+        return FAKE_QUESTION
+
+    if schema == "security_entities":
+        if _extractor is None:
+            _extractor = SecurityExtractor()
+        return json.dumps(asdict(_extractor.extract(description)))
+
+    result = recorded if isinstance(recorded, dict) else keyword_classification(description)
+    classification = {key: result[key] for key in _CLASSIFICATION_KEYS if key in result}
+    if schema != "incident_turn":
+        return json.dumps(classification)
+    m = _THRESHOLD_RE.search(user)
+    threshold = float(m.group(1).rstrip(".")) if m else 0.70
+    if _extractor is None:
+        _extractor = SecurityExtractor()
+    entities = asdict(_extractor.extract(description))
+    turn = {
+        "fine_label": classification.get("fine_label", "other"),
+        "confidence": classification.get("confidence", 0.0),
+        "labels": classification.get("labels", []),
+        "incident_type": classification.get("incident_type", "Unknown Incident"),
+        "clarifying_question": FAKE_QUESTION if classification.get("confidence", 0.0) < threshold else "",
+        "rationale": classification.get("rationale", ""),
+        "entities": {key: entities.get(key, []) for key in _ENTITY_KEYS},
+        "owasp_version": "2025",
+    }
+    return json.dumps(turn)
+
+
+def _usage(kwargs: Dict[str, Any], text: str) -> SimpleNamespace:
+    prompt = sum(len(m.get("content") or "") for m in kwargs["messages"]) // 4
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=max(1, len(text) // 4),
+                           total_tokens=prompt + max(1, len(text) // 4), prompt_tokens_details=None)
+
+
+def _pieces(text: str):
+    return [text[i:i + 4] for i in range(0, len(text), 4)]  # ~4 characters per token
+
+
+def _completion(kwargs: Dict[str, Any], text: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        id="chatcmpl-fake", model=kwargs.get("model"),
+        choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                 message=SimpleNamespace(role="assistant", content=text))],
+        usage=_usage(kwargs, text),
+    )
+
+
+def _chunk(content: Optional[str] = None, usage=None) -> SimpleNamespace:
+    choices = [] if content is None else [SimpleNamespace(index=0, delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(id="chatcmpl-fake", choices=choices, usage=usage)
+
+
+class FakeLLMClient:
+    """Blocking fake with the OpenAI client's chat.completions.create()."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, timeout: Optional[float] = None, stream: bool = False, **kwargs):
+        config = get_fake_config()
+        fate = _state.admit(config)
+        text = fake_response_text(kwargs, config)
+        token_s = config.token_ms / 1000
+        wait = fate["latency"] if stream else fate["latency"] + token_s * len(_pieces(text))
+        if timeout is not None and wait > timeout:
+            time.sleep(timeout)
+            raise FakeTimeoutError("Request timed out.")
+        if stream:
+            time.sleep(wait)
+            if fate["error"] is not None:
+                raise fate["error"]
+            return self._stream(kwargs, text, token_s)
+        time.sleep(wait)
+        if fate["error"] is not None:
+            raise fate["error"]
+        return _completion(kwargs, text)
+
+    def _stream(self, kwargs: Dict[str, Any], text: str, token_s: float) -> Iterator[SimpleNamespace]:
+        for i, piece in enumerate(_pieces(text)):
+            if i and token_s:
+                time.sleep(token_s)
+            yield _chunk(piece)
+        yield _chunk(usage=_usage(kwargs, text))
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncFakeLLMClient(FakeLLMClient):
+    """Async fake with AsyncOpenAI's chat.completions.create()."""
+
+    async def create(self, timeout: Optional[float] = None, stream: bool = False, **kwargs):
+        config = get_fake_config()
+        fate = _state.admit(config)
+        text = fake_response_text(kwargs, config)
+        token_s = config.token_ms / 1000
+        wait = fate["latency"] if stream else fate["latency"] + token_s * len(_pieces(text))
+        if timeout is not None and wait > timeout:
+            await asyncio.sleep(timeout)
+            raise FakeTimeoutError("Request timed out.")
+        await asyncio.sleep(wait)
+        if fate["error"] is not None:
+            raise fate["error"]
+        if stream:
+            return self._astream(kwargs, text, token_s)
+        return _completion(kwargs, text)
+
+    async def _astream(self, kwargs: Dict[str, Any], text: str, token_s: float):
+        for i, piece in enumerate(_pieces(text)):
+            if i and token_s:
+                await asyncio.sleep(token_s)
+            yield _chunk(piece)
+        yield _chunk(usage=_usage(kwargs, text))
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,204 @@
+# src/hedging.py
+"""
+Hedged LLM requests across providers.
+
+Every blocking provider call records its latency in a per provider/model
+LatencyHistogram. With hedging on, a request that the primary provider
+hasn't answered by its observed p95 goes to a secondary provider as well;
+the first valid answer wins and the other call is dropped. During a
+brownout the slow tail then costs roughly p95 + the secondary's latency
+instead of however long the primary takes.
+
+hedge_call() / ahedge_call() do the racing; LLMAdapter wires them up
+(LLMAdapter.enable_hedging).
+"""
+
+import asyncio
+import bisect
+import math
+import queue
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Hedge at this quantile of the primary's latency
+HEDGE_QUANTILE = 0.95
+
+# Until a provider has this many samples its p95 means nothing - use the
+# default delay instead
+MIN_HEDGE_SAMPLES = 20
+DEFAULT_HEDGE_DELAY = 5.0
+
+# Never hedge sooner than this - a fast p95 would otherwise double the
+# traffic on every small hiccup
+MIN_HEDGE_DELAY = 0.25
+
+# Log-spaced bucket bounds, 10 ms .. ~150 s, ~10% apart - constant memory and
+# O(log n) record no matter how many calls
+_BUCKET_BOUNDS = [0.01 * 1.1 ** i for i in range(int(math.log(15000) / math.log(1.1)) + 1)]
+
+
+class LatencyHistogram:
+    """Thread-safe latency histogram with fixed log-spaced buckets."""
+
+    def __init__(self):
+        self._counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        i = bisect.bisect_left(_BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._total += 1
+
+    @property
+    def count(self) -> int:
+        return self._total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile q (None with no samples)."""
+        with self._lock:
+            if not self._total:
+                return None
+            rank = math.ceil(q * self._total)
+            seen = 0
+            for i, n in enumerate(self._counts):
+                seen += n
+                if seen >= rank:
+                    return _BUCKET_BOUNDS[min(i, len(_BUCKET_BOUNDS) - 1)]
+        return _BUCKET_BOUNDS[-1]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self._total = 0
+
+
+_histograms_lock = threading.Lock()
+_histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+
+def get_latency_histogram(provider: str, model: str) -> LatencyHistogram:
+    """Shared latency histogram for a provider/model (created on first use)."""
+    key = (provider, model)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.get(key)
+            if histogram is None:
+                histogram = LatencyHistogram()
+                _histograms[key] = histogram
+    return histogram
+
+
+def clear_latency_histograms() -> None:
+    """Forget all recorded latencies (tests / benchmarks)."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def hedge_delay(histogram: LatencyHistogram) -> float:
+    """How long to wait for the primary before hedging - its observed p95."""
+    if histogram.count < MIN_HEDGE_SAMPLES:
+        return DEFAULT_HEDGE_DELAY
+    return max(MIN_HEDGE_DELAY, histogram.quantile(HEDGE_QUANTILE))
+
+
+def hedge_call(
+    primary: Callable[[], T],
+    secondary: Callable[[], T],
+    delay: float,
+    valid: Callable[[T], bool] = lambda result: True,
+    on_hedge: Optional[Callable[[], None]] = None
+) -> Tuple[T, bool]:
+    """
+    Run primary(); if it hasn't given a valid answer after `delay`, race secondary() against it.
+
+    A primary that fails (or answers invalid) before the delay hedges right
+    away. The losing call is abandoned - a blocking SDK call can't be
+    interrupted, it ends on its own timeout on a daemon thread.
+
+    Args:
+        primary: Call to the primary provider
+        secondary: Same request to the secondary provider
+        delay: Seconds to give the primary on its own
+        valid: Whether an answer is usable (e.g. parses as JSON)
+        on_hedge: Called when the secondary gets started
+
+    Returns:
+        (result, True if it came from the secondary). With no valid answer
+        from either, the primary's answer if it had one, else its error.
+    """
+    results: "queue.Queue" = queue.Queue()
+
+    def run(fn: Callable[[], T], is_secondary: bool) -> None:
+        try:
+            results.put((is_secondary, fn(), None))
+        except Exception as e:
+            results.put((is_secondary, None, e))
+
+    threading.Thread(target=run, args=(primary, False), name="llm-hedge", daemon=True).start()
+    outcomes: List[Tuple[bool, Any, Optional[Exception]]] = []
+    try:
+        outcomes.append(results.get(timeout=delay))
+        is_secondary, result, error = outcomes[-1]
+        if error is None and valid(result):
+            return result, False
+    except queue.Empty:
+        pass
+
+    if on_hedge is not None:
+        on_hedge()
+    threading.Thread(target=run, args=(secondary, True), name="llm-hedge", daemon=True).start()
+    while len(outcomes) < 2:
+        outcomes.append(results.get())
+        is_secondary, result, error = outcomes[-1]
+        if error is None and valid(result):
+            return result, is_secondary
+    return _no_valid_answer(outcomes)
+
+
+async def ahedge_call(
+    primary: Callable[[], Awaitable[T]],
+    secondary: Callable[[], Awaitable[T]],
+    delay: float,
+    valid: Callable[[T], bool] = lambda result: True,
+    on_hedge: Optional[Callable[[], None]] = None
+) -> Tuple[T, bool]:
+    """Async hedge_call() - the losing call is cancelled."""
+    tasks = {asyncio.ensure_future(primary()): False}
+    outcomes: List[Tuple[bool, Any, Optional[Exception]]] = []
+    hedged = False
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(
+                tasks, timeout=None if hedged else delay, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                is_secondary = tasks.pop(task)
+                error = task.exception()
+                result = None if error is not None else task.result()
+                if error is None and valid(result):
+                    return result, is_secondary
+                outcomes.append((is_secondary, result, error))
+            if not hedged:
+                hedged = True
+                if on_hedge is not None:
+                    on_hedge()
+                tasks[asyncio.ensure_future(secondary())] = True
+    finally:
+        for task in tasks:
+            task.cancel()
+    return _no_valid_answer(outcomes)
+
+
+def _no_valid_answer(outcomes: List[Tuple[bool, Any, Optional[Exception]]]) -> Tuple[Any, bool]:
+    # Both done, neither valid - let the caller's parsing/retry deal with the
+    # primary's answer, or raise the primary's error
+    outcomes.sort(key=lambda outcome: outcome[0])  # primary first
+    for is_secondary, result, error in outcomes:
+        if error is None:
+            return result, is_secondary
+    raise outcomes[0][2]
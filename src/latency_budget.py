@@ -0,0 +1,176 @@
+# src/latency_budget.py
+"""
+Latency budgets for LLM classification.
+
+A chat turn gets a fixed time budget for its LLM call. run_within() /
+iter_within() run the call on a worker thread and stop waiting at the
+deadline no matter what the provider is doing - the per-attempt timeouts in
+LLMAdapter only bound each socket read, so a slow trickle of bytes could
+otherwise keep the Streamlit script waiting well past the budget.
+
+When the budget runs out the caller uses fallback_classification() - the
+best ExplicitDetector / BaselineKeywordClassifier answer, marked degraded.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+from .baseline_keyword_classifier import BaselineKeywordClassifier
+from .classification_rules import ClassificationRules, canonicalize_label
+from .explicit_detector import get_detector
+
+T = TypeVar("T")
+
+# Default LLM budget (seconds) for one chat turn - past this the user gets
+# the keyword answer instead of a spinner
+DEFAULT_TURN_BUDGET = 15.0
+
+# The baseline's fixed 0.7 isn't calibrated - a degraded answer from it stays
+# under the clarify threshold so the user gets asked to confirm
+DEGRADED_BASELINE_CONFIDENCE = 0.5
+
+_DONE = object()
+_baseline: Optional[BaselineKeywordClassifier] = None
+
+
+class BudgetExceeded(TimeoutError):
+    """The call didn't finish inside its latency budget."""
+
+
+def budget_deadline(budget: float, deadline: Optional[float] = None) -> float:
+    """time.monotonic() deadline for a budget in seconds (the earlier one if a deadline is given too)."""
+    budget_end = time.monotonic() + budget
+    return budget_end if deadline is None else min(deadline, budget_end)
+
+
+def out_of_time(exc: BaseException, deadline: float) -> bool:
+    """
+    Whether a failed call failed because the budget ran out.
+
+    Our own BudgetExceeded / RetryDeadlineExceeded and SDK timeouts are
+    TimeoutErrors; anything else counts if it surfaced at (or just before)
+    the deadline - e.g. a provider timeout error raised by the per-attempt
+    timeout.
+    """
+    return isinstance(exc, TimeoutError) or time.monotonic() >= deadline - 0.05
+
+
+def iter_within(make_iter: Callable[[], Iterable[T]], deadline: float) -> Iterator[T]:
+    """
+    Iterate make_iter() on a worker thread, giving up at the deadline.
+
+    Args:
+        make_iter: Builds the iterable (called on the worker thread)
+        deadline: time.monotonic() to stop waiting at
+
+    Yields:
+        The iterable's items, as they arrive
+
+    Raises:
+        BudgetExceeded: Deadline passed before the iterable finished
+        Whatever the iterable raised
+    """
+    items: "queue.Queue" = queue.Queue()
+    stop = threading.Event()
+
+    def pump() -> None:
+        iterator = None
+        try:
+            iterator = iter(make_iter())
+            for item in iterator:
+                items.put((True, item))
+                if stop.is_set():
+                    break
+            items.put((True, _DONE))
+        except BaseException as e:
+            items.put((False, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()  # generator - runs its cleanup (closes the HTTP stream)
+
+    # A thread per call rather than a pool - calls stuck on a slow provider
+    # would fill a pool and make every later call miss its budget too
+    threading.Thread(target=pump, name="llm-budget", daemon=True).start()
+    try:
+        while True:
+            try:
+                ok, item = items.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise BudgetExceeded("LLM call ran past its latency budget") from None
+            if not ok:
+                raise item
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()  # the worker drops the call after its current read
+
+
+def run_within(fn: Callable[[], T], deadline: float) -> T:
+    """
+    Call fn on a worker thread and return its result, or raise BudgetExceeded at the deadline.
+    The abandoned call keeps running in the background until its own timeouts end it.
+    """
+    for result in iter_within(lambda: (fn(),), deadline):
+        return result
+    raise RuntimeError("unreachable")
+
+
+def keyword_classification(text: str) -> Dict[str, Any]:
+    """
+    Classify without an LLM - the more confident of ExplicitDetector and
+    BaselineKeywordClassifier (baseline confidence capped, see above).
+
+    Returns:
+        Dict in LLMAdapter.classify_incident() format, plus "method"
+    """
+    global _baseline
+    label, confidence = get_detector().detect(text)
+    method = "explicit_detector"
+    if label:
+        label = canonicalize_label(label)
+        rationale = f"Keyword detection: {label}"
+    else:
+        if _baseline is None:
+            _baseline = BaselineKeywordClassifier()
+        baseline = _baseline.classify(text)
+        label = baseline["label"]
+        confidence = min(baseline["confidence"], DEGRADED_BASELINE_CONFIDENCE)
+        rationale = baseline["rationale"]
+        method = baseline["method"]
+
+    if label == "other":
+        incident_type = "Unknown Incident"
+    else:
+        incident_type = ClassificationRules.get_owasp_display_name(label, show_specific=False)
+    return {
+        "fine_label": label,
+        "category": label,
+        "labels": [label],
+        "confidence": confidence,
+        "incident_type": incident_type,
+        "rationale": rationale,
+        "owasp_version": "2025",
+        "method": method,
+    }
+
+
+def fallback_classification(text: str, reason: str = "timeout") -> Dict[str, Any]:
+    """
+    Keyword-based classification for when the LLM can't answer in time.
+
+    Args:
+        text: Incident description
+        reason: Why the LLM answer is missing ("timeout", ...)
+
+    Returns:
+        keyword_classification() dict plus "degraded": True and "degraded_reason"
+    """
+    result = keyword_classification(text)
+    result["rationale"] = f"{result['rationale']} (AI analysis unavailable: {reason})"
+    result["degraded"] = True
+    result["degraded_reason"] = reason
+    return result
@@ -5,25 +5,272 @@ Handles structured JSON output for classification.
 """
 
 import os
+import re
 import json
-from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+from dataclasses import dataclass, replace
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
 import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+from .classification_cache import context_fingerprint, normalize_message
+from .classification_rules import ClassificationRules
+from .hedging import ahedge_call, get_latency_histogram, hedge_call, hedge_delay
+from .latency_budget import budget_deadline, fallback_classification, iter_within, out_of_time, run_within
+from .rate_limiter import RetryPolicy, acall_with_retry, call_with_retry, get_rate_limiter
+from .single_flight import SingleFlight
 
 # Optional OpenAI import - only needed if using ChatGPT
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
-    OpenAI = None
+    OpenAI = AsyncOpenAI = None
 
 # Optional Anthropic Claude import - for baseline comparison
 try:
-    from anthropic import Anthropic
+    from anthropic import Anthropic, AsyncAnthropic
     ANTHROPIC_AVAILABLE = True
 except ImportError:
     ANTHROPIC_AVAILABLE = False
-    Anthropic = None
+    Anthropic = AsyncAnthropic = None
+
+
+# Default max in-flight calls for aclassify_many() - providers' free tiers
+# start throttling somewhere above this
+DEFAULT_CONCURRENCY = 8
+
+# Providers spoken to through the OpenAI chat.completions interface - "fake"
+# is src/fake_llm.py's offline stand-in (model "fake*" or LLM_PROVIDER=fake)
+OPENAI_COMPATIBLE = ("openai", "fake")
+
+# How long a Gemini cached-content prefix lives, and how long to wait before
+# trying to create one again if the model/tier doesn't support it
+GEMINI_CACHE_TTL = 3600
+GEMINI_CACHE_RETRY = 3600
+
+# Overall budget (seconds) for one call when the caller gives no deadline -
+# covers rate-limit waits, retries and backoff
+DEFAULT_CALL_TIMEOUT = 60.0
+
+FALLBACK_QUESTION = (
+    "Can you provide more details about what exactly happened? For example, "
+    "what error messages did you see, or what suspicious activity did you notice?"
+)
+
+# Labels the model may pick - the ones ClassificationRules knows how to map
+FINE_LABELS = sorted(set(ClassificationRules.LABEL_TO_OWASP) | {"other"})
+INCIDENT_TYPES = sorted(
+    {f"{owasp_id}:2025 - {name}" for owasp_id, name in ClassificationRules.LABEL_TO_OWASP.values()}
+    | {"Unknown Incident"}
+)
+
+# Strict response schemas - providers that support them (OpenAI structured
+# outputs, Gemini response_schema, Anthropic forced tool use) can only return
+# JSON of this shape, so the label is always one we can map
+CLASSIFICATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "incident_type": {"type": "string", "enum": INCIDENT_TYPES},
+        "fine_label": {"type": "string", "enum": FINE_LABELS},
+        "labels": {"type": "array", "items": {"type": "string", "enum": FINE_LABELS}},
+        "confidence": {"type": "number"},
+        "rationale": {"type": "string"},
+        "owasp_version": {"type": "string", "enum": ["2025"]},
+    },
+    "required": ["incident_type", "fine_label", "labels", "confidence", "rationale", "owasp_version"],
+    "additionalProperties": False,
+}
+
+_ENTITY_KEYS = ["ips", "urls", "domains", "hashes", "cves", "emails", "filenames"]
+ENTITIES_SCHEMA = {
+    "type": "object",
+    "properties": {key: {"type": "array", "items": {"type": "string"}} for key in _ENTITY_KEYS},
+    "required": _ENTITY_KEYS,
+    "additionalProperties": False,
+}
+
+# Combined turn (analyze_turn) - the question fields sit before the long
+# rationale so they stream early. OpenAI and Anthropic keep schema property
+# order; Gemini's response_schema properties are a proto map with no order
+# (this SDK's Schema has no property_ordering), so there it may not hold
+DEFAULT_CLARIFY_THRESHOLD = 0.70
+TURN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "fine_label": CLASSIFICATION_SCHEMA["properties"]["fine_label"],
+        "confidence": CLASSIFICATION_SCHEMA["properties"]["confidence"],
+        "labels": CLASSIFICATION_SCHEMA["properties"]["labels"],
+        "incident_type": CLASSIFICATION_SCHEMA["properties"]["incident_type"],
+        "clarifying_question": {"type": "string"},
+        "rationale": CLASSIFICATION_SCHEMA["properties"]["rationale"],
+        "entities": ENTITIES_SCHEMA,
+        "owasp_version": CLASSIFICATION_SCHEMA["properties"]["owasp_version"],
+    },
+    "required": ["fine_label", "confidence", "labels", "incident_type", "clarifying_question",
+                 "rationale", "entities", "owasp_version"],
+    "additionalProperties": False,
+}
+
+# OpenAI models from before structured outputs - they only get json_object mode
+_OPENAI_NO_SCHEMA_PREFIXES = ("gpt-3.5", "gpt-4-", "o1-mini", "o1-preview")
+
+
+@dataclass(frozen=True)
+class LLMRequest:
+    """One provider-agnostic completion request."""
+    system: str
+    user: str
+    gemini_prompt: str  # Gemini has no separate system message here
+    temperature: float
+    top_p: Optional[float] = None
+    max_tokens: int = 1024  # Anthropic needs one
+    json_mode: bool = False
+    cache_system: bool = False  # system is a big static prefix - cache it provider-side
+    schema: Optional[Dict[str, Any]] = None  # strict JSON schema for the response
+    schema_name: str = "response"
+
+
+@dataclass
+class LLMUsage:
+    """Token counts and timing for provider calls (one call, or a running total)."""
+    input_tokens: int = 0          # all prompt tokens, cached or not
+    cached_input_tokens: int = 0   # read from the provider's prompt cache
+    cache_write_tokens: int = 0    # written to the prompt cache (Anthropic)
+    output_tokens: int = 0
+    latency_s: float = 0.0
+    ttft_s: float = 0.0            # time to first text chunk (streamed calls; = latency otherwise)
+    calls: int = 1
+    
+    def add(self, other: "LLMUsage") -> None:
+        self.input_tokens += other.input_tokens
+        self.cached_input_tokens += other.cached_input_tokens
+        self.cache_write_tokens += other.cache_write_tokens
+        self.output_tokens += other.output_tokens
+        self.latency_s += other.latency_s
+        self.ttft_s += other.ttft_s
+        self.calls += other.calls
+
+
+@dataclass
+class ClassificationChunk:
+    """One step of stream_classify_incident() / stream_analyze_turn()."""
+    text: str                                 # new model output since the last chunk
+    fields: Dict[str, Any]                    # top-level JSON fields complete so far
+    result: Optional[Dict[str, Any]] = None   # parsed classification (turn dict for stream_analyze_turn) - last chunk only
+    question: str = ""                        # clarifying question so far (stream_analyze_turn)
+    
+    @property
+    def label(self) -> Optional[str]:
+        return self.fields.get("fine_label")
+
+
+# A finished top-level "key": value pair in partial JSON - strings, arrays of
+# scalars, and numbers once something follows them ("0." could still grow)
+_FIELD_RE = re.compile(
+    r'"(\w+)"\s*:\s*("(?:[^"\\]|\\.)*"|\[[^\[\]{}]*\]|-?\d+(?:\.\d+)?(?=\s*[,}])|true|false|null)'
+)
+# How far back feed() rescans for a pair split across chunks - covers the
+# short fields we care about; long ones (rationale) come with the final result
+_FIELD_LOOKBACK = 256
+
+
+class PartialJSONFields:
+    """
+    Picks finished top-level fields out of a JSON object while it's still streaming.
+    
+    feed() only rescans the new text plus a small lookback, so the total work
+    stays linear in the response length.
+    """
+    
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._tail = ""  # text after the last complete pair, at most a lookback long
+    
+    def feed(self, text: str) -> Dict[str, Any]:
+        """
+        Add the next piece of model output.
+        
+        Returns:
+            All fields found so far (first value wins for repeated keys)
+        """
+        tail = self._tail + text
+        done = 0
+        for m in _FIELD_RE.finditer(tail):
+            if m.group(1) not in self.fields:
+                try:
+                    self.fields[m.group(1)] = json.loads(m.group(2))
+                except json.JSONDecodeError:
+                    continue
+            done = m.end()
+        self._tail = tail[max(done, len(tail) - _FIELD_LOOKBACK):]
+        return self.fields
+
+
+class PartialStringField:
+    """
+    One JSON string field's value, decoded as far as it has streamed in
+    (for showing a question token by token while the rest of the JSON arrives).
+    """
+    
+    def __init__(self, key: str):
+        self._start_re = re.compile(r'"%s"\s*:\s*"' % re.escape(key))
+        self._pending = ""  # text before the value starts - kept short
+        self._raw: Optional[str] = None
+        self.done = False
+        self.value = ""
+    
+    def feed(self, text: str) -> str:
+        """Add the next piece of model output, return the value so far."""
+        if self.done:
+            return self.value
+        if self._raw is None:
+            pending = self._pending + text
+            m = self._start_re.search(pending)
+            if m is None:
+                self._pending = pending[-64:]
+                return ""
+            self._raw = ""
+            text = pending[m.end():]
+        scanned = len(self._raw)
+        raw = self._raw + text
+        i = raw.find('"', scanned)
+        while i != -1:
+            backslashes = i - len(raw[:i].rstrip("\\"))
+            if backslashes % 2 == 0:  # not an escaped quote
+                raw = raw[:i]
+                self.done = True
+                break
+            i = raw.find('"', i + 1)
+        self._raw = raw
+        try:
+            self.value = json.loads('"' + _complete_escapes(raw) + '"')
+        except json.JSONDecodeError:
+            pass  # keep the last good value
+        return self.value
+
+
+def _preview_question(text: str) -> str:
+    """Partial question for display - trimmed and unquoted like _clean_question() does at the end."""
+    text = text.strip()
+    if text.startswith('"'):
+        text = text[1:]
+    if text.endswith('"'):
+        text = text[:-1]
+    return text
+
+
+def _complete_escapes(raw: str) -> str:
+    """Drop a half-received escape sequence (trailing backslash / partial \\uXXXX) from raw JSON string text."""
+    m = re.search(r'\\(u[0-9a-fA-F]{0,3})?$', raw)
+    if m and (m.start() - len(raw[:m.start()].rstrip("\\"))) % 2 == 0:
+        return raw[:m.start()]
+    return raw
 
 
 class LLMAdapter:
@@ -42,29 +289,84 @@ class LLMAdapter:
                 api_key = os.getenv("ANTHROPIC_API_KEY")
             else:
                 api_key = os.getenv("GEMINI_API_KEY") or os.getenv("OPENAI_API_KEY")
+        self._api_key = api_key
+        self._async_client = None  # override; normally the shared one per event loop
         
-        # Initialize provider-specific client
-        if self.provider == "openai":
-            if not OPENAI_AVAILABLE:
-                raise ImportError("openai package not installed. Install with: pip install openai")
-            self.client = OpenAI(api_key=api_key)
-            self.model = model  # OpenAI uses model name directly
-        elif self.provider == "anthropic":
-            if not ANTHROPIC_AVAILABLE:
-                raise ImportError("anthropic package not installed. Install with: pip install anthropic")
-            self.client = Anthropic(api_key=api_key)
-            self.model = model  # Anthropic uses model name directly
+        # 429s / transient 5xx are retried with backoff, paced by a limiter
+        # shared by everything using this provider + key
+        self.retry_policy = RetryPolicy()
+        self.rate_limiter = get_rate_limiter(self.provider, key_fingerprint(api_key))
+        self.call_timeout = DEFAULT_CALL_TIMEOUT
+        
+        # Cache the static classification prompt provider-side (Gemini cached
+        # content / Anthropic cache_control; OpenAI caches prefixes by itself)
+        self.prompt_caching = True
+        self.last_usage: Optional[LLMUsage] = None
+        self.usage_totals = LLMUsage(calls=0)
+        self._usage_lock = threading.Lock()
+        
+        # Hedging (off by default) - see enable_hedging()
+        self.hedge: Optional["LLMAdapter"] = None
+        self.hedge_delay: Optional[float] = None  # None = primary's observed p95
+        self.hedge_stats = {"hedged": 0, "secondary_wins": 0}
+        self.latency = get_latency_histogram(self.provider, model)
+        
+        # Identical classifications already in flight (any adapter, thread or
+        # event loop) are waited for instead of sent again - see _in_flight
+        self.coalesce = True
+        
+        # SDK clients come from the process-wide registry - sessions and calls
+        # with the same provider/model/key share one client and its
+        # keep-alive connections instead of redoing setup + TLS every time
+        client = get_provider_client(self.provider, model, api_key)
+        if self.provider in OPENAI_COMPATIBLE + ("anthropic",):
+            self.client = client
+            self.model = model  # OpenAI/Anthropic use the model name directly
         else:
-            # Gemini
-            genai.configure(api_key=api_key)
-            # Model path handling - Gemini needs "models/" prefix
-            if not model.startswith("models/"):
-                model = f"models/{model}"
-            self.model = genai.GenerativeModel(model)
-            self.model_name = model
+            # Gemini - client is a GenerativeModel
+            self.model = client
+            self.model_name = client.model_name
+    
+    def enable_hedging(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        delay: Optional[float] = None
+    ) -> None:
+        """
+        Hedge blocking calls to a second provider.
+        
+        A request this adapter's provider hasn't answered after `delay` seconds
+        (default: its observed p95 latency) is sent to `model` as well, and the
+        first valid answer is used. Streaming calls aren't hedged.
+        
+        Args:
+            model: Secondary model (normally another provider's)
+            api_key: Key for the secondary (default: from env, like LLMAdapter())
+            delay: Fixed hedge delay in seconds instead of the observed p95
+        """
+        self.hedge = LLMAdapter(api_key=api_key, model=model)
+        self.hedge.prompt_caching = self.prompt_caching
+        self.hedge_delay = delay
+    
+    def disable_hedging(self) -> None:
+        self.hedge = None
+    
+    def prompt_fingerprint(self, clarify_threshold: float = DEFAULT_CLARIFY_THRESHOLD) -> str:
+        """
+        Hash of the prompt and schema a turn is classified with - part of the
+        classification cache key, so editing the prompt retires old answers.
+        """
+        request = self._turn_request("{description}", "{context}", None, "{history}", clarify_threshold)
+        parts = (request.system, request.user, json.dumps(request.schema, sort_keys=True))
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
     
     def _detect_provider(self, model: str, api_key: Optional[str] = None) -> str:
         """Detect which provider to use based on model name or API key format."""
+        # Offline fake provider - for load tests / runs without keys
+        if model.startswith("fake") or os.getenv("LLM_PROVIDER", "").lower() == "fake":
+            return "fake"
+        
         # Check model name first
         if model.startswith("gpt-") or model.startswith("o1-") or model.startswith("o3-"):
             return "openai"
@@ -90,12 +392,579 @@ class LLMAdapter:
         description: str, 
         context: str = "", 
         system_prompt: Optional[str] = None,
-        conversation_history: Optional[str] = None
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None,
+        budget: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Classify an incident description into OWASP categories.
         Returns dict with category, confidence, rationale.
+        
+        deadline is a time.monotonic() value - rate-limit waits and retries stop
+        there (default: call_timeout seconds from now).
+        
+        budget (seconds) is a hard limit on the whole call: when it runs out the
+        call is abandoned and the keyword fallback is returned instead, marked
+        "degraded": True (see latency_budget.fallback_classification).
+        """
+        if budget is not None:
+            deadline = budget_deadline(budget, deadline)
+            return self._within_budget(
+                lambda: self.classify_incident(description, context, system_prompt, conversation_history, deadline),
+                deadline, lambda: fallback_classification(description)
+            )
+        if not self.coalesce:
+            return self._classify(description, context, system_prompt, conversation_history, deadline)
+        key = self._flight_key("classify", description, context, system_prompt, conversation_history)
+        result, _ = _in_flight.do(
+            key, lambda: self._classify(description, context, system_prompt, conversation_history, deadline),
+            self._deadline(deadline)
+        )
+        return result
+    
+    async def aclassify_incident(
+        self, 
+        description: str, 
+        context: str = "", 
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None,
+        budget: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Async version of classify_incident() - same prompt, same output."""
+        if budget is not None:
+            deadline = budget_deadline(budget, deadline)
+            return await self._awithin_budget(
+                self.aclassify_incident(description, context, system_prompt, conversation_history, deadline),
+                deadline, lambda: fallback_classification(description)
+            )
+        if not self.coalesce:
+            return await self._aclassify(description, context, system_prompt, conversation_history, deadline)
+        key = self._flight_key("classify", description, context, system_prompt, conversation_history)
+        result, _ = await _in_flight.ado(
+            key, lambda: self._aclassify(description, context, system_prompt, conversation_history, deadline),
+            self._deadline(deadline)
+        )
+        return result
+    
+    async def aclassify_many(
+        self,
+        descriptions: Iterable[str],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        context: str = "",
+        system_prompt: Optional[str] = None,
+        return_exceptions: bool = False,
+        deadline: Optional[float] = None
+    ) -> List[Any]:
+        """
+        Classify a batch of descriptions with up to `concurrency` requests in flight.
+        
+        Network latency overlaps instead of adding up, so throughput scales with
+        the limit until the provider's rate limit kicks in.
+        
+        Args:
+            descriptions: Incident descriptions
+            concurrency: Max simultaneous API calls
+            context: Extra context sent with every description
+            system_prompt: Override the default classification prompt
+            return_exceptions: True = a failed call puts its exception in that
+                               slot, False = the first failure is raised
+            deadline: time.monotonic() every call must finish by (default:
+                      call_timeout per call)
+        
+        Returns:
+            List of classification dicts, same order as descriptions
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        limit = asyncio.Semaphore(concurrency)
+        
+        async def one(description: str) -> Dict[str, Any]:
+            async with limit:
+                return await self.aclassify_incident(
+                    description, context=context, system_prompt=system_prompt, deadline=deadline
+                )
+        
+        return await asyncio.gather(
+            *(one(d) for d in descriptions), return_exceptions=return_exceptions
+        )
+    
+    def classify_many(
+        self,
+        descriptions: Iterable[str],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        context: str = "",
+        system_prompt: Optional[str] = None,
+        return_exceptions: bool = False,
+        deadline: Optional[float] = None
+    ) -> List[Any]:
+        """
+        Blocking wrapper around aclassify_many() for scripts without an event loop.
+        Same args/return - see aclassify_many().
+        """
+        async def run() -> List[Any]:
+            try:
+                return await self.aclassify_many(
+                    descriptions, concurrency=concurrency, context=context,
+                    system_prompt=system_prompt, return_exceptions=return_exceptions, deadline=deadline
+                )
+            finally:
+                # the loop dies with asyncio.run - close its connections while it's still up
+                await aclose_provider_clients()
+        
+        return asyncio.run(run())
+
+    def classify_batch(
+        self,
+        requests,
+        output_path: str,
+        mode: str = "auto",
+        concurrency: int = DEFAULT_CONCURRENCY,
+        poll_interval: Optional[float] = None,
+        progress=None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Offline batch classification for evaluation runs - see src/batch_inference.py.
+
+        Args:
+            requests: JSONL path or dicts with "id", "description" (+ optional
+                      "context", "conversation_history")
+            output_path: Output JSONL, also the checkpoint - rerunning with the
+                         same path only does what's left
+            mode: "provider" (OpenAI / Anthropic batch endpoint), "local"
+                  (bounded worker pool) or "auto" (provider when available)
+            concurrency: Max in-flight calls in local mode
+            poll_interval: Seconds between provider batch status checks
+            progress: Optional callback(done, total)
+
+        Returns:
+            {request id: {"id", "result": classification} or {"id", "error"}}
+        """
+        from .batch_inference import BATCH_POLL_INTERVAL, run_batch
+
+        return run_batch(
+            self, requests, output_path, mode=mode, concurrency=concurrency,
+            poll_interval=BATCH_POLL_INTERVAL if poll_interval is None else poll_interval, progress=progress
+        )
+
+    def extract_entities(self, text: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Extract IOCs and entities from incident description."""
+        return self._parse_entities(self._complete(self._entities_request(text), deadline))
+    
+    async def aextract_entities(self, text: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Async version of extract_entities()."""
+        return self._parse_entities(await self._acomplete(self._entities_request(text), deadline))
+    
+    def generate_clarifying_question(
+        self,
+        incident_description: str,
+        current_classification: Dict[str, Any],
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> str:
+        """
+        Generate a clarifying question when confidence is low.
+        Makes the conversation feel more natural and empathetic.
+        """
+        request = self._question_request(incident_description, current_classification, conversation_history)
+        try:
+            return self._clean_question(self._complete(request, deadline))
+        except Exception:
+            return FALLBACK_QUESTION
+    
+    async def agenerate_clarifying_question(
+        self,
+        incident_description: str,
+        current_classification: Dict[str, Any],
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> str:
+        """Async version of generate_clarifying_question()."""
+        request = self._question_request(incident_description, current_classification, conversation_history)
+        try:
+            return self._clean_question(await self._acomplete(request, deadline))
+        except Exception:
+            return FALLBACK_QUESTION
+    
+    # ============================================
+    # Streaming - text shows up as the model writes it
+    # ============================================
+    
+    def stream_classify_incident(
+        self, 
+        description: str, 
+        context: str = "", 
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Iterator[ClassificationChunk]:
+        """
+        Streaming version of classify_incident().
+        
+        Yields a ClassificationChunk per piece of model output, with the JSON
+        fields parsed so far - fine_label / confidence / labels are available
+        as soon as the model has written them. The last chunk carries the full
+        parsed result (same dict classify_incident() would return).
+        """
+        request = self._classification_request(description, context, system_prompt, conversation_history)
+        parser = PartialJSONFields()
+        parts = []
+        try:
+            for text in self._stream(request, deadline):
+                parts.append(text)
+                yield ClassificationChunk(text, dict(parser.feed(text)))
+            result, content = self._complete_json(request, deadline, streamed="".join(parts))
+        except Exception as e:
+            if self.provider == "gemini":
+                print(f"Error calling Gemini API: {str(e)}")
+            raise
+        yield ClassificationChunk("", dict(parser.fields), result=self._normalize_classification(result, content))
+    
+    async def astream_classify_incident(
+        self, 
+        description: str, 
+        context: str = "", 
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[ClassificationChunk]:
+        """Async version of stream_classify_incident()."""
+        request = self._classification_request(description, context, system_prompt, conversation_history)
+        parser = PartialJSONFields()
+        parts = []
+        try:
+            async for text in self._astream(request, deadline):
+                parts.append(text)
+                yield ClassificationChunk(text, dict(parser.feed(text)))
+            result, content = await self._acomplete_json(request, deadline, streamed="".join(parts))
+        except Exception as e:
+            if self.provider == "gemini":
+                print(f"Error calling Gemini API: {str(e)}")
+            raise
+        yield ClassificationChunk("", dict(parser.fields), result=self._normalize_classification(result, content))
+    
+    def stream_clarifying_question(
+        self,
+        incident_description: str,
+        current_classification: Dict[str, Any],
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Streaming version of generate_clarifying_question() - yields the question
+        piece by piece, trimmed and unquoted like the blocking version.
+        Falls back to FALLBACK_QUESTION if the call fails before any text arrives.
+        """
+        request = self._question_request(incident_description, current_classification, conversation_history)
+        sent = False
+        try:
+            for text in _clean_question_stream(self._stream(request, deadline)):
+                sent = True
+                yield text
+        except Exception:
+            if not sent:
+                yield FALLBACK_QUESTION
+    
+    async def astream_clarifying_question(
+        self,
+        incident_description: str,
+        current_classification: Dict[str, Any],
+        conversation_history: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Async version of stream_clarifying_question()."""
+        request = self._question_request(incident_description, current_classification, conversation_history)
+        sent = False
+        try:
+            async for text in _aclean_question_stream(self._astream(request, deadline)):
+                sent = True
+                yield text
+        except Exception:
+            if not sent:
+                yield FALLBACK_QUESTION
+    
+    # ============================================
+    # Combined turn - classification, entities and question in one call
+    # ============================================
+    
+    def analyze_turn(
+        self,
+        description: str,
+        context: str = "",
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[str] = None,
+        clarify_threshold: float = DEFAULT_CLARIFY_THRESHOLD,
+        deadline: Optional[float] = None,
+        budget: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Classify a chat turn, extract its entities and (if needed) write the
+        clarifying question - one structured response instead of up to three
+        round trips.
+        
+        Args:
+            description: The user's message
+            context: Extra context (KB, keyword hints, CVEs)
+            system_prompt: Override the default classification prompt
+            conversation_history: Conversation so far
+            clarify_threshold: Ask a question when confidence is below this
+            deadline: time.monotonic() to give up by
+            budget: Hard limit in seconds - past it the turn falls back to the
+                    keyword classification (classification["degraded"] is True)
+        
+        Returns:
+            {"classification": same dict classify_incident() returns,
+             "entities": {"ips": [...], "urls": [...], ...},
+             "clarifying_question": question, or None at/above the threshold}
+        """
+        if budget is not None:
+            deadline = budget_deadline(budget, deadline)
+            return self._within_budget(
+                lambda: self.analyze_turn(
+                    description, context, system_prompt, conversation_history, clarify_threshold, deadline
+                ),
+                deadline, lambda: self._fallback_turn(description, clarify_threshold)
+            )
+        call = lambda: self._analyze_turn(
+            description, context, system_prompt, conversation_history, clarify_threshold, deadline
+        )
+        if not self.coalesce:
+            return call()
+        key = self._flight_key("turn", description, context, system_prompt, conversation_history, clarify_threshold)
+        turn, _ = _in_flight.do(key, call, self._deadline(deadline))
+        return turn
+    
+    async def aanalyze_turn(
+        self,
+        description: str,
+        context: str = "",
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[str] = None,
+        clarify_threshold: float = DEFAULT_CLARIFY_THRESHOLD,
+        deadline: Optional[float] = None,
+        budget: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Async version of analyze_turn()."""
+        if budget is not None:
+            deadline = budget_deadline(budget, deadline)
+            return await self._awithin_budget(
+                self.aanalyze_turn(description, context, system_prompt, conversation_history, clarify_threshold, deadline),
+                deadline, lambda: self._fallback_turn(description, clarify_threshold)
+            )
+        call = lambda: self._aanalyze_turn(
+            description, context, system_prompt, conversation_history, clarify_threshold, deadline
+        )
+        if not self.coalesce:
+            return await call()
+        key = self._flight_key("turn", description, context, system_prompt, conversation_history, clarify_threshold)
+        turn, _ = await _in_flight.ado(key, call, self._deadline(deadline))
+        return turn
+    
+    def stream_analyze_turn(
+        self,
+        description: str,
+        context: str = "",
+        system_prompt: Optional[str] = None,
+        conversation_history: Optional[str] = None,
+        clarify_threshold: float = DEFAULT_CLARIFY_THRESHOLD,
+        deadline: Optional[float] = None,
+        budget: Optional[float] = None
+    ) -> Iterator[ClassificationChunk]:
+        """
+        Streaming version of analyze_turn().
+        
+        Chunks carry the finished fields (label first) and the clarifying
+        question as far as it's written; the last chunk's result is the dict
+        analyze_turn() would return. With a budget, running out of time ends
+        the stream with a chunk carrying the degraded fallback turn.
+        """
+        if budget is not None:
+            deadline = budget_deadline(budget, deadline)
+            finished = False
+            try:
+                for chunk in iter_within(
+                    lambda: self.stream_analyze_turn(
+                        description, context, system_prompt, conversation_history, clarify_threshold, deadline
+                    ),
+                    deadline
+                ):
+                    finished = chunk.result is not None
+                    yield chunk
+            except Exception as e:
+                if finished or not out_of_time(e, deadline):
+                    raise
+                turn = self._fallback_turn(description, clarify_threshold)
+                yield ClassificationChunk("", {}, result=turn, question=turn["clarifying_question"] or "")
+            return
+        flight = None
+        if self.coalesce:
+            # Same turn already being streamed (or analyzed) - its finished
+            # result comes as the only chunk
+            key = self._flight_key("turn", description, context, system_prompt, conversation_history, clarify_threshold)
+            flight, shared, turn = _in_flight.claim(key, self._deadline(deadline))
+            if shared:
+                yield ClassificationChunk("", _turn_fields(turn), result=turn, question=turn["clarifying_question"] or "")
+                return
+        try:
+            for chunk in self._stream_turn(
+                description, context, system_prompt, conversation_history, clarify_threshold, deadline
+            ):
+                if chunk.result is not None and flight is not None:
+                    # before the yield - the caller may stop right after the result
+                    _in_flight.finish(key, flight, chunk.result)
+                    flight = None
+                yield chunk
+        except BaseException as e:
+            if flight is not None:
+                _in_flight.finish(key, flight, error=e)
+            raise
+    
+    # ============================================
+    # One call each - the public methods above add budgets and coalescing
+    # ============================================
+    
+    def _classify(
+        self,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str],
+        deadline: Optional[float]
+    ) -> Dict[str, Any]:
+        """One classification call - classify_incident() minus budget and coalescing."""
+        request = self._classification_request(description, context, system_prompt, conversation_history)
+        try:
+            result, content = self._complete_json(request, deadline)
+        except Exception as e:
+            if self.provider == "gemini":
+                # API call failed completely
+                print(f"Error calling Gemini API: {str(e)}")
+            raise
+        return self._normalize_classification(result, content)
+    
+    async def _aclassify(
+        self,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str],
+        deadline: Optional[float]
+    ) -> Dict[str, Any]:
+        """Async version of _classify()."""
+        request = self._classification_request(description, context, system_prompt, conversation_history)
+        try:
+            result, content = await self._acomplete_json(request, deadline)
+        except Exception as e:
+            if self.provider == "gemini":
+                print(f"Error calling Gemini API: {str(e)}")
+            raise
+        return self._normalize_classification(result, content)
+    
+    def _flight_key(
+        self,
+        kind: str,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str],
+        *extra: Any
+    ) -> Tuple[Any, ...]:
+        """
+        Key identical in-flight calls share - what the classification cache
+        keys on (normalized message, context fingerprint, model, prompt), plus
+        the kind of call and its own options.
         """
+        prompt = "-" if system_prompt is None else hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+        return (kind, self.provider, self.model_name, normalize_message(description),
+                context_fingerprint(context, conversation_history), prompt) + extra
+    
+    def _analyze_turn(
+        self,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str],
+        clarify_threshold: float,
+        deadline: Optional[float]
+    ) -> Dict[str, Any]:
+        request = self._turn_request(description, context, system_prompt, conversation_history, clarify_threshold)
+        try:
+            result, content = self._complete_json(request, deadline)
+        except Exception as e:
+            if self.provider == "gemini":
+                print(f"Error calling Gemini API: {str(e)}")
+            raise
+        turn = self._turn_result(result, content, clarify_threshold)
+        if turn["clarifying_question"] == "":
+            # Model left it out - rare with a schema, worth the extra call
+            turn["clarifying_question"] = self.generate_clarifying_question(
+                description, turn["classification"], conversation_history, deadline
+            )
+        return turn
+    
+    async def _aanalyze_turn(
+        self,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str],
+        clarify_threshold: float,
+        deadline: Optional[float]
+    ) -> Dict[str, Any]:
+        request = self._turn_request(description, context, system_prompt, conversation_history, clarify_threshold)
+        try:
+            result, content = await self._acomplete_json(request, deadline)
+        except Exception as e:
+            if self.provider == "gemini":
+                print(f"Error calling Gemini API: {str(e)}")
+            raise
+        turn = self._turn_result(result, content, clarify_threshold)
+        if turn["clarifying_question"] == "":
+            turn["clarifying_question"] = await self.agenerate_clarifying_question(
+                description, turn["classification"], conversation_history, deadline
+            )
+        return turn
+    
+    def _stream_turn(
+        self,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str],
+        clarify_threshold: float,
+        deadline: Optional[float]
+    ) -> Iterator[ClassificationChunk]:
+        request = self._turn_request(description, context, system_prompt, conversation_history, clarify_threshold)
+        parser = PartialJSONFields()
+        question = PartialStringField("clarifying_question")
+        parts = []
+        try:
+            for text in self._stream(request, deadline):
+                parts.append(text)
+                yield ClassificationChunk(text, dict(parser.feed(text)), question=_preview_question(question.feed(text)))
+            result, content = self._complete_json(request, deadline, streamed="".join(parts))
+        except Exception as e:
+            if self.provider == "gemini":
+                print(f"Error calling Gemini API: {str(e)}")
+            raise
+        turn = self._turn_result(result, content, clarify_threshold)
+        if turn["clarifying_question"] == "":
+            turn["clarifying_question"] = self.generate_clarifying_question(
+                description, turn["classification"], conversation_history, deadline
+            )
+        yield ClassificationChunk("", dict(parser.fields), result=turn, question=turn["clarifying_question"] or "")
+    
+    # ============================================
+    # Requests - built once, sent by the sync or async client
+    # ============================================
+    
+    def _classification_request(
+        self,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str]
+    ) -> LLMRequest:
         if system_prompt is None:
             system_prompt = self._get_default_classification_prompt()
         
@@ -114,116 +983,44 @@ class LLMAdapter:
         prompt_parts.append("\n\nAnalyze the CURRENT USER MESSAGE considering the full conversation history. Understand the user's emotions, urgency, and what they're really trying to say.")
         prompt_parts.append("\nRespond with valid JSON only.")
         
-        prompt = "\n".join(prompt_parts)
-        
-        # Call appropriate API based on provider
-        if self.provider == "openai":
-            # OpenAI/ChatGPT API call
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": "\n".join(prompt_parts[1:])}  # Skip system prompt in user message
-                ],
-                temperature=0.1,
-                top_p=0.95,
-                response_format={"type": "json_object"}
-            )
-            result = json.loads(response.choices[0].message.content)
-        elif self.provider == "anthropic":
-            # Anthropic Claude API call
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": "\n".join(prompt_parts[1:])}
-                ],
-                temperature=0.1
-            )
-            # Claude returns text, need to extract JSON
-            content = response.content[0].text
-            # Try to extract JSON from response
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # If not pure JSON, try to extract JSON block
-                import re
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                else:
-                    raise ValueError(f"Could not parse JSON from Claude response: {content[:200]}")
-        else:
-            # Gemini API call
-            try:
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=genai.GenerationConfig(
-                        temperature=0.1,  # Slight randomness for better semantic understanding
-                        top_p=0.95,
-                        response_mime_type="application/json"
-                    )
-                )
-                # Handle potential JSON parsing errors
-                try:
-                    result = json.loads(response.text)
-                except json.JSONDecodeError as e:
-                    # Try to extract JSON from response if it's wrapped in text
-                    import re
-                    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response.text, re.DOTALL)
-                    if json_match:
-                        result = json.loads(json_match.group())
-                    else:
-                        # If JSON parsing completely fails, return a safe fallback
-                        print(f"Warning: Failed to parse JSON from Gemini response: {response.text[:200]}")
-                        return {
-                            "fine_label": "other",
-                            "category": "other",
-                            "confidence": 0.3,
-                            "rationale": "LLM returned invalid JSON format",
-                            "incident_type": "Unknown Incident",
-                            "owasp_version": "2025"
-                        }
-            except Exception as e:
-                # API call failed completely
-                print(f"Error calling Gemini API: {str(e)}")
-                raise
-        
-        # Normalize different output formats (LLM sometimes returns different keys)
-        # Had issues with this - Gemini sometimes uses "category", sometimes "fine_label"
-        # Prefer fine_label first (it's the most specific and correct)
-        if "fine_label" in result:
-            result["category"] = result["fine_label"]
-        elif "incident_type" in result:
-            # Handle "A01:2025 - Broken Access Control" format
-            incident_type = result["incident_type"]
-            if " - " in incident_type:
-                # Extract category name after the dash (e.g., "A01:2025 - Broken Access Control" -> "broken_access_control")
-                category = incident_type.split(" - ", 1)[1].strip().lower().replace(" ", "_")
-            elif ":" in incident_type:
-                # Fallback: extract from after colon (e.g., "A01: Broken Access Control" -> "broken_access_control")
-                parts = incident_type.split(":", 1)
-                if len(parts) > 1:
-                    category = parts[1].strip().lower().replace(" ", "_")
-                else:
-                    category = incident_type.lower().replace(" ", "_")
-            else:
-                category = incident_type.lower().replace(" ", "_")
-            result["category"] = category
-        
-        # Ensure category exists
-        if "category" not in result:
-            result["category"] = "other"
-        
-        # Ensure owasp_version is set to 2025
-        if "owasp_version" not in result:
-            result["owasp_version"] = "2025"
-            
-        return result
+        return LLMRequest(
+            system=system_prompt,
+            user="\n".join(prompt_parts[1:]),  # Skip system prompt in user message
+            gemini_prompt="\n".join(prompt_parts),  # Gemini gets it all in one prompt
+            temperature=0.1,  # Slight randomness for better semantic understanding
+            top_p=0.95,
+            max_tokens=2048,
+            json_mode=True,
+            cache_system=True,
+            schema=CLASSIFICATION_SCHEMA,
+            schema_name="incident_classification",
+        )
     
-    def extract_entities(self, text: str) -> Dict[str, Any]:
-        """Extract IOCs and entities from incident description."""
+    def _turn_request(
+        self,
+        description: str,
+        context: str,
+        system_prompt: Optional[str],
+        conversation_history: Optional[str],
+        clarify_threshold: float
+    ) -> LLMRequest:
+        # Same system prompt as plain classification, so the cached prefix is shared
+        base = self._classification_request(description, context, system_prompt, conversation_history)
+        extra = f"""
+
+In the same JSON object also return:
+- "entities": security indicators in the CURRENT USER MESSAGE - ips, urls, domains, hashes, cves, emails, filenames (empty lists when there are none).
+- "clarifying_question": if your confidence is below {clarify_threshold:.2f}, ONE friendly, conversational question that would clear up what happened (what exactly happened, where, when, what was affected). Be empathetic - the user may be stressed or not technical - and don't make them feel stupid. If your confidence is {clarify_threshold:.2f} or higher, an empty string."""
+        return replace(
+            base,
+            user=base.user + extra,
+            gemini_prompt=base.gemini_prompt + extra,
+            max_tokens=3072,
+            schema=TURN_SCHEMA,
+            schema_name="incident_turn",
+        )
+    
+    def _entities_request(self, text: str) -> LLMRequest:
         prompt = """You are an expert at extracting security indicators from incident reports.
 Extract IPs, URLs, domains, file hashes, CVEs, and other technical entities.
 Return JSON with keys: ips, urls, domains, hashes, cves, emails, filenames.
@@ -231,56 +1028,23 @@ Return JSON with keys: ips, urls, domains, hashes, cves, emails, filenames.
 Text: """ + text + """
 
 Respond with valid JSON only."""
-        
-        if self.provider == "openai":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert at extracting security indicators from incident reports."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
-        elif self.provider == "anthropic":
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                system="You are an expert at extracting security indicators from incident reports.",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2
-            )
-            content = response.content[0].text
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                import re
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
-                else:
-                    return {"ips": [], "urls": [], "domains": [], "hashes": [], "cves": [], "emails": [], "filenames": []}
-        else:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.2,
-                    response_mime_type="application/json"
-                )
-            )
-            return json.loads(response.text)
+        return LLMRequest(
+            system="You are an expert at extracting security indicators from incident reports.",
+            user=prompt,
+            gemini_prompt=prompt,
+            temperature=0.2,
+            max_tokens=1024,
+            json_mode=True,
+            schema=ENTITIES_SCHEMA,
+            schema_name="security_entities",
+        )
     
-    def generate_clarifying_question(
+    def _question_request(
         self,
         incident_description: str,
         current_classification: Dict[str, Any],
-        conversation_history: Optional[str] = None
-    ) -> str:
-        """
-        Generate a clarifying question when confidence is low.
-        Makes the conversation feel more natural and empathetic.
-        """
+        conversation_history: Optional[str]
+    ) -> LLMRequest:
         confidence = current_classification.get("confidence", 0.0)
         incident_type = current_classification.get("incident_type", "Unknown")
         
@@ -318,43 +1082,497 @@ Keep it natural and conversational, like you're talking to a colleague. Don't be
 
 Return only the question text, nothing else."""
 
-        try:
-            if self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful, understanding security incident response assistant."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    top_p=0.9
-                )
-                question = response.choices[0].message.content.strip()
+        return LLMRequest(
+            system="You are a helpful, understanding security incident response assistant.",
+            user=prompt,
+            gemini_prompt=prompt,
+            temperature=0.7,  # More creative for natural questions
+            top_p=0.9,
+            max_tokens=256,
+        )
+    
+    def _request_kwargs(self, request: LLMRequest) -> Dict[str, Any]:
+        """Provider-specific create()/generate_content() kwargs for a request."""
+        if self.provider in OPENAI_COMPATIBLE:
+            kwargs = {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": request.system},
+                    {"role": "user", "content": request.user}
+                ],
+                "temperature": request.temperature,
+            }
+            if request.top_p is not None:
+                kwargs["top_p"] = request.top_p
+            if request.schema is not None and not self.model.startswith(_OPENAI_NO_SCHEMA_PREFIXES):
+                kwargs["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": {"name": request.schema_name, "strict": True, "schema": request.schema},
+                }
+            elif request.json_mode:
+                kwargs["response_format"] = {"type": "json_object"}
+            return kwargs
+        elif self.provider == "anthropic":
+            system: Any = request.system
+            if request.cache_system and self.prompt_caching:
+                # Cache breakpoint after the static prompt - later calls only pay
+                # full price for the conversation part
+                system = [{"type": "text", "text": request.system, "cache_control": {"type": "ephemeral"}}]
+            kwargs = {
+                "model": self.model,
+                "max_tokens": request.max_tokens,
+                "system": system,
+                "messages": [{"role": "user", "content": request.user}],
+                "temperature": request.temperature,
+            }
+            if request.schema is not None:
+                # Claude has no JSON mode - a forced tool call with the schema as
+                # its input is how it returns structured output
+                kwargs["tools"] = [{
+                    "name": request.schema_name,
+                    "description": "Return the result in this structure.",
+                    "input_schema": request.schema,
+                }]
+                kwargs["tool_choice"] = {"type": "tool", "name": request.schema_name}
+            return kwargs
+        config = {"temperature": request.temperature}
+        if request.top_p is not None:
+            config["top_p"] = request.top_p
+        if request.json_mode:
+            config["response_mime_type"] = "application/json"
+        if request.schema is not None:
+            config["response_schema"] = _gemini_schema(request.schema)
+        return {
+            # with the static prefix cached, only the dynamic part is sent
+            "contents": request.user if self._gemini_prefix(request) else request.gemini_prompt,
+            "generation_config": genai.GenerationConfig(**config),
+        }
+    
+    def _response_text(self, response) -> str:
+        if self.provider in OPENAI_COMPATIBLE:
+            return response.choices[0].message.content
+        elif self.provider == "anthropic":
+            block = response.content[0]
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+            return block.text
+        return response.text
+    
+    def _complete(self, request: LLMRequest, deadline: Optional[float] = None) -> str:
+        """Send a request with the blocking client (hedged if enabled), return the response text."""
+        if self.hedge is None:
+            return self._complete_once(request, deadline)
+        deadline = self._deadline(deadline)
+        text, from_secondary = hedge_call(
+            lambda: self._complete_once(request, deadline),
+            lambda: self.hedge._complete_once(request, deadline),
+            self._hedge_delay(), valid=self._hedge_valid(request), on_hedge=self._count_hedge
+        )
+        if from_secondary:
+            self._count_hedge("secondary_wins")
+        return text
+    
+    async def _acomplete(self, request: LLMRequest, deadline: Optional[float] = None) -> str:
+        """Async version of _complete() - the losing hedged call is cancelled."""
+        if self.hedge is None:
+            return await self._acomplete_once(request, deadline)
+        deadline = self._deadline(deadline)
+        text, from_secondary = await ahedge_call(
+            lambda: self._acomplete_once(request, deadline),
+            lambda: self.hedge._acomplete_once(request, deadline),
+            self._hedge_delay(), valid=self._hedge_valid(request), on_hedge=self._count_hedge
+        )
+        if from_secondary:
+            self._count_hedge("secondary_wins")
+        return text
+    
+    def _hedge_delay(self) -> float:
+        return self.hedge_delay if self.hedge_delay is not None else hedge_delay(self.latency)
+    
+    def _hedge_valid(self, request: LLMRequest):
+        """A hedged answer counts once it's usable - parseable JSON for JSON requests, any text otherwise."""
+        if request.json_mode or request.schema is not None:
+            return _has_json_object
+        return lambda text: bool(text and text.strip())
+    
+    def _count_hedge(self, outcome: str = "hedged") -> None:
+        with self._usage_lock:
+            self.hedge_stats[outcome] += 1
+    
+    def _complete_once(self, request: LLMRequest, deadline: Optional[float] = None) -> str:
+        """Send a request with the blocking client (rate-limited, retried), return the response text."""
+        kwargs = self._request_kwargs(request)
+        
+        def attempt(timeout: Optional[float]) -> str:
+            timeout_kwargs = self._timeout_kwargs(timeout)
+            started = time.perf_counter()
+            if self.provider in OPENAI_COMPATIBLE:
+                response = self.client.chat.completions.create(**kwargs, **timeout_kwargs)
             elif self.provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=256,
-                    system="You are a helpful, understanding security incident response assistant.",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7
-                )
-                question = response.content[0].text.strip()
+                response = self.client.messages.create(**kwargs, **timeout_kwargs)
             else:
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=genai.GenerationConfig(
-                        temperature=0.7,  # More creative for natural questions
-                        top_p=0.9,
-                    )
+                response = self._gemini_model(request).generate_content(**kwargs, **timeout_kwargs)
+            self._record_usage(response, time.perf_counter() - started)
+            return self._response_text(response)
+        
+        return call_with_retry(attempt, self.rate_limiter, self.retry_policy, self._deadline(deadline))
+    
+    async def _acomplete_once(self, request: LLMRequest, deadline: Optional[float] = None) -> str:
+        """Send a request with the async client (rate-limited, retried), return the response text."""
+        kwargs = self._request_kwargs(request)
+        
+        async def attempt(timeout: Optional[float]) -> str:
+            timeout_kwargs = self._timeout_kwargs(timeout)
+            started = time.perf_counter()
+            if self.provider in OPENAI_COMPATIBLE:
+                response = await self._get_async_client().chat.completions.create(**kwargs, **timeout_kwargs)
+            elif self.provider == "anthropic":
+                response = await self._get_async_client().messages.create(**kwargs, **timeout_kwargs)
+            else:
+                response = await self._gemini_model(request).generate_content_async(**kwargs, **timeout_kwargs)
+            self._record_usage(response, time.perf_counter() - started)
+            return self._response_text(response)
+        
+        return await acall_with_retry(attempt, self.rate_limiter, self.retry_policy, self._deadline(deadline))
+    
+    def _complete_json(
+        self,
+        request: LLMRequest,
+        deadline: Optional[float] = None,
+        streamed: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Send a classification-style request and load its JSON.
+        
+        If the response has no JSON it's asked once more at temperature 0 -
+        cheaper than sending the user round another clarification turn on an
+        "other"/0.3 fallback.
+        
+        Args:
+            request: The request
+            deadline: time.monotonic() to give up by
+            streamed: Response text already received by streaming (don't send again)
+        
+        Returns:
+            (parsed JSON object or None, response text it came from)
+        """
+        content = streamed if streamed is not None else self._complete(request, deadline)
+        result = _load_classification(content)
+        if result is None:
+            _count_parse("retried")
+            content = self._complete(replace(request, temperature=0.0), deadline)
+            result = _load_classification(content)
+        return result, content
+    
+    async def _acomplete_json(
+        self,
+        request: LLMRequest,
+        deadline: Optional[float] = None,
+        streamed: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Async version of _complete_json()."""
+        content = streamed if streamed is not None else await self._acomplete(request, deadline)
+        result = _load_classification(content)
+        if result is None:
+            _count_parse("retried")
+            content = await self._acomplete(replace(request, temperature=0.0), deadline)
+            result = _load_classification(content)
+        return result, content
+    
+    def _open_stream(self, request: LLMRequest, kwargs: Dict[str, Any], timeout: Optional[float]):
+        timeout_kwargs = self._timeout_kwargs(timeout)
+        if self.provider in OPENAI_COMPATIBLE:
+            return self.client.chat.completions.create(
+                **kwargs, **timeout_kwargs, stream=True, stream_options={"include_usage": True}
+            )
+        elif self.provider == "anthropic":
+            return self.client.messages.create(**kwargs, **timeout_kwargs, stream=True)
+        return self._gemini_model(request).generate_content(**kwargs, **timeout_kwargs, stream=True)
+    
+    def _stream(self, request: LLMRequest, deadline: Optional[float] = None) -> Iterator[str]:
+        """
+        Send a request as a stream and yield its text as it arrives.
+        
+        Opening the stream is rate-limited and retried like _complete(); once
+        text has been yielded a failure is raised as-is (it can't be taken back).
+        """
+        kwargs = self._request_kwargs(request)
+        started = time.perf_counter()
+        stream = call_with_retry(
+            lambda timeout: self._open_stream(request, kwargs, timeout),
+            self.rate_limiter, self.retry_policy, self._deadline(deadline)
+        )
+        usage = LLMUsage()
+        try:
+            for chunk in stream:
+                text = self._chunk_text(chunk, usage)
+                if text:
+                    if not usage.ttft_s:
+                        usage.ttft_s = time.perf_counter() - started
+                    yield text
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()  # stopped early - don't leave the connection half-read
+            usage.latency_s = time.perf_counter() - started
+            usage.ttft_s = usage.ttft_s or usage.latency_s
+            self._store_usage(usage)
+    
+    async def _astream(self, request: LLMRequest, deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """Async version of _stream()."""
+        kwargs = self._request_kwargs(request)
+        started = time.perf_counter()
+        
+        async def attempt(timeout: Optional[float]):
+            timeout_kwargs = self._timeout_kwargs(timeout)
+            if self.provider in OPENAI_COMPATIBLE:
+                return await self._get_async_client().chat.completions.create(
+                    **kwargs, **timeout_kwargs, stream=True, stream_options={"include_usage": True}
                 )
-                question = response.text.strip()
-            # Remove quotes if present
-            if question.startswith('"') and question.endswith('"'):
-                question = question[1:-1]
-            return question
+            elif self.provider == "anthropic":
+                return await self._get_async_client().messages.create(**kwargs, **timeout_kwargs, stream=True)
+            return await self._gemini_model(request).generate_content_async(**kwargs, **timeout_kwargs, stream=True)
+        
+        stream = await acall_with_retry(attempt, self.rate_limiter, self.retry_policy, self._deadline(deadline))
+        usage = LLMUsage()
+        try:
+            async for chunk in stream:
+                text = self._chunk_text(chunk, usage)
+                if text:
+                    if not usage.ttft_s:
+                        usage.ttft_s = time.perf_counter() - started
+                    yield text
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+            usage.latency_s = time.perf_counter() - started
+            usage.ttft_s = usage.ttft_s or usage.latency_s
+            self._store_usage(usage)
+    
+    def _chunk_text(self, chunk, usage: LLMUsage) -> str:
+        """Text in one stream chunk/event; token counts riding along go into usage."""
+        if self.provider in OPENAI_COMPATIBLE:
+            if getattr(chunk, "usage", None) is not None:
+                self._fill_usage(chunk, usage)  # last chunk, with include_usage
+            if chunk.choices:
+                return chunk.choices[0].delta.content or ""
+            return ""
+        elif self.provider == "anthropic":
+            if chunk.type == "message_start":
+                self._fill_usage(chunk.message, usage)
+            elif chunk.type == "message_delta":
+                usage.output_tokens = chunk.usage.output_tokens or 0
+            elif chunk.type == "content_block_delta":
+                if chunk.delta.type == "text_delta":
+                    return chunk.delta.text
+                if chunk.delta.type == "input_json_delta":
+                    return chunk.delta.partial_json  # schema'd output comes as tool input
+            return ""
+        # Gemini - every chunk has usage so far, the last one the totals
+        self._fill_usage(chunk, usage)
+        try:
+            return chunk.text
+        except ValueError:
+            return ""  # no text part (e.g. final chunk with just the finish reason)
+    
+    def _gemini_prefix(self, request: LLMRequest) -> bool:
+        return self.provider == "gemini" and request.cache_system and self.prompt_caching
+    
+    def _gemini_model(self, request: LLMRequest):
+        """GenerativeModel to send a request with - one holding the static prefix if it has one."""
+        if self._gemini_prefix(request):
+            return get_gemini_prefix_model(self.model_name, self._api_key, request.system)
+        return self.model
+    
+    def _record_usage(self, response, latency_s: float) -> None:
+        """Pull token counts out of a provider response into last_usage / usage_totals."""
+        usage = LLMUsage(latency_s=latency_s, ttft_s=latency_s)
+        self._fill_usage(response, usage)
+        self._store_usage(usage)
+        self.latency.record(latency_s)  # drives the hedge delay
+    
+    def _fill_usage(self, response, usage: LLMUsage) -> None:
+        """Copy token counts from a response (or the chunk/message carrying them) into usage."""
+        if self.provider in OPENAI_COMPATIBLE:
+            u = getattr(response, "usage", None)
+            if u is not None:
+                usage.input_tokens = u.prompt_tokens or 0
+                usage.output_tokens = u.completion_tokens or 0
+                details = getattr(u, "prompt_tokens_details", None)
+                usage.cached_input_tokens = getattr(details, "cached_tokens", 0) or 0
+        elif self.provider == "anthropic":
+            u = getattr(response, "usage", None)
+            if u is not None:
+                # input_tokens is only the uncached part
+                usage.cached_input_tokens = getattr(u, "cache_read_input_tokens", 0) or 0
+                usage.cache_write_tokens = getattr(u, "cache_creation_input_tokens", 0) or 0
+                usage.input_tokens = (u.input_tokens or 0) + usage.cached_input_tokens + usage.cache_write_tokens
+                usage.output_tokens = u.output_tokens or 0
+        else:
+            u = getattr(response, "usage_metadata", None)
+            if u is not None:
+                usage.input_tokens = u.prompt_token_count or 0
+                usage.cached_input_tokens = getattr(u, "cached_content_token_count", 0) or 0
+                usage.output_tokens = u.candidates_token_count or 0
+    
+    def _store_usage(self, usage: LLMUsage) -> None:
+        with self._usage_lock:
+            self.last_usage = usage
+            self.usage_totals.add(usage)
+    
+    def _within_budget(self, call, deadline: float, fallback):
+        """Run call() with a hard deadline - fallback() if it runs out of time."""
+        try:
+            return run_within(call, deadline)
+        except Exception as e:
+            if not out_of_time(e, deadline):
+                raise
+        print(f"LLM call ran past its latency budget ({self.provider}) - using keyword fallback")
+        return fallback()
+    
+    async def _awithin_budget(self, call, deadline: float, fallback):
+        """Async _within_budget() - wait_for cancels the call at the deadline."""
+        try:
+            return await asyncio.wait_for(call, max(0.0, deadline - time.monotonic()))
         except Exception as e:
-            # Fallback question
-            return "Can you provide more details about what exactly happened? For example, what error messages did you see, or what suspicious activity did you notice?"
+            if not out_of_time(e, deadline):
+                raise
+        print(f"LLM call ran past its latency budget ({self.provider}) - using keyword fallback")
+        return fallback()
+    
+    def _fallback_turn(self, description: str, clarify_threshold: float) -> Dict[str, Any]:
+        """analyze_turn() result built from the keyword fallback."""
+        classification = fallback_classification(description)
+        return {
+            "classification": classification,
+            "entities": {key: [] for key in _ENTITY_KEYS},
+            "clarifying_question": FALLBACK_QUESTION if classification["confidence"] < clarify_threshold else None,
+        }
+    
+    def _deadline(self, deadline: Optional[float]) -> float:
+        return deadline if deadline is not None else time.monotonic() + self.call_timeout
+    
+    def _timeout_kwargs(self, timeout: Optional[float]) -> Dict[str, Any]:
+        """Per-attempt request timeout so a slow attempt can't overrun the deadline."""
+        if timeout is None:
+            return {}
+        if self.provider == "gemini":
+            return {"request_options": {"timeout": timeout}}
+        return {"timeout": timeout}
+    
+    def _get_async_client(self):
+        """Shared AsyncOpenAI / AsyncAnthropic client for the running event loop."""
+        if self._async_client is not None:
+            return self._async_client
+        return get_async_provider_client(self.provider, self.model_name, self._api_key)
+    
+    # ============================================
+    # Response parsing
+    # ============================================
+    
+    def _parse_classification(self, content: str) -> Dict[str, Any]:
+        return self._normalize_classification(_load_classification(content), content)
+    
+    def _normalize_classification(self, result: Optional[Dict[str, Any]], content: str) -> Dict[str, Any]:
+        if result is None:
+            _count_parse("unparseable")
+            if self.provider == "gemini":
+                # If JSON parsing completely fails, return a safe fallback
+                print(f"Warning: Failed to parse JSON from Gemini response: {content[:200]}")
+                return {
+                    "fine_label": "other",
+                    "category": "other",
+                    "confidence": 0.3,
+                    "rationale": "LLM returned invalid JSON format",
+                    "incident_type": "Unknown Incident",
+                    "owasp_version": "2025",
+                    "unparseable": True,
+                }
+            raise ValueError(f"Could not parse JSON from {self.provider} response: {content[:200]}")
+        
+        # Normalize different output formats (LLM sometimes returns different keys)
+        # Had issues with this - Gemini sometimes uses "category", sometimes "fine_label"
+        # Prefer fine_label first (it's the most specific and correct)
+        if "fine_label" in result:
+            result["category"] = result["fine_label"]
+        elif "incident_type" in result:
+            # Handle "A01:2025 - Broken Access Control" format
+            incident_type = result["incident_type"]
+            if " - " in incident_type:
+                # Extract category name after the dash (e.g., "A01:2025 - Broken Access Control" -> "broken_access_control")
+                category = incident_type.split(" - ", 1)[1].strip().lower().replace(" ", "_")
+            elif ":" in incident_type:
+                # Fallback: extract from after colon (e.g., "A01: Broken Access Control" -> "broken_access_control")
+                parts = incident_type.split(":", 1)
+                if len(parts) > 1:
+                    category = parts[1].strip().lower().replace(" ", "_")
+                else:
+                    category = incident_type.lower().replace(" ", "_")
+            else:
+                category = incident_type.lower().replace(" ", "_")
+            result["category"] = category
+        
+        # Ensure category exists
+        if "category" not in result:
+            result["category"] = "other"
+        
+        # Ensure owasp_version is set to 2025
+        if "owasp_version" not in result:
+            result["owasp_version"] = "2025"
+            
+        return result
+    
+    def _turn_result(
+        self,
+        result: Optional[Dict[str, Any]],
+        content: str,
+        clarify_threshold: float
+    ) -> Dict[str, Any]:
+        """
+        Split a combined-turn response into classification / entities / question.
+        clarifying_question is "" when one is needed but the model didn't write it.
+        """
+        entities: Any = {}
+        question: Any = ""
+        if result is not None:
+            entities = result.pop("entities", None)
+            question = result.pop("clarifying_question", None)
+        classification = self._normalize_classification(result, content)
+        if not isinstance(entities, dict):
+            entities = {}
+        try:
+            confidence = float(classification.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        if confidence >= clarify_threshold:
+            question = None
+        else:
+            question = self._clean_question(question) if isinstance(question, str) else ""
+        return {
+            "classification": classification,
+            "entities": {key: [str(v) for v in entities.get(key) or []] for key in _ENTITY_KEYS},
+            "clarifying_question": question,
+        }
+    
+    def _parse_entities(self, content: str) -> Dict[str, Any]:
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            if self.provider != "anthropic":
+                raise
+        # Claude can wrap the JSON in text
+        result = extract_json_object(content)
+        if result is None:
+            return {key: [] for key in _ENTITY_KEYS}
+        return result
+    
+    def _clean_question(self, text: str) -> str:
+        question = text.strip()
+        # Remove quotes if present
+        if question.startswith('"') and question.endswith('"'):
+            question = question[1:-1]
+        return question
     
     def _get_default_classification_prompt(self) -> str:
         return """You are a helpful, empathetic security incident analyst. You understand that people reporting incidents may be:
@@ -554,3 +1772,369 @@ IMPORTANT: In your rationale, if the incident could have multiple causes, mentio
 - "Table missing could be SQL injection (DROP TABLE), but might also be admin mistake or database corruption"
 - "Errors on login could be injection attack, but could also be misconfiguration"
 This helps users understand the ambiguity and provides better context."""
+
+
+# ============================================
+# JSON recovery + parse tracking
+# ============================================
+
+_JSON_SCAN_RE = re.compile(r'[{}"\\]')
+
+_parse_lock = threading.Lock()
+# Process-wide (adapters are often built per call): classification responses
+# seen, ones that needed extract_json_object, strict retries, and ones that
+# still failed - each of those costs the user a wasted clarification turn
+_parse_stats = {"responses": 0, "extracted": 0, "retried": 0, "unparseable": 0}
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    First JSON object embedded in text (markdown fences, prose around it).
+    
+    One pass that jumps between braces/quotes and tracks nesting depth and
+    string state, so braces inside strings and deeper nesting are fine and
+    the cost stays linear even on long brace-heavy garbage.
+    
+    Args:
+        text: Model output
+    
+    Returns:
+        The first balanced {...} that parses as a JSON object, or None
+    """
+    depth = 0
+    start = 0
+    in_string = False
+    escape_at = -2
+    for m in _JSON_SCAN_RE.finditer(text):
+        i = m.start()
+        ch = text[i]
+        if in_string:
+            if i == escape_at + 1:
+                continue  # escaped quote / backslash
+            if ch == "\\":
+                escape_at = i
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = depth > 0  # quotes in surrounding prose don't count
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                try:
+                    obj = json.loads(text[start:i + 1])
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(obj, dict):
+                    return obj
+    return None
+
+
+def _load_classification(content: str) -> Optional[Dict[str, Any]]:
+    """Classification JSON from a model response (counted in the parse stats), None if there isn't any."""
+    _count_parse("responses")
+    try:
+        result = json.loads(content)
+        if isinstance(result, dict):
+            return result
+    except (json.JSONDecodeError, TypeError):
+        pass
+    result = extract_json_object(content or "")
+    if result is not None:
+        _count_parse("extracted")
+    return result
+
+
+def _has_json_object(content: str) -> bool:
+    """Whether _load_classification() would find JSON (without counting it in the parse stats)."""
+    try:
+        if isinstance(json.loads(content), dict):
+            return True
+    except (json.JSONDecodeError, TypeError):
+        pass
+    return extract_json_object(content or "") is not None
+
+
+# Classifications / turns in flight, shared by every adapter in the process
+_in_flight = SingleFlight()
+
+
+def get_coalescing_stats() -> Dict[str, int]:
+    """
+    Process-wide single-flight counters: "calls" made, "coalesced" callers
+    that waited for an identical call instead, "in_flight" right now.
+    """
+    return {**_in_flight.stats, "in_flight": _in_flight.in_flight()}
+
+
+def _turn_fields(turn: Dict[str, Any]) -> Dict[str, Any]:
+    """Streamed-style fields of a finished turn (for a coalesced stream's only chunk)."""
+    fields = {key: turn["classification"][key] for key in TURN_SCHEMA["properties"] if key in turn["classification"]}
+    fields["clarifying_question"] = turn["clarifying_question"] or ""
+    return fields
+
+
+def _count_parse(outcome: str) -> None:
+    with _parse_lock:
+        _parse_stats[outcome] += 1
+
+
+def get_parse_stats() -> Dict[str, int]:
+    """Copy of the process-wide classification parse counters (see _parse_stats)."""
+    with _parse_lock:
+        return dict(_parse_stats)
+
+
+def reset_parse_stats() -> None:
+    with _parse_lock:
+        for key in _parse_stats:
+            _parse_stats[key] = 0
+
+
+def _gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON schema -> the OpenAPI subset Gemini's response_schema takes."""
+    out = {}
+    for key, value in schema.items():
+        if key == "additionalProperties":
+            continue  # not supported - Gemini only returns declared properties anyway
+        if key == "properties":
+            value = {name: _gemini_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            value = _gemini_schema(value)
+        out[key] = value
+    if "enum" in out:
+        out["format"] = "enum"
+    return out
+
+
+def _clean_question_stream(pieces: Iterable[str]) -> Iterator[str]:
+    """_clean_question() for streamed text - strips whitespace and wrapping quotes on the fly."""
+    state = _QuestionCleaner()
+    for text in pieces:
+        text = state.feed(text)
+        if text:
+            yield text
+
+
+async def _aclean_question_stream(pieces: AsyncIterator[str]) -> AsyncIterator[str]:
+    state = _QuestionCleaner()
+    async for text in pieces:
+        text = state.feed(text)
+        if text:
+            yield text
+
+
+class _QuestionCleaner:
+    """Holds back trailing whitespace / a closing quote until more text shows they're inside the question."""
+    
+    def __init__(self):
+        self.started = False
+        self.quoted = False
+        self.held = ""
+    
+    def feed(self, text: str) -> str:
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self.started = True
+            if text.startswith('"'):
+                self.quoted = True
+                text = text[1:]
+        text = self.held + text
+        body = text.rstrip()
+        if self.quoted and body.endswith('"'):
+            body = body[:-1]
+        self.held = text[len(body):]
+        return body
+
+
+# ============================================
+# Shared provider clients
+# ============================================
+
+ClientKey = Tuple[str, str, str]  # (provider, model, key fingerprint)
+
+_clients_lock = threading.Lock()
+_clients: Dict[ClientKey, Any] = {}
+# Async clients hold connections tied to the event loop that opened them,
+# so they're shared per loop and dropped with it
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, Any]]" = weakref.WeakKeyDictionary()
+_gemini_configured_key: Optional[str] = None
+# (model, key fingerprint, prompt hash) -> (GenerativeModel holding the prefix, rebuild after)
+_gemini_prefix_models: Dict[Tuple[str, str, str], Tuple[Any, float]] = {}
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Short hash of an API key - registry keys never hold the key itself."""
+    if not api_key:
+        return "none"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _client_key(provider: str, model: str, api_key: Optional[str]) -> ClientKey:
+    if provider == "gemini" and not model.startswith("models/"):
+        model = f"models/{model}"
+    return (provider, model, key_fingerprint(api_key))
+
+
+def get_provider_client(provider: str, model: str, api_key: Optional[str]) -> Any:
+    """
+    Get the shared SDK client for a provider/model/API key (created on first use).
+    
+    Args:
+        provider: "openai", "anthropic", "gemini" or "fake"
+        model: Model name
+        api_key: API key the client should use
+    
+    Returns:
+        OpenAI / Anthropic client, or a genai.GenerativeModel for Gemini
+    """
+    key = _client_key(provider, model, api_key)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _build_client(provider, key[1], api_key)
+                _clients[key] = client
+    return client
+
+
+def get_async_provider_client(provider: str, model: str, api_key: Optional[str]) -> Any:
+    """
+    Get the shared async SDK client for the running event loop.
+    
+    Gemini has no separate async client (GenerativeModel.generate_content_async
+    manages its own), so this is only for "openai", "anthropic" and "fake".
+    """
+    loop = asyncio.get_running_loop()
+    key = _client_key(provider, model, api_key)
+    with _clients_lock:
+        per_loop = _async_clients.setdefault(loop, {})
+        client = per_loop.get(key)
+        if client is None:
+            if provider == "openai":
+                client = AsyncOpenAI(api_key=api_key, max_retries=0)
+            elif provider == "anthropic":
+                client = AsyncAnthropic(api_key=api_key, max_retries=0)
+            elif provider == "fake":
+                from .fake_llm import AsyncFakeLLMClient
+                client = AsyncFakeLLMClient(model)
+            else:
+                raise ValueError(f"No async client for provider {provider!r}")
+            per_loop[key] = client
+    return client
+
+
+async def aclose_provider_clients() -> None:
+    """Close the running loop's shared async clients (before the loop shuts down)."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        per_loop = _async_clients.pop(loop, {})
+    for client in per_loop.values():
+        await client.close()
+
+
+def clear_provider_clients() -> None:
+    """Forget all shared clients (key rotation, tests). Existing adapters keep theirs."""
+    global _gemini_configured_key
+    with _clients_lock:
+        _clients.clear()
+        _async_clients.clear()
+        _gemini_prefix_models.clear()
+        _gemini_configured_key = None
+
+
+def _build_client(provider: str, model: str, api_key: Optional[str]) -> Any:
+    """Build a new SDK client (caller holds _clients_lock)."""
+    if provider == "openai":
+        if not OPENAI_AVAILABLE:
+            raise ImportError("openai package not installed. Install with: pip install openai")
+        # max_retries=0 - retries go through rate_limiter.call_with_retry, SDK
+        # retries on top would multiply the attempts and ignore our limiter
+        return OpenAI(api_key=api_key, max_retries=0)
+    if provider == "anthropic":
+        if not ANTHROPIC_AVAILABLE:
+            raise ImportError("anthropic package not installed. Install with: pip install anthropic")
+        return Anthropic(api_key=api_key, max_retries=0)
+    if provider == "fake":
+        from .fake_llm import FakeLLMClient
+        return FakeLLMClient(model)
+    
+    _configure_gemini(api_key)
+    gemini_model = genai.GenerativeModel(model)
+    _pin_gemini_client(gemini_model, api_key)
+    return gemini_model
+
+
+def get_gemini_prefix_model(model: str, api_key: Optional[str], system_prompt: str) -> Any:
+    """
+    Shared Gemini model with a static system prompt as its prefix.
+    
+    Uses Gemini cached content (the prefix is stored provider-side and billed
+    at the cached rate) when the model/tier supports it. Otherwise the prompt
+    goes in as system_instruction - still sent every call, but as a stable
+    prefix ahead of the conversation, which Gemini's implicit caching picks up.
+    
+    Args:
+        model: Model name ("models/..." or not)
+        api_key: API key
+        system_prompt: The static prefix
+    
+    Returns:
+        genai.GenerativeModel to send only the dynamic part to
+    """
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+    _, model, fingerprint = _client_key("gemini", model, api_key)
+    key = (model, fingerprint, prompt_hash)
+    entry = _gemini_prefix_models.get(key)
+    if entry is None or time.time() >= entry[1]:
+        with _clients_lock:
+            entry = _gemini_prefix_models.get(key)
+            if entry is None or time.time() >= entry[1]:
+                entry = _build_gemini_prefix_model(key[0], api_key, system_prompt)
+                _gemini_prefix_models[key] = entry
+    return entry[0]
+
+
+def _build_gemini_prefix_model(model: str, api_key: Optional[str], system_prompt: str) -> Tuple[Any, float]:
+    """(model, rebuild-after time) for get_gemini_prefix_model (caller holds _clients_lock)."""
+    _configure_gemini(api_key)
+    try:
+        cache = genai.caching.CachedContent.create(
+            model=model,
+            display_name="incident-classification-prompt",
+            system_instruction=system_prompt,
+            ttl=GEMINI_CACHE_TTL,
+        )
+        gemini_model = genai.GenerativeModel.from_cached_content(cache)
+        # rebuild a bit before it expires so no call hits a dead cache
+        refresh_at = time.time() + GEMINI_CACHE_TTL * 0.9
+    except Exception as e:
+        # Free tier / prompt under the model's minimum cache size / no caching
+        # for this model - keep the prefix split without the provider cache
+        print(f"Gemini context caching unavailable ({type(e).__name__}: {str(e)[:120]}), using system_instruction")
+        gemini_model = genai.GenerativeModel(model, system_instruction=system_prompt)
+        refresh_at = time.time() + GEMINI_CACHE_RETRY
+    _pin_gemini_client(gemini_model, api_key)
+    return gemini_model, refresh_at
+
+
+def _configure_gemini(api_key: Optional[str]) -> None:
+    # genai.configure() is process-global and throws away the cached gRPC
+    # clients, so only call it when the key actually changes
+    global _gemini_configured_key
+    if api_key != _gemini_configured_key:
+        genai.configure(api_key=api_key)
+        _gemini_configured_key = api_key
+
+
+def _pin_gemini_client(gemini_model: Any, api_key: Optional[str]) -> None:
+    if api_key:
+        # Pin this model to the current key's client now, rather than whatever
+        # key is configured when it makes its first call
+        gemini_model._client = genai_client.get_default_generative_client()
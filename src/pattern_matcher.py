@@ -0,0 +1,678 @@
+# src/pattern_matcher.py
+"""
+Precompiled matching engine for the keyword/regex fast paths.
+
+The detectors used to call re.search() on ~200 raw pattern strings per message.
+This module compiles a pattern table once per process and puts a literal
+prefilter in front of it: every pattern has a "required literal" (a substring
+that has to be in the text for the regex to possibly match), so we check those
+cheap substrings first and only run the regexes that can actually hit.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, TypeVar
+import os
+import re
+import time
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
+
+try:
+    from re import _constants as sre_constants  # Python 3.11+
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_constants
+
+
+# (pattern, label, confidence) - same shape as ExplicitDetector.patterns
+PatternEntry = Tuple[str, str, float]
+
+T = TypeVar("T")
+
+# Below this many texts per worker, process startup costs more than it saves
+MIN_CHUNK_SIZE = 256
+
+# Tables with at least this many distinct literals use the n-gram prefilter
+# (below that, one "in" per literal is faster - measured crossover ~400)
+GRAM_INDEX_MIN_LITERALS = 400
+GRAM_SIZE = 3
+
+# Safe mode only kicks in above this length - short chat messages can't
+# backtrack enough to matter, so they keep the plain regex path
+SAFE_MODE_MIN_LENGTH = 256
+
+# A compiled gap chain: (segment regex, segment can't match a newline)
+GapChain = Tuple[Tuple["re.Pattern", bool], ...]
+
+# Escapes whose meaning changes when lowercased (\S -> \s etc.), so they can't
+# be used to decide whether a pattern is safe to run case-sensitively
+_CASE_SENSITIVE_ESCAPES = re.compile(r"\\[SWDBAZ]")
+
+
+def _literal_alternatives(parsed) -> Optional[FrozenSet[str]]:
+    """
+    If a parsed (sub)pattern only ever matches one of a fixed set of strings,
+    return that set. Returns None for anything with wildcards, classes, repeats.
+    """
+    results = {""}
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            results = {r + chr(av) for r in results}
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if add_flags or del_flags:
+                return None
+            inner = _literal_alternatives(sub)
+            if inner is None:
+                return None
+            results = {r + i for r in results for i in inner}
+        elif op is sre_constants.BRANCH:
+            options = set()
+            for branch in av[1]:
+                inner = _literal_alternatives(branch)
+                if inner is None:
+                    return None
+                options |= inner
+            results = {r + o for r in results for o in options}
+        else:
+            return None
+        if len(results) > 32:
+            # Not worth it - cross products blow up quickly
+            return None
+    return frozenset(results)
+
+
+def _required_factors(parsed) -> List[FrozenSet[str]]:
+    """
+    Collect "factors" for a parsed pattern: each factor is a set of strings and
+    at least one of them must appear in any text the pattern matches.
+    """
+    factors: List[FrozenSet[str]] = []
+    run = ""
+
+    def flush():
+        nonlocal run
+        if run:
+            factors.append(frozenset([run]))
+            run = ""
+
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            run += chr(av)
+            continue
+
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if add_flags or del_flags:
+                flush()
+                continue
+            alternatives = _literal_alternatives(sub)
+            if alternatives is not None and len(alternatives) == 1:
+                # (?:abc) - just keeps extending the current literal run
+                run += next(iter(alternatives))
+                continue
+            flush()
+            if alternatives is not None:
+                factors.append(alternatives)
+            else:
+                factors.extend(_required_factors(sub))
+            continue
+
+        flush()
+        if op is sre_constants.BRANCH:
+            # A factor is required only if every branch contributes one
+            union = set()
+            for branch in av[1]:
+                best = _best_factor(_required_factors(branch))
+                if best is None:
+                    union = None
+                    break
+                union |= best
+            if union:
+                factors.append(frozenset(union))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            min_count, _, sub = av
+            if min_count >= 1:
+                factors.extend(_required_factors(sub))
+        # AT, ANY, IN, etc. don't give us anything usable
+
+    flush()
+    return factors
+
+
+def _best_factor(factors: Sequence[FrozenSet[str]]) -> Optional[FrozenSet[str]]:
+    """Pick the most selective factor (longest shortest-alternative, fewest alternatives)."""
+    usable = [f for f in factors if f and all(s and s.isascii() for s in f)]
+    if not usable:
+        return None
+    return max(usable, key=lambda f: (min(len(s) for s in f), -len(f)))
+
+
+@lru_cache(maxsize=16384)
+def parse_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """
+    Same as required_literals(), but raises re.error for an invalid pattern.
+
+    Cached per pattern string, so validating a pattern pack and then compiling
+    it only parses each regex once - and a reload only parses what changed.
+    """
+    parsed = sre_parse.parse(pattern)
+    best = _best_factor(_required_factors(parsed))
+    if best is None:
+        return None
+    return frozenset(s.lower() for s in best)
+
+
+def required_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """
+    Work out the literal prefilter for a regex pattern.
+
+    Args:
+        pattern: Regex source string
+
+    Returns:
+        Set of lowercase strings where at least one must appear in the
+        (lowercased) text for the pattern to match, or None if the pattern
+        has no usable literal and always has to be evaluated.
+    """
+    try:
+        return parse_literals(pattern)
+    except re.error:
+        return None
+
+
+def _split_gaps(pattern: str) -> Optional[List[str]]:
+    """
+    Split a pattern on its top-level greedy ".*" gaps.
+
+    r"\\benter.*(js|code).*(comment|form)" -> [r"\\benter", "(js|code)", "(comment|form)"]
+
+    Returns None if there's nothing to split or the pattern has a top-level "|".
+    """
+    parts: List[str] = []
+    buf: List[str] = []
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            buf.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return None
+        elif depth == 0 and pattern.startswith(".*", i) and pattern[i + 2:i + 3] not in ("?", "+"):
+            parts.append("".join(buf))
+            buf = []
+            i += 2
+            continue
+        buf.append(ch)
+        i += 1
+    parts.append("".join(buf))
+    if len(parts) < 2 or not all(parts):
+        return None
+    return parts
+
+
+def _can_match_newline(parsed) -> bool:
+    """True if anything in a parsed (sub)pattern could consume a newline."""
+    unsafe_categories = (
+        sre_constants.CATEGORY_SPACE,
+        sre_constants.CATEGORY_NOT_WORD,
+        sre_constants.CATEGORY_NOT_DIGIT,
+        sre_constants.CATEGORY_NOT_SPACE,
+        sre_constants.CATEGORY_LINEBREAK,
+        sre_constants.CATEGORY_NOT_LINEBREAK,
+    )
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            if av == 10:
+                return True
+        elif op is sre_constants.NOT_LITERAL:
+            if av != 10:
+                return True
+        elif op is sre_constants.IN:
+            for item_op, item_av in av:
+                if item_op is sre_constants.NEGATE:
+                    return True
+                if item_op is sre_constants.CATEGORY and item_av in unsafe_categories:
+                    return True
+                if item_op is sre_constants.LITERAL and item_av == 10:
+                    return True
+                if item_op is sre_constants.RANGE and item_av[0] <= 10 <= item_av[1]:
+                    return True
+        elif op is sre_constants.SUBPATTERN:
+            if _can_match_newline(av[3]):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_can_match_newline(branch) for branch in av[1]):
+                return True
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if _can_match_newline(av[2]):
+                return True
+        elif op not in (sre_constants.AT, sre_constants.ANY):
+            # Anything unusual (lookarounds, backrefs...) - don't risk it
+            return True
+    return False
+
+
+def _compile_chain(pattern: str, flags: int) -> Optional[GapChain]:
+    """Compile a pattern's ".*"-separated segments for _chain_search, or None."""
+    parts = _split_gaps(pattern)
+    if parts is None:
+        return None
+    try:
+        return tuple(
+            (re.compile(part, flags), not _can_match_newline(sre_parse.parse(part)))
+            for part in parts
+        )
+    except re.error:
+        return None
+
+
+def _chain_search(chain: GapChain, text: str) -> bool:
+    """
+    Linear-time stand-in for re.search on "A.*B.*C"-style patterns.
+
+    Finds A, then the next B after it, then the next C after that - each segment
+    is searched once from where the previous one ended, so there's no
+    backtracking over every way to split the gaps. Since "." doesn't match a
+    newline, a gap that would cross a line break restarts the chain on the next
+    line. Segments that can't contain a newline are only searched to the end of
+    the current line, which keeps the whole scan O(segments * len(text)).
+    """
+    first, _ = chain[0]
+    rest = chain[1:]
+    end = len(text)
+    start = 0
+    while start <= end:
+        m = first.search(text, start)
+        if m is None:
+            return False
+        pos = m.end()
+        restart = None
+        for segment, line_local in rest:
+            line_end = text.find("\n", pos)
+            if line_end == -1:
+                line_end = end
+            m = segment.search(text, pos, line_end if line_local else end)
+            if m is None:
+                if line_local and line_end < end:
+                    restart = line_end + 1
+                    break
+                return False
+            if m.start() > line_end:
+                # Only reachable across a line break - try again from the next line
+                restart = line_end + 1
+                break
+            pos = m.end()
+        if restart is None:
+            return True
+        start = restart
+    return False
+
+
+class PatternProfiler:
+    """
+    Records how long each pattern takes, across calls.
+
+    Pass one into the matcher (or ExplicitDetector.enable_profiling()) to find
+    the patterns that backtrack on long inputs.
+    """
+
+    def __init__(self):
+        # pattern -> [calls, total_seconds, worst_seconds, worst_text_length]
+        self.stats: Dict[str, List[Any]] = {}
+
+    def record(self, pattern: str, seconds: float, text_length: int) -> None:
+        """Add one evaluation of a pattern."""
+        entry = self.stats.get(pattern)
+        if entry is None:
+            self.stats[pattern] = [1, seconds, seconds, text_length]
+            return
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+            entry[3] = text_length
+
+    def top(self, n: int = 10, by: str = "total") -> List[Dict[str, Any]]:
+        """
+        Most expensive patterns.
+
+        Args:
+            n: How many to return
+            by: "total" (cumulative time) or "worst" (slowest single call)
+        """
+        key = 1 if by == "total" else 2
+        ranked = sorted(self.stats.items(), key=lambda item: item[1][key], reverse=True)
+        return [
+            {
+                "pattern": pattern,
+                "calls": calls,
+                "total_ms": total * 1000,
+                "worst_ms": worst * 1000,
+                "worst_text_length": worst_len,
+            }
+            for pattern, (calls, total, worst, worst_len) in ranked[:n]
+        ]
+
+    def format_report(self, n: int = 10, by: str = "total") -> str:
+        """Plain-text table of the top patterns."""
+        lines = [f"{'calls':>7} {'total ms':>10} {'worst ms':>10} {'worst len':>9}  pattern"]
+        for row in self.top(n, by=by):
+            lines.append(
+                f"{row['calls']:7d} {row['total_ms']:10.2f} {row['worst_ms']:10.2f} "
+                f"{row['worst_text_length']:9d}  {row['pattern'][:70]}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Drop all recorded stats."""
+        self.stats.clear()
+
+
+class CompiledPatternSet:
+    """
+    Immutable compiled form of a (pattern, label, confidence) table.
+
+    Build it through compile_patterns() so every detector in the process
+    shares the same compiled object.
+    """
+
+    def __init__(self, patterns: Sequence[PatternEntry]):
+        self.entries: Tuple[PatternEntry, ...] = tuple(patterns)
+
+        # Regexes are compiled on first use, not up front - with the literal
+        # prefilter most patterns never get tried, and a pack of thousands of
+        # patterns loads in a fraction of the time. Racing threads may both
+        # compile the same slot, which is harmless.
+        #
+        # Text is always lowercased before matching, so patterns without any
+        # uppercase literals can skip IGNORECASE on ASCII input (much faster).
+        # The IGNORECASE versions are kept for non-ASCII text where unicode
+        # case folding could make a difference.
+        count = len(self.entries)
+        self._plain: List[Optional["re.Pattern"]] = [None] * count
+        self._folded: List[Optional["re.Pattern"]] = [None] * count
+
+        # Gap chains for safe mode (False = not built yet, None = no ".*" gaps)
+        self._plain_chains: List[Any] = [False] * count
+        self._folded_chains: List[Any] = [False] * count
+
+        # Evaluation order: highest confidence first, table order breaks ties.
+        # That's exactly the entry max() used to pick in the old loop.
+        self.rank: Tuple[int, ...] = tuple(
+            sorted(range(len(self.entries)), key=lambda i: (-self.entries[i][2], i))
+        )
+        position = {idx: pos for pos, idx in enumerate(self.rank)}
+
+        # literal -> rank positions of the patterns it unlocks
+        by_literal: Dict[str, List[int]] = {}
+        always: List[int] = []
+        for idx, (p, _, _) in enumerate(self.entries):
+            literals = required_literals(p)
+            if literals is None:
+                always.append(position[idx])
+                continue
+            for lit in literals:
+                by_literal.setdefault(lit, []).append(position[idx])
+
+        self._literal_index: Tuple[Tuple[str, Tuple[int, ...]], ...] = tuple(
+            (lit, tuple(ranks)) for lit, ranks in by_literal.items()
+        )
+        self._always: FrozenSet[int] = frozenset(always)
+
+        # Big tables: bucket literals by their first GRAM_SIZE chars so a text
+        # only checks the literals whose prefix it actually contains. Keeps
+        # candidates() flat as the table grows instead of one "in" per literal.
+        self._short_literals: Tuple[Tuple[str, Tuple[int, ...]], ...] = tuple(
+            item for item in self._literal_index if len(item[0]) < GRAM_SIZE
+        )
+        grams: Dict[str, List[Tuple[str, Tuple[int, ...]]]] = {}
+        for lit, ranks in self._literal_index:
+            if len(lit) >= GRAM_SIZE:
+                grams.setdefault(lit[:GRAM_SIZE], []).append((lit, ranks))
+        self._gram_index: Dict[str, Tuple[Tuple[str, Tuple[int, ...]], ...]] = {
+            gram: tuple(items) for gram, items in grams.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def candidates(self, text_lower: str) -> List[int]:
+        """
+        Rank positions of the patterns that can possibly match, in evaluation order.
+
+        Args:
+            text_lower: Already-lowercased text
+        """
+        if not text_lower.isascii():
+            # Prefilter is only exact for ASCII - just try everything
+            return list(range(len(self.rank)))
+        hits = set(self._always)
+        if len(self._literal_index) < GRAM_INDEX_MIN_LITERALS:
+            for lit, ranks in self._literal_index:
+                if lit in text_lower:
+                    hits.update(ranks)
+            return sorted(hits)
+
+        for lit, ranks in self._short_literals:
+            if lit in text_lower:
+                hits.update(ranks)
+        text_grams = {text_lower[i:i + GRAM_SIZE] for i in range(len(text_lower) - GRAM_SIZE + 1)}
+        for gram in text_grams.intersection(self._gram_index):
+            for lit, ranks in self._gram_index[gram]:
+                if lit in text_lower:
+                    hits.update(ranks)
+        return sorted(hits)
+
+    def _regex(self, idx: int, ascii_text: bool) -> "re.Pattern":
+        """Compiled regex for one pattern, compiling it on first use."""
+        compiled = self._plain[idx] if ascii_text else self._folded[idx]
+        if compiled is None:
+            pattern = self.entries[idx][0]
+            if ascii_text and not _needs_ignorecase(pattern):
+                compiled = re.compile(pattern)
+            else:
+                compiled = re.compile(pattern, re.IGNORECASE)
+            (self._plain if ascii_text else self._folded)[idx] = compiled
+        return compiled
+
+    def _chain(self, idx: int, ascii_text: bool) -> Optional[GapChain]:
+        """Safe-mode gap chain for one pattern (None if it has no gaps)."""
+        chains = self._plain_chains if ascii_text else self._folded_chains
+        chain = chains[idx]
+        if chain is False:
+            pattern = self.entries[idx][0]
+            if ascii_text and not _needs_ignorecase(pattern):
+                chain = _compile_chain(pattern, 0)
+            else:
+                chain = _compile_chain(pattern, re.IGNORECASE)
+            chains[idx] = chain
+        return chain
+
+    def compile_all(self) -> None:
+        """Compile every lazy regex now (for when first-call latency matters)."""
+        for idx in range(len(self.entries)):
+            self._regex(idx, True)
+            self._regex(idx, False)
+
+    def _matches(
+        self,
+        idx: int,
+        text_lower: str,
+        ascii_text: bool,
+        safe: bool,
+        profiler: Optional[PatternProfiler],
+    ) -> bool:
+        """Evaluate one pattern (by table index) against already-lowercased text."""
+        chain = self._chain(idx, ascii_text) if safe else None
+        if profiler is not None:
+            started = time.perf_counter()
+        if chain is not None:
+            hit = _chain_search(chain, text_lower)
+        else:
+            compiled = (self._plain if ascii_text else self._folded)[idx]
+            if compiled is None:
+                compiled = self._regex(idx, ascii_text)
+            hit = compiled.search(text_lower) is not None
+        if profiler is not None:
+            profiler.record(self.entries[idx][0], time.perf_counter() - started, len(text_lower))
+        return hit
+
+    def best_match(
+        self,
+        text: str,
+        safe: bool = False,
+        profiler: Optional[PatternProfiler] = None,
+    ) -> Tuple[Optional[str], float]:
+        """
+        Highest-confidence (label, confidence) for the text.
+
+        Candidates are tried in confidence order so the first hit is the answer.
+
+        Args:
+            text: Text to match
+            safe: Use linear-time gap chains instead of backtracking regexes
+            profiler: Record per-pattern timings here
+        """
+        text_lower = text.lower()
+        ascii_text = text_lower.isascii()
+        for pos in self.candidates(text_lower):
+            idx = self.rank[pos]
+            if self._matches(idx, text_lower, ascii_text, safe, profiler):
+                _, label, confidence = self.entries[idx]
+                return label, confidence
+        return None, 0.0
+
+    def first_match(
+        self,
+        text: str,
+        safe: bool = False,
+        profiler: Optional[PatternProfiler] = None,
+    ) -> Optional[int]:
+        """
+        Table index of the first pattern (in table order) that matches.
+
+        For classifiers that go by pattern order instead of confidence.
+        """
+        text_lower = text.lower()
+        ascii_text = text_lower.isascii()
+        for idx in sorted(self.rank[pos] for pos in self.candidates(text_lower)):
+            if self._matches(idx, text_lower, ascii_text, safe, profiler):
+                return idx
+        return None
+
+    def label_scores(
+        self,
+        text: str,
+        threshold: float = 0.0,
+        top_k: Optional[int] = None,
+        safe: bool = False,
+        profiler: Optional[PatternProfiler] = None,
+    ) -> Dict[str, float]:
+        """
+        Best confidence per label, in one scan.
+
+        Args:
+            text: Text to match
+            threshold: Stop once candidates drop below this confidence
+            top_k: Stop once this many labels have been found
+            safe: Use linear-time gap chains instead of backtracking regexes
+            profiler: Record per-pattern timings here
+
+        Returns:
+            {label: best_confidence}, ordered highest confidence first
+        """
+        text_lower = text.lower()
+        ascii_text = text_lower.isascii()
+        scores: Dict[str, float] = {}
+        for pos in self.candidates(text_lower):
+            idx = self.rank[pos]
+            _, label, confidence = self.entries[idx]
+            if confidence < threshold:
+                # Everything after this is lower - nothing left to find
+                break
+            if label in scores:
+                # Already have this label at an equal or higher confidence
+                continue
+            if self._matches(idx, text_lower, ascii_text, safe, profiler):
+                scores[label] = confidence
+                if top_k is not None and len(scores) >= top_k:
+                    break
+        return scores
+
+
+def _needs_ignorecase(pattern: str) -> bool:
+    """True if the pattern could behave differently without IGNORECASE on lowercase text."""
+    if _CASE_SENSITIVE_ESCAPES.search(pattern):
+        return True
+    return pattern != pattern.lower()
+
+
+@lru_cache(maxsize=None)
+def _compile_cached(patterns: Tuple[PatternEntry, ...]) -> CompiledPatternSet:
+    return CompiledPatternSet(patterns)
+
+
+def compile_patterns(patterns: Sequence[PatternEntry]) -> CompiledPatternSet:
+    """
+    Get the compiled matcher for a pattern table.
+
+    Compiled once per process per distinct table - later calls with the same
+    patterns get the same CompiledPatternSet back.
+    """
+    return _compile_cached(tuple(patterns))
+
+
+def batch_map(
+    chunk_fn: Callable[[List[str]], List[T]],
+    texts: Iterable[str],
+    workers: Optional[int] = 1,
+    chunk_size: Optional[int] = None,
+) -> List[T]:
+    """
+    Run a per-chunk function over a corpus, optionally across processes.
+
+    Args:
+        chunk_fn: Module-level function taking a list of texts and returning one
+                  result per text (has to be picklable for the process pool)
+        texts: Texts to process
+        workers: 1 = run in this process, None = one process per CPU core,
+                 N = pool of N processes
+        chunk_size: Texts per task sent to a worker (default: split evenly,
+                    ~4 chunks per worker, at least MIN_CHUNK_SIZE)
+
+    Returns:
+        Results in the same order as the input texts
+    """
+    texts = list(texts)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(texts) <= MIN_CHUNK_SIZE:
+        return chunk_fn(texts)
+
+    if chunk_size is None:
+        chunk_size = max(MIN_CHUNK_SIZE, -(-len(texts) // (workers * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    workers = min(workers, len(chunks))
+
+    results: List[T] = []
+    # map() yields chunk results in submission order, so input order is kept
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(chunk_fn, chunks):
+            results.extend(part)
+    return results
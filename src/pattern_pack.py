@@ -0,0 +1,285 @@
+# src/pattern_pack.py
+"""
+Versioned pattern packs for the explicit detector.
+
+The detector patterns live in a YAML file (src/patterns/explicit_patterns.yaml)
+so they can be tuned without a redeploy. A pack is validated and compiled into
+an immutable snapshot; PatternPackSource keeps the current snapshot and swaps
+in a new one when the file changes on disk.
+
+Reloads happen on a background thread - detect() calls keep using the old
+snapshot until the new one is ready, then the reference is swapped in one step.
+A broken pack never replaces a working one. Deploy new packs by writing a temp
+file and renaming it over the old one, so a reload never sees half a file.
+"""
+
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+import os
+import re
+import threading
+import time
+
+import yaml
+
+from .pattern_matcher import CompiledPatternSet, PatternEntry, parse_literals
+
+
+# Default pack shipped with the repo
+DEFAULT_PACK_PATH = Path(__file__).parent / "patterns" / "explicit_patterns.yaml"
+
+# How often (seconds) current() looks at the file's mtime - a stat() per
+# detect() call would be wasteful
+RELOAD_CHECK_INTERVAL = 2.0
+
+# C loader is several times faster on big packs, not always installed
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class PatternPackError(ValueError):
+    """Pattern pack file is missing, unreadable or fails validation."""
+
+
+@dataclass(frozen=True)
+class PatternPack:
+    """One loaded, validated and compiled pattern pack."""
+    version: str
+    entries: Tuple[PatternEntry, ...]
+    matcher: CompiledPatternSet
+    path: Optional[Path] = None
+    mtime_ns: int = 0
+    load_seconds: float = 0.0
+
+
+def validate_entries(raw_patterns) -> Tuple[PatternEntry, ...]:
+    """
+    Check pack entries and turn them into (pattern, label, confidence) tuples.
+
+    Args:
+        raw_patterns: The "patterns" list from a pack file
+
+    Returns:
+        Tuple of pattern entries, same order as the file
+
+    Raises:
+        PatternPackError: On the first bad entry (with its index)
+    """
+    if not isinstance(raw_patterns, list) or not raw_patterns:
+        raise PatternPackError("'patterns' must be a non-empty list")
+
+    entries = []
+    for i, item in enumerate(raw_patterns):
+        if not isinstance(item, dict):
+            raise PatternPackError(f"pattern #{i}: expected a mapping, got {type(item).__name__}")
+        pattern = item.get("pattern")
+        label = item.get("label")
+        confidence = item.get("confidence")
+
+        if not isinstance(pattern, str) or not pattern:
+            raise PatternPackError(f"pattern #{i}: 'pattern' must be a non-empty string")
+        if not isinstance(label, str) or not label:
+            raise PatternPackError(f"pattern #{i} ({pattern!r}): 'label' must be a non-empty string")
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+            raise PatternPackError(f"pattern #{i} ({pattern!r}): 'confidence' must be a number")
+        if not 0.0 <= confidence <= 1.0:
+            raise PatternPackError(f"pattern #{i} ({pattern!r}): confidence {confidence} not in [0, 1]")
+        try:
+            # Parses the regex (catches syntax errors) and caches its prefilter
+            # literals for the matcher - the actual compile happens on first use
+            parse_literals(pattern)
+        except re.error as e:
+            raise PatternPackError(f"pattern #{i} ({pattern!r}): invalid regex: {e}") from e
+
+        entries.append((pattern, label, float(confidence)))
+    return tuple(entries)
+
+
+def parse_pattern_pack(data, path: Optional[Path] = None, mtime_ns: int = 0) -> PatternPack:
+    """
+    Validate an already-parsed pack document and compile it.
+
+    Args:
+        data: Parsed YAML (dict with "version" and "patterns")
+        path: Where it came from (for error messages / reload)
+        mtime_ns: File modification time it was read at
+
+    Returns:
+        Compiled PatternPack
+    """
+    started = time.perf_counter()
+    if not isinstance(data, dict):
+        raise PatternPackError(f"{path or 'pack'}: expected a mapping with 'version' and 'patterns'")
+    version = data.get("version")
+    if version is None or str(version).strip() == "":
+        raise PatternPackError(f"{path or 'pack'}: missing 'version'")
+
+    try:
+        entries = validate_entries(data.get("patterns"))
+    except PatternPackError as e:
+        raise PatternPackError(f"{path or 'pack'}: {e}") from e
+
+    # Built directly rather than through compile_patterns() - old pack versions
+    # shouldn't stay pinned in its cache after a reload
+    matcher = CompiledPatternSet(entries)
+    return PatternPack(
+        version=str(version),
+        entries=entries,
+        matcher=matcher,
+        path=path,
+        mtime_ns=mtime_ns,
+        load_seconds=time.perf_counter() - started,
+    )
+
+
+def load_pattern_pack(path: Union[str, Path] = DEFAULT_PACK_PATH) -> PatternPack:
+    """
+    Load, validate and compile a pattern pack file.
+
+    Args:
+        path: YAML pack file
+
+    Returns:
+        Compiled PatternPack
+
+    Raises:
+        PatternPackError: Missing/unreadable file, bad YAML or invalid entries
+    """
+    path = Path(path)
+    started = time.perf_counter()
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=_YamlLoader)
+    except (OSError, yaml.YAMLError) as e:
+        raise PatternPackError(f"Could not read pattern pack {path}: {e}") from e
+    pack = parse_pattern_pack(data, path=path, mtime_ns=mtime_ns)
+    return replace(pack, load_seconds=time.perf_counter() - started)
+
+
+class PatternPackSource:
+    """
+    Holds the current pattern pack for a file and hot-swaps it when the file changes.
+
+    current() is lock-free: it returns whatever snapshot is installed. At most
+    every check_interval seconds it stats the file, and if it changed, starts a
+    background reload. The new pack is swapped in with a single assignment once
+    it's compiled, so in-flight callers finish on the snapshot they started with.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_PACK_PATH,
+        check_interval: Optional[float] = RELOAD_CHECK_INTERVAL,
+    ):
+        """
+        Args:
+            path: YAML pack file
+            check_interval: Seconds between mtime checks, None = never auto-reload
+        """
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.last_error: Optional[str] = None
+        self._failed_mtime_ns: Optional[int] = None
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
+        # Initial load is synchronous - a bad pack at startup should fail loudly
+        self._pack = load_pattern_pack(self.path)
+        self._schedule_next_check()
+
+    @property
+    def pack(self) -> PatternPack:
+        """Currently installed snapshot (no reload check)."""
+        return self._pack
+
+    def current(self) -> PatternPack:
+        """Current snapshot; kicks off a background reload if the file changed."""
+        if self.check_interval is not None and time.monotonic() >= self._next_check:
+            self._check_for_changes()
+        return self._pack
+
+    def reload(self, wait: bool = True) -> bool:
+        """
+        Reload the pack if the file changed since the installed snapshot.
+
+        Args:
+            wait: True = reload on this thread and return when done,
+                  False = reload on a background thread
+
+        Returns:
+            True if a new pack was installed (always False when wait=False)
+        """
+        if not wait:
+            if self._reload_lock.locked():
+                return False
+            threading.Thread(target=self.reload, name="pattern-pack-reload", daemon=True).start()
+            return False
+
+        with self._reload_lock:
+            mtime_ns = self._mtime_ns()
+            if mtime_ns is None:
+                self.last_error = f"Pattern pack {self.path} is missing"
+                return False
+            if mtime_ns in (self._pack.mtime_ns, self._failed_mtime_ns):
+                return False
+            try:
+                pack = load_pattern_pack(self.path)
+            except PatternPackError as e:
+                if self._mtime_ns() != mtime_ns:
+                    # Caught it mid-write - the next check will pick up the finished file
+                    return False
+                # Keep serving the last good pack, don't retry until the file changes again
+                self._failed_mtime_ns = mtime_ns
+                self.last_error = str(e)
+                print(f"Pattern pack reload failed, keeping version {self._pack.version}: {e}")
+                return False
+            self.last_error = None
+            self._pack = pack  # atomic swap
+            return True
+
+    def _check_for_changes(self) -> None:
+        self._schedule_next_check()
+        mtime_ns = self._mtime_ns()
+        if mtime_ns is None:
+            return
+        changed = mtime_ns not in (self._pack.mtime_ns, self._failed_mtime_ns)
+        if changed:
+            self.reload(wait=False)
+
+    def _mtime_ns(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _schedule_next_check(self) -> None:
+        if self.check_interval is not None:
+            self._next_check = time.monotonic() + self.check_interval
+
+
+# One source per pack file per process
+_sources: Dict[Union[str, Path], PatternPackSource] = {}
+_sources_lock = threading.Lock()
+
+
+def get_pattern_source(path: Union[str, Path] = DEFAULT_PACK_PATH) -> PatternPackSource:
+    """
+    Shared PatternPackSource for a pack file (created on first use).
+
+    Args:
+        path: YAML pack file
+
+    Returns:
+        The process-wide source for that file
+    """
+    source = _sources.get(path)
+    if source is None:
+        key = Path(path).resolve()
+        with _sources_lock:
+            source = _sources.get(key)
+            if source is None:
+                source = PatternPackSource(key)
+                _sources[key] = source
+            # Also remember it under the path as given - resolve() isn't free
+            _sources[path] = source
+    return source
@@ -15,8 +15,30 @@ from typing import Dict, List
 import os
 
 from src.llm_adapter import LLMAdapter
-from src.explicit_detector import ExplicitDetector
+from src.explicit_detector import get_detector
 from src.classification_rules import ClassificationRules, canonicalize_label
+from src.latency_budget import DEFAULT_TURN_BUDGET
+
+# Hard limit on the LLM call - past it classify_incident() returns the keyword fallback
+PHASE1_LLM_BUDGET = DEFAULT_TURN_BUDGET
+
+
+def _explicit_candidates(explicit_scores: Dict[str, float]) -> List[Dict]:
+    """
+    Turn detector label scores into candidate dicts (canonical labels, best score each).
+    
+    Args:
+        explicit_scores: {label: confidence} from ExplicitDetector.detect_scores()
+    
+    Returns:
+        List of {"label", "score"} dicts, highest score first
+    """
+    candidates: Dict[str, float] = {}
+    for raw_label, conf in explicit_scores.items():
+        canonical = canonicalize_label(raw_label)
+        if canonical not in candidates:
+            candidates[canonical] = conf
+    return [{"label": lbl, "score": conf} for lbl, conf in candidates.items()]
 
 
 def run_phase1_classification(user_text: str) -> Dict:
@@ -41,8 +63,10 @@ def run_phase1_classification(user_text: str) -> Dict:
         }
 
     # Fast path: try keyword detection first (only for very obvious cases)
-    detector = ExplicitDetector()
-    explicit_label, explicit_conf = detector.detect(user_text)
+    # One scan scores every label - best one first, same as detect()
+    detector = get_detector()
+    explicit_scores = detector.detect_scores(user_text)
+    explicit_label, explicit_conf = next(iter(explicit_scores.items()), (None, 0.0))
     
     # Skip LLM for high-confidence explicit detection (optimization)
     # Lowered threshold from 0.90 to 0.85 to enable fast path more often
@@ -53,11 +77,12 @@ def run_phase1_classification(user_text: str) -> Dict:
             "label": canonical,
             "score": explicit_conf,
             "rationale": f"High-confidence explicit detection: {explicit_label}",
-            "candidates": [{"label": canonical, "score": explicit_conf}]
+            "candidates": _explicit_candidates(explicit_scores)
         }
 
     # Need LLM for semantic classification
-    if not os.getenv("GEMINI_API_KEY") and not os.getenv("OPENAI_API_KEY"):
+    offline_fake = os.getenv("LLM_PROVIDER", "").lower() == "fake"  # src/fake_llm.py needs no key
+    if not offline_fake and not os.getenv("GEMINI_API_KEY") and not os.getenv("OPENAI_API_KEY"):
         # No API key available
         return {
             "label": "other",
@@ -67,8 +92,8 @@ def run_phase1_classification(user_text: str) -> Dict:
         }
 
     try:
-        adapter = LLMAdapter(model="gemini-2.5-pro")
-        raw = adapter.classify_incident(user_text)
+        adapter = LLMAdapter(model="gemini-2.5-pro")  # cheap - reuses the shared SDK client
+        raw = adapter.classify_incident(user_text, budget=PHASE1_LLM_BUDGET)
         
         # Prefer fine_label over category (fine_label is more specific)
         # The LLM adapter should have normalized incident_type to category, but fine_label is preferred
@@ -145,12 +170,15 @@ def run_phase1_classification(user_text: str) -> Dict:
         
         candidates = [{"label": label, "score": score}]
         
-        return {
+        result = {
             "label": label,
             "score": score,
             "rationale": rationale,
             "candidates": candidates,
         }
+        if raw.get("degraded"):
+            result["degraded"] = True  # LLM timed out - keyword fallback
+        return result
 
     except Exception as e:
         # Error handling - return safe fallback
@@ -0,0 +1,339 @@
+# src/rate_limiter.py
+"""
+Client-side rate limiting and retries for LLM provider calls.
+
+Each provider/API key gets an AdaptiveRateLimiter - a token bucket whose rate
+backs off when the provider answers 429 (down to the throughput the provider
+actually allowed, and paused for retry-after if it sent one) and creeps back
+up on successful calls. Calls go
+through call_with_retry() / acall_with_retry(), which retry throttling and
+transient 5xx/connection errors with exponential backoff + full jitter, but
+never past the caller's deadline.
+
+Deadlines are absolute time.monotonic() values, so one budget can cover the
+rate-limit wait, every attempt and every backoff sleep.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying - 529 is Anthropic's "overloaded"
+RETRYABLE_STATUS = frozenset((408, 429, 500, 502, 503, 504, 529))
+
+# Gemini puts the retry delay in the message ("Please retry in 20.5s")
+_RETRY_IN_RE = re.compile(r"retry in ([0-9.]+)\s*s", re.IGNORECASE)
+
+# Starting (and maximum) requests/second per provider - the limiter only
+# slows down once the provider pushes back
+PROVIDER_RATE_LIMITS = {
+    "gemini": 5.0,
+    "openai": 10.0,
+    "anthropic": 5.0,
+    "fake": 10.0,  # same as openai - src/fake_llm.py stands in for an OpenAI-style API
+}
+DEFAULT_RATE_LIMIT = 5.0
+
+# On a 429 the limiter drops to the success rate it actually got over this
+# window (the provider's real quota), falling back to halving without data
+THROUGHPUT_WINDOW = 2.0
+MIN_THROUGHPUT_SAMPLES = 4
+
+
+class RetryDeadlineExceeded(TimeoutError):
+    """No rate-limit slot (or retry) fits before the caller's deadline."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How many times to try a call and how long to back off in between."""
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket that adapts its rate to the provider's throttling.
+
+    reserve() hands out request slots. on_throttle() drops the rate to the
+    success rate the provider allowed over the last THROUGHPUT_WINDOW seconds
+    (or multiplies it by backoff_factor if there's too little data) - at most
+    once per cooldown, so a burst of 429s from one overload doesn't collapse
+    it - and honours retry-after. on_success() probes back up a small step.
+    Thread-safe, and the same instance works for sync and async callers.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        min_rate: float = 0.2,
+        recovery_step: float = 0.01,
+        backoff_factor: float = 0.5
+    ):
+        """
+        Args:
+            rate: Starting and maximum requests per second
+            burst: Bucket size (default: one second's worth)
+            min_rate: Never slow down below this
+            recovery_step: Fraction of the max rate added back per success
+            backoff_factor: Rate multiplier on a 429 when there's no throughput data
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.recovery_step = recovery_step
+        self.backoff_factor = backoff_factor
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._cooldown_until = 0.0
+        self._successes = deque()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "waited_s": 0.0}
+
+    def reserve(self, deadline: Optional[float] = None) -> Optional[float]:
+        """
+        Take a request slot.
+
+        Args:
+            deadline: time.monotonic() the request must start by
+
+        Returns:
+            Seconds to wait before sending, or None if that would pass the
+            deadline (no slot is taken then)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self._blocked_until - now)
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                return None
+            self._tokens -= 1
+            self.stats["requests"] += 1
+            self.stats["waited_s"] += wait
+            return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._successes.append(now)
+            while self._successes[0] < now - THROUGHPUT_WINDOW:
+                self._successes.popleft()
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery_step)
+
+    def on_retry(self) -> None:
+        with self._lock:
+            self.stats["retries"] += 1
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.stats["throttled"] += 1
+            if now >= self._cooldown_until:
+                while self._successes and self._successes[0] < now - THROUGHPUT_WINDOW:
+                    self._successes.popleft()
+                if len(self._successes) >= MIN_THROUGHPUT_SAMPLES:
+                    achieved = len(self._successes) / THROUGHPUT_WINDOW
+                    self.rate = max(self.min_rate, min(self.rate, achieved))
+                else:
+                    self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+                self._cooldown_until = now + max(retry_after or 0.0, 1.0 / self.rate)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._tokens = min(self._tokens, 0.0)
+
+    def _refill(self, now: float) -> None:
+        # burst shrinks with the rate - a full bucket after a backoff would just
+        # fire another over-quota burst
+        burst = min(self.burst, max(1.0, self.rate))
+        self._tokens = min(burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """
+    Work out whether a provider error is worth retrying.
+
+    Understands the OpenAI/Anthropic SDK errors (status_code + response
+    headers), google.api_core errors (code), and plain connection/timeouts.
+
+    Returns:
+        (retryable, throttled, retry_after seconds or None)
+    """
+    status = getattr(exc, "status_code", None)
+    if not isinstance(status, int):
+        code = getattr(exc, "code", None)
+        status = code if isinstance(code, int) else None
+
+    if status is None:
+        names = {cls.__name__ for cls in type(exc).__mro__}
+        transient = isinstance(exc, (ConnectionError, TimeoutError)) or bool(
+            names & {"APIConnectionError", "APITimeoutError", "TransportError", "DeadlineExceeded"}
+        )
+        return transient, False, None
+
+    if status not in RETRYABLE_STATUS:
+        return False, False, None
+    return True, status == 429, _retry_after(exc)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            pass  # HTTP-date form - fall back to our own backoff
+    m = _RETRY_IN_RE.search(str(exc))
+    return float(m.group(1)) if m else None
+
+
+def _next_delay(
+    exc: BaseException,
+    attempt: int,
+    limiter: Optional[AdaptiveRateLimiter],
+    policy: RetryPolicy,
+    deadline: Optional[float]
+) -> float:
+    """Delay before the next attempt, or re-raise exc if we shouldn't retry."""
+    retryable, throttled, retry_after = classify_error(exc)
+    if not retryable:
+        raise exc
+    if limiter is not None and throttled:
+        limiter.on_throttle(retry_after)
+    if attempt >= policy.max_attempts:
+        raise exc
+    if limiter is not None and throttled:
+        # the limiter has already slowed down and blocked until retry-after -
+        # backing off on top of that would leave quota unused
+        delay = 0.0
+    else:
+        delay = max(policy.backoff(attempt), retry_after or 0.0)
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        raise exc
+    if limiter is not None:
+        limiter.on_retry()
+    return delay
+
+
+def call_with_retry(
+    fn: Callable[[Optional[float]], T],
+    limiter: Optional[AdaptiveRateLimiter] = None,
+    policy: RetryPolicy = RetryPolicy(),
+    deadline: Optional[float] = None
+) -> T:
+    """
+    Call fn under the rate limiter, retrying transient failures.
+
+    Args:
+        fn: Does one attempt; gets the seconds left before the deadline
+            (None = no deadline) to use as its request timeout
+        limiter: Rate limiter for the provider (None = don't limit)
+        policy: Retry/backoff settings
+        deadline: time.monotonic() to give up by
+
+    Returns:
+        fn's result
+
+    Raises:
+        The last provider error if retries run out / aren't allowed,
+        RetryDeadlineExceeded if no slot was free before the deadline
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            wait = limiter.reserve(deadline)
+            if wait is None:
+                raise RetryDeadlineExceeded("rate limit: no request slot before the deadline")
+            if wait:
+                time.sleep(wait)
+        attempt += 1
+        try:
+            result = fn(_remaining(deadline))
+        except Exception as e:
+            time.sleep(_next_delay(e, attempt, limiter, policy, deadline))
+            continue
+        if limiter is not None:
+            limiter.on_success()
+        return result
+
+
+async def acall_with_retry(
+    fn: Callable[[Optional[float]], Awaitable[T]],
+    limiter: Optional[AdaptiveRateLimiter] = None,
+    policy: RetryPolicy = RetryPolicy(),
+    deadline: Optional[float] = None
+) -> T:
+    """Async version of call_with_retry() - fn is a coroutine function."""
+    attempt = 0
+    while True:
+        if limiter is not None:
+            wait = limiter.reserve(deadline)
+            if wait is None:
+                raise RetryDeadlineExceeded("rate limit: no request slot before the deadline")
+            if wait:
+                await asyncio.sleep(wait)
+        attempt += 1
+        try:
+            result = await fn(_remaining(deadline))
+        except Exception as e:
+            await asyncio.sleep(_next_delay(e, attempt, limiter, policy, deadline))
+            continue
+        if limiter is not None:
+            limiter.on_success()
+        return result
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return max(0.01, deadline - time.monotonic())
+
+
+# One limiter per provider + API key (quotas are per key) per process
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, key_id: str = "") -> AdaptiveRateLimiter:
+    """
+    Shared rate limiter for a provider/API key (created on first use).
+
+    Args:
+        provider: "openai", "anthropic", "gemini", ...
+        key_id: Identifies the API key (a fingerprint, not the key)
+
+    Returns:
+        The process-wide limiter for that key
+    """
+    key = (provider, key_id)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = AdaptiveRateLimiter(PROVIDER_RATE_LIMITS.get(provider, DEFAULT_RATE_LIMIT))
+                _limiters[key] = limiter
+    return limiter
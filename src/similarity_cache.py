@@ -0,0 +1,169 @@
+# src/similarity_cache.py
+"""
+Near-duplicate lookup for the classification cache.
+
+The exact cache keys on the normalized text, so "SQL injection on login" and
+"sql injection on the login page" are two misses and two LLM calls. This
+index finds an earlier incident whose word set is close enough:
+
+- tokens: lowercased words, punctuation and common stopwords dropped
+- negations ("no", "not", "never", "didn't", ...) flip the meaning while
+  barely moving the similarity, so texts only match with the same ones
+- MinHash signature (NUM_PERM hashes) over the token set, split into LSH
+  bands - texts sharing any band are candidates, so a lookup only looks at
+  a handful of entries however many are cached
+- candidates are checked with their exact Jaccard similarity against the
+  threshold, so MinHash only decides what gets looked at, never what matches
+
+Only the token sets live here - results stay in ClassificationCache, which
+adds/removes keys as its entries come and go. Each key has a scope (the
+cache key's context / model / prompt / namespace part); the scope is part
+of every LSH bucket, so texts only ever match within the same one.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+# Default Jaccard similarity for reusing a classification. On the test
+# corpora (scripts/benchmark_similarity_cache.py) 0.7 catches more rewordings
+# but starts matching a single-incident report to the same text plus a
+# second incident ("... Also, ..."), which has more labels
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+
+# 16 bands x 4 rows: pairs at Jaccard 0.8 become candidates ~99.9% of the
+# time, pairs at 0.3 ~12%
+NUM_PERM = 64
+LSH_BANDS = 16
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9._'-]*[a-z0-9]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a an the and or but if then so to of in on at by for with from into onto as is are was were be been being
+am do does did has have had it its this that these those there here i me my we our you your he she they them
+their his her just also very really some any can could would should will may might
+""".split())
+
+NEGATIONS = frozenset("""
+no not never none nothing nobody without cannot can't don't doesn't didn't isn't wasn't aren't weren't won't
+haven't hasn't couldn't shouldn't
+""".split())
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Normalized word set of a text (what similarity is measured on)."""
+    return frozenset(w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _permutations(num_perm: int) -> List[Tuple[int, int]]:
+    # fixed, so signatures are the same in every process
+    digest = hashlib.sha256(b"classification-minhash").digest()
+    seed = int.from_bytes(digest, "big")
+    perms = []
+    for _ in range(num_perm):
+        seed = (seed * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        a = seed % (_MERSENNE_PRIME - 1) + 1
+        seed = (seed * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        perms.append((a, seed % _MERSENNE_PRIME))
+    return perms
+
+
+_PERMS = _permutations(NUM_PERM)
+
+
+def minhash(tokens: FrozenSet[str]) -> Tuple[int, ...]:
+    """MinHash signature of a token set."""
+    hashes = [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "big") for t in tokens]
+    if not hashes:
+        return (_MERSENNE_PRIME,) * NUM_PERM
+    return tuple([min([(a * h + b) % _MERSENNE_PRIME for h in hashes]) for a, b in _PERMS])
+
+
+class NearDuplicateIndex:
+    """MinHash-LSH index of cache keys by their texts' token sets."""
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        """
+        Args:
+            threshold: Minimum Jaccard similarity of the token sets for a match
+        """
+        self.threshold = threshold
+        self._rows = NUM_PERM // LSH_BANDS
+        self._tokens: Dict[str, FrozenSet[str]] = {}
+        self._bands: Dict[str, List[Tuple[Any, ...]]] = {}
+        self._buckets: List[Dict[Tuple[Any, ...], Set[str]]] = [{} for _ in range(LSH_BANDS)]
+        self._lock = threading.Lock()
+
+    def _band_keys(self, tokens: FrozenSet[str], scope: str) -> List[Tuple[Any, ...]]:
+        signature = minhash(tokens)
+        return [(scope,) + signature[i * self._rows:(i + 1) * self._rows] for i in range(LSH_BANDS)]
+
+    def add(self, key: str, text: str, scope: str = "") -> None:
+        tokens = tokenize(text)
+        bands = self._band_keys(tokens, scope)
+        with self._lock:
+            self._remove(key)
+            self._tokens[key] = tokens
+            self._bands[key] = bands
+            for buckets, band in zip(self._buckets, bands):
+                buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        bands = self._bands.pop(key, None)
+        if bands is None:
+            return
+        del self._tokens[key]
+        for buckets, band in zip(self._buckets, bands):
+            bucket = buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[band]
+
+    def query(self, text: str, scope: str = "") -> Optional[Tuple[str, float]]:
+        """
+        Most similar indexed key in the same scope at or above the threshold.
+
+        Returns:
+            (key, Jaccard similarity) or None
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        bands = self._band_keys(tokens, scope)
+        best: Optional[Tuple[str, float]] = None
+        with self._lock:
+            candidates = set()
+            for buckets, band in zip(self._buckets, bands):
+                candidates |= buckets.get(band, set())
+            negations = tokens & NEGATIONS
+            for key in candidates:
+                if self._tokens[key] & NEGATIONS != negations:
+                    continue
+                similarity = jaccard(tokens, self._tokens[key])
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+        return best
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._bands.clear()
+            for buckets in self._buckets:
+                buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
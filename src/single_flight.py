@@ -0,0 +1,170 @@
+# src/single_flight.py
+"""
+Single-flight coalescing of identical in-flight LLM calls.
+
+The classification cache only fills once a call finishes, so when several
+analysts report the same alert within seconds (or a script fires the same
+case a few times at once) every one of them pays for its own provider call.
+SingleFlight lets the first caller for a key run the call while the others
+wait for its result:
+
+    result, shared = flights.do(key, lambda: expensive_call(), deadline)
+
+Works across threads (Streamlit sessions) and event loops - the shared
+result is a concurrent.futures.Future, which async callers await through
+asyncio.wrap_future(). Followers get a deep copy, so callers that adjust the
+result dict don't see each other's changes.
+
+An error from the call is shared too - except running out of time or being
+cancelled: that's the leader's own deadline, not the request's fault, so a
+waiting follower with time left takes over and makes the call itself.
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Abandoned(Exception):
+    """The leader stopped without an answer the followers should share."""
+
+
+class _Flight:
+    __slots__ = ("future", "thread")
+
+    def __init__(self):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.thread = threading.get_ident()
+
+
+class SingleFlight:
+    """Registry of in-flight calls by key."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def join(self, key: Hashable) -> Tuple[_Flight, bool]:
+        """
+        The in-flight call for a key, starting one if there is none.
+
+        Returns:
+            (flight, True if the caller is the leader and has to make the call)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.stats["coalesced"] += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self.stats["calls"] += 1
+            return flight, True
+
+    def finish(self, key: Hashable, flight: _Flight, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Leader is done - hand the result (or error) to everyone waiting."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is None:
+            # a snapshot - the leader's caller is free to change its own copy
+            flight.future.set_result(copy.deepcopy(result))
+        elif isinstance(error, (TimeoutError, asyncio.TimeoutError)) or not isinstance(error, Exception):
+            flight.future.set_exception(_Abandoned())  # timed out / cancelled / generator closed
+        else:
+            flight.future.set_exception(error)
+
+    def wait(self, flight: _Flight, deadline: Optional[float] = None) -> Any:
+        """
+        Block until the leader finishes (sync followers).
+
+        Raises:
+            TimeoutError: deadline (time.monotonic()) passed first
+            _Abandoned: leader gave up - make the call yourself
+        """
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return copy.deepcopy(flight.future.result(timeout))
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError("Timed out waiting for an identical in-flight call") from None
+
+    async def await_(self, flight: _Flight, deadline: Optional[float] = None) -> Any:
+        """Async wait() - the leader can be in any thread or event loop."""
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        # shield: a follower timing out mustn't cancel the shared future
+        waiter = asyncio.shield(asyncio.wrap_future(flight.future))
+        try:
+            return copy.deepcopy(await asyncio.wait_for(waiter, timeout))
+        except asyncio.TimeoutError:
+            raise TimeoutError("Timed out waiting for an identical in-flight call") from None
+
+    def claim(self, key: Hashable, deadline: Optional[float] = None) -> Tuple[Optional[_Flight], bool, Any]:
+        """
+        Lead the call for a key, or wait for the one already running (sync).
+
+        Returns:
+            (flight, shared, result) - shared: result is another caller's.
+            Otherwise the caller makes the call itself and reports it with
+            finish(key, flight, ...) - unless flight is None (nothing to report)
+        """
+        while True:
+            flight, leader = self.join(key)
+            if leader:
+                return flight, False, None
+            if flight.thread == threading.get_ident():
+                # the leader is this thread's own event loop - blocking here
+                # would stop it from ever finishing
+                return None, False, None
+            try:
+                return None, True, self.wait(flight, deadline)
+            except _Abandoned:
+                continue
+
+    def do(self, key: Hashable, call: Callable[[], Any], deadline: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        call() once for all concurrent callers with the same key.
+
+        Returns:
+            (result, True if it came from another caller's call)
+        """
+        flight, shared, result = self.claim(key, deadline)
+        if shared:
+            return result, True
+        if flight is None:
+            return call(), False
+        try:
+            result = call()
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result)
+        return result, False
+
+    async def ado(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        deadline: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """Async do() - call() returns the coroutine to run."""
+        while True:
+            flight, leader = self.join(key)
+            if leader:
+                try:
+                    result = await call()
+                except BaseException as e:
+                    self.finish(key, flight, error=e)
+                    raise
+                self.finish(key, flight, result)
+                return result, False
+            try:
+                return await self.await_(flight, deadline), True
+            except _Abandoned:
+                continue
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,119 @@
+# tests/test_batch_inference.py
+"""
+Tests for offline batch classification (src/batch_inference.py).
+
+Provider clients are fakes, so these run offline.
+"""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.batch_inference import case_requests, load_results
+from src.llm_adapter import LLMAdapter
+from src.rate_limiter import RetryPolicy
+
+CASES = [
+    {"id": "A05-01", "user_input": "SQL injection on the login form"},
+    {"id": "A01-02", "user_input": "users can see other users' invoices"},
+    {"id": "A04-03", "user_input": "passwords stored in plain text"},
+]
+
+
+def classification(text: str) -> str:
+    return json.dumps({"fine_label": "injection", "confidence": 0.9, "rationale": text})
+
+
+class FakeAsyncClient:
+    def __init__(self, fail_on: str = None):
+        self.fail_on = fail_on
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        message = kwargs["messages"][-1]["content"]
+        self.calls.append(message)
+        if self.fail_on and self.fail_on in message:
+            raise RuntimeError("500 server error")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=classification(message)))],
+                               usage=None)
+
+
+def make_adapter(client) -> LLMAdapter:
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter._async_client = client
+    adapter.rate_limiter = None
+    adapter.retry_policy = RetryPolicy(max_attempts=1)
+    return adapter
+
+
+def test_local_batch_checkpoints_and_resumes(tmp_path):
+    output = tmp_path / "out.jsonl"
+    requests = case_requests(CASES, num_runs=2)
+    assert len({r["id"] for r in requests}) == 6
+
+    first = FakeAsyncClient(fail_on="plain text")
+    results = make_adapter(first).classify_batch(requests, str(output), mode="local")
+    assert len(first.calls) == 6
+    assert sum("error" in r for r in results.values()) == 2
+
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"id": "torn')  # killed mid-write
+
+    second = FakeAsyncClient()
+    results = make_adapter(second).classify_batch(requests, str(output), mode="local")
+    assert len(second.calls) == 2  # only the failed ones again
+    assert all(r["result"]["category"] == "injection" for r in results.values())
+    assert len(load_results(output)) == 6
+
+
+def test_openai_batch_endpoint_is_submitted_once_and_resumed(tmp_path):
+    output = tmp_path / "out.jsonl"
+    requests = case_requests(CASES)
+    submitted = []
+    status = {"value": "in_progress"}
+
+    def files_create(file, purpose):
+        submitted.append([json.loads(line) for line in file[1].getvalue().decode().splitlines()])
+        return SimpleNamespace(id="file-in")
+
+    def files_content(file_id):
+        lines = [
+            json.dumps({"custom_id": entry["custom_id"], "error": None, "response": {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": classification(entry["body"]["messages"][-1]["content"])}}]},
+            }})
+            for entry in submitted[0]
+        ]
+        return SimpleNamespace(text="\n".join(lines))
+
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter.client = SimpleNamespace(
+        files=SimpleNamespace(create=files_create, content=files_content),
+        batches=SimpleNamespace(
+            create=lambda **kwargs: SimpleNamespace(id="batch_1"),
+            retrieve=lambda batch_id: SimpleNamespace(status=status["value"], output_file_id="file-out",
+                                                      error_file_id=None),
+        ),
+    )
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("src.batch_inference.time.sleep", interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            adapter.classify_batch(requests, str(output), mode="provider")
+    assert Path(f"{output}.batch.json").exists()
+    assert submitted[0][0]["body"]["response_format"]["type"] == "json_schema"
+
+    status["value"] = "completed"
+    results = adapter.classify_batch(requests, str(output), mode="provider")
+    assert len(submitted) == 1  # resumed the same batch
+    assert [r["result"]["category"] for r in results.values()] == ["injection"] * 3
+    assert not Path(f"{output}.batch.json").exists()
@@ -0,0 +1,136 @@
+# tests/test_classification_cache.py
+"""
+Tests for the classification result cache (src/classification_cache.py).
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import classification_cache
+from src.cache_store import SQLiteCacheStore
+from src.classification_cache import ClassificationCache
+
+RESULT = {"fine_label": "injection", "confidence": 0.9, "incident_type": "A05:2025 - Injection",
+          "rationale": "SQL error after a quote in the login form", "labels": ["injection"]}
+
+
+def test_lru_eviction_ttl_and_counters(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(classification_cache.time, "monotonic", lambda: now[0])
+    cache = ClassificationCache(ttl_hours=1, max_size=2)
+
+    cache.set("first", RESULT)
+    cache.set("second", RESULT)
+    assert cache.get("  FIRST ") is RESULT  # now most recently used
+    cache.set("third", RESULT)
+    assert cache.get("second") is None  # least recently used went
+    assert cache.get("first") is RESULT
+
+    now[0] += 3601
+    assert cache.get("third") is None  # expired on lookup
+    assert cache.stats() == {
+        "entries": 1, "bytes": cache.nbytes, "hits": 2, "misses": 2, "hit_rate": 0.5, "l2_hits": 0, "near_hits": 0,
+        "evictions": 1, "expirations": 1,
+    }
+
+
+def test_memory_bound_and_concurrent_sets():
+    one_entry = ClassificationCache()
+    one_entry.set("probe", RESULT)
+    cache = ClassificationCache(max_bytes=one_entry.nbytes * 50)
+
+    def worker(n):
+        for i in range(500):
+            cache.set(f"incident {n}-{i}", RESULT)
+            cache.get(f"incident {n}-{i - 1}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.stats()
+    assert stats["entries"] == 50
+    assert stats["bytes"] <= cache.max_bytes
+    assert stats["evictions"] == 8 * 500 - 50
+    assert stats["hits"] + stats["misses"] == 8 * 500
+
+
+def test_near_duplicate_reuses_result_with_similarity():
+    cache = ClassificationCache(similarity_threshold=0.7, max_size=2)
+    cache.set("SQL injection on login", RESULT)
+
+    near = cache.get("sql injection on the login page")
+    assert near["fine_label"] == "injection"
+    assert near["cache_similarity"] == 0.75
+    assert "cache_similarity" not in cache.get("SQL injection on login")  # exact hit, untouched
+    assert cache.get("SQL injection on the checkout page") is None  # 0.6
+    assert cache.get("no sql injection on login") is None  # negation kept
+
+    cache.set("passwords stored in plain text", RESULT)
+    cache.set("users see other users' invoices", RESULT)  # evicts the SQL entry
+    assert cache.get("sql injection on the login page") is None
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_keys_cover_context_model_prompt_and_namespace_bumps(tmp_path):
+    cache = ClassificationCache(similarity_threshold=0.7)
+    scope = {"context": "Keyword hint: 'injection'", "conversation_history": "User: the login page errors",
+             "model": "gpt-4o-mini", "prompt": "prompt-v1"}
+    cache.set("SQL injection on login", RESULT, **scope)
+
+    assert cache.get("sql  injection ON login", **scope) is RESULT
+    assert cache.get("SQL injection on login") is None
+    for change in ({"context": ""}, {"conversation_history": "User: checkout is slow"},
+                   {"model": "claude-sonnet-4"}, {"prompt": "prompt-v2"}):
+        assert cache.get("SQL injection on login", **{**scope, **change}) is None
+        assert cache.get("sql injection on the login page", **{**scope, **change}) is None
+    assert cache.get("sql injection on the login page", **scope)["cache_similarity"] == 0.75
+
+    assert cache.invalidate() == 1
+    assert cache.get("SQL injection on login", **scope) is None
+    assert cache.get("sql injection on the login page", **scope) is None
+
+    # through the store, a bump reaches other processes too
+    path = tmp_path / "cache.db"
+    first = ClassificationCache(store=SQLiteCacheStore(path))
+    second = ClassificationCache(store=SQLiteCacheStore(path))
+    first.set("SQL injection on login", RESULT, **scope)
+    assert second.get("SQL injection on login", **scope) == RESULT
+    first.invalidate()
+    second._namespaces_read = float("-inf")  # past NAMESPACE_REFRESH
+    assert second.namespace_version() == 1
+    assert ClassificationCache(store=SQLiteCacheStore(path)).get("SQL injection on login", **scope) is None
+
+
+def test_persistent_store_is_shared_and_survives_restart(tmp_path):
+    path = tmp_path / "cache.db"
+    worker_a = ClassificationCache(store=SQLiteCacheStore(path))
+    worker_b = ClassificationCache(store=SQLiteCacheStore(path))  # another process on the same file
+
+    worker_a.set("SQL injection on login", RESULT)
+    assert worker_b.get("sql injection on login") == RESULT
+    assert worker_b.get("sql injection on login") == RESULT  # promoted to memory
+    assert (worker_b.stats()["hits"], worker_b.stats()["l2_hits"]) == (2, 1)
+
+    restarted = ClassificationCache(store=SQLiteCacheStore(path))
+    assert restarted.get("SQL injection on login") == RESULT
+
+    short = ClassificationCache(ttl_hours=-1, store=restarted.store)
+    short.set("already stale", RESULT)
+    assert restarted.get("already stale") is None
+
+
+def test_store_compaction_drops_least_recently_used(tmp_path):
+    store = SQLiteCacheStore(tmp_path / "cache.db", max_bytes=10_000)
+    for i in range(100):
+        store.set(f"key{i:03d}", RESULT, ttl=3600)
+    store.get("key000")  # recently used again
+    removed = store.compact()
+    assert removed["evicted"] > 0
+    assert store.nbytes() <= 10_000
+    assert store.get("key000") is not None
+    assert store.get("key001") is None
@@ -0,0 +1,74 @@
+# tests/test_dialogue_state.py
+"""
+Tests for the token-budgeted conversation history.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dialogue_state import DialogueState, estimate_tokens
+
+
+def make_dialogue(n_turns: int, counter=estimate_tokens) -> DialogueState:
+    dialogue = DialogueState(token_counter=counter)
+    for i in range(n_turns):
+        dialogue.add_turn(f"message number {i} about the login page", {"fine_label": "injection", "confidence": 0.5})
+    return dialogue
+
+
+def test_history_fills_the_budget_newest_first():
+    dialogue = make_dialogue(20)
+    per_turn = dialogue.turns[0].tokens
+
+    history = dialogue.get_full_conversation_history(max_tokens=per_turn * 3)
+    lines = history.splitlines()
+
+    assert lines[0] == "[Note: Showing last 3 turns of 20 total turns]"
+    assert "message number 17" in lines[1] and "message number 19" in history
+    assert "message number 16" not in history
+
+    # no budget = the old turn-count behaviour
+    assert dialogue.get_full_conversation_history(max_turns=50, max_tokens=None).count("User:") == 20
+
+
+def test_turn_token_counts_are_cached():
+    calls = []
+
+    def counting(text):
+        calls.append(text)
+        return estimate_tokens(text)
+
+    dialogue = make_dialogue(10, counter=counting)
+    for _ in range(5):
+        dialogue.get_full_conversation_history(max_tokens=100)
+
+    assert len(calls) == 10  # once per turn, not per build
+    assert dialogue.get_history_tokens() == sum(t.tokens for t in dialogue.turns)
+
+
+def test_long_pasted_turn_is_clipped_to_the_budget():
+    dialogue = make_dialogue(3)
+    log = "\n".join(f"2024-05-01 GET /login?id={i}' OR 1=1 -- from 10.0.0.{i % 255}" for i in range(5000))
+    dialogue.add_turn(log, {"fine_label": "sql_injection", "confidence": 0.9})
+
+    history = dialogue.get_full_conversation_history(max_tokens=500)
+
+    assert estimate_tokens(history) <= 550
+    assert "[... truncated, message too long]" in history
+    assert "message number" not in history  # nothing older fits after it
+
+
+@pytest.mark.parametrize("text, low, high", [
+    ("Users can see each other's invoices", 6, 12),
+    ("9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08", 16, 64),
+])
+def test_estimate_tokens_is_in_the_right_range(text, low, high):
+    assert low <= estimate_tokens(text) <= high
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,189 @@
+# tests/test_explicit_detector.py
+"""
+Tests for the explicit detector fast path and its compiled matching engine.
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.explicit_detector import ExplicitDetector, get_detector
+from src.baseline_keyword_classifier import BaselineKeywordClassifier
+from src.pattern_matcher import _chain_search, _compile_chain, compile_patterns, required_literals
+from test_cases import TEST_CASES
+
+
+def _legacy_detect(patterns, text):
+    """Original detect() loop - the compiled engine must agree with it exactly."""
+    text_lower = text.lower()
+    matches = [
+        (label, conf) for pattern, label, conf in patterns
+        if re.search(pattern, text_lower, re.IGNORECASE)
+    ]
+    if not matches:
+        return None, 0.0
+    return max(matches, key=lambda x: x[1])
+
+
+@pytest.mark.parametrize("pattern,expected", [
+    (r"\bsql\s+injection\b", {"injection"}),
+    (r"\bxss\b", {"xss"}),
+    (r"\b(javascript|js|code).*(executed?|runs?|executes?).*(browser|user|page)", {"browser", "user", "page"}),
+    (r"\bsy?yntax.*(appear|show|display)", {"yntax"}),
+    (r"\bcve-\d{4}-\d{4,}", {"cve-"}),
+])
+def test_required_literals(pattern, expected):
+    """The prefilter literal must be something every match contains."""
+    assert required_literals(pattern) == expected
+
+
+def test_compiled_engine_matches_legacy_loop():
+    """Same (label, confidence) as the old loop on the accuracy corpus."""
+    detector = ExplicitDetector()
+    texts = [case["user_input"] for case in TEST_CASES]
+    texts += ["", "nothing to see here", "SQL INJECTION ON LOGIN", "ſql injection"]
+
+    for text in texts:
+        assert detector.detect(text) == _legacy_detect(detector.patterns, text), text
+
+
+def test_tie_breaks_on_table_order():
+    """Equal confidence -> first pattern in the table wins, like max() did."""
+    matcher = compile_patterns([
+        (r"\bfoo", "first", 0.9),
+        (r"\bbar", "second", 0.9),
+        (r"\bbaz", "third", 0.5),
+    ])
+    assert matcher.best_match("bar foo baz") == ("first", 0.9)
+    assert matcher.best_match("baz") == ("third", 0.5)
+    assert matcher.best_match("qux") == (None, 0.0)
+
+
+def test_detect_scores_all_labels():
+    """Every matching label with its best confidence, best first."""
+    detector = ExplicitDetector()
+    text = "SQL injection on the login form and passwords stored in plain text in the database"
+    scores = detector.detect_scores(text)
+
+    assert list(scores.values()) == sorted(scores.values(), reverse=True)
+    assert next(iter(scores.items())) == detector.detect(text)
+    assert scores["injection"] == 0.95
+    assert scores["cryptographic_failures"] == 0.95
+
+    for label, conf in scores.items():
+        best = max(
+            c for p, l, c in detector.patterns
+            if l == label and re.search(p, text.lower(), re.IGNORECASE)
+        )
+        assert conf == best
+
+
+def test_detect_scores_threshold_and_top_k():
+    """Threshold and top_k cut the result down without changing the scores."""
+    detector = ExplicitDetector()
+    text = "weird syntax appear on login page and a db error, also xss in comments"
+    full = detector.detect_scores(text)
+
+    above = detector.detect_scores(text, threshold=0.85)
+    assert above == {k: v for k, v in full.items() if v >= 0.85}
+
+    top1 = detector.detect_scores(text, top_k=1)
+    assert top1 == dict([next(iter(full.items()))])
+
+    assert detector.detect_scores("nothing security related") == {}
+
+
+def test_batch_apis_keep_input_order():
+    """detect_many / classify_many give per-text results in input order, pooled or not."""
+    detector = ExplicitDetector()
+    baseline = BaselineKeywordClassifier()
+    texts = [case["user_input"] for case in TEST_CASES] * 12  # > MIN_CHUNK_SIZE
+
+    expected = [detector.detect(t) for t in texts]
+    assert detector.detect_many(texts) == expected
+    assert detector.detect_many(texts, workers=2, chunk_size=100) == expected
+
+    expected = [baseline.classify(t) for t in texts]
+    assert baseline.classify_many(texts) == expected
+    assert baseline.classify_many(texts, workers=2, chunk_size=100) == expected
+
+
+def test_compiled_once_per_process():
+    """Detectors share the same compiled matcher instead of recompiling."""
+    assert ExplicitDetector()._matcher is ExplicitDetector()._matcher
+    assert ExplicitDetector()._matcher is get_detector()._matcher
+
+
+def test_shared_detector_is_one_read_only_object():
+    """get_detector() hands every caller (and thread) the same immutable detector."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        detectors = list(pool.map(lambda _: get_detector(), range(32)))
+    assert all(d is detectors[0] for d in detectors)
+    assert get_detector(safe_mode=False) is not detectors[0]
+
+    shared = detectors[0]
+    with pytest.raises(AttributeError):
+        shared.enable_profiling()
+    with pytest.raises(AttributeError):
+        shared.safe_mode = False
+    assert shared.profiler is None and shared.safe_mode
+    assert isinstance(shared.patterns, tuple)
+
+
+
+@pytest.mark.parametrize("text", [
+    "enter js in the comment form, it gets executed in the browser",
+    "enter js in the comment\nform, it gets executed in the browser",
+    "enter code\nenter js field runs user",
+    "browser user runs executed field comment js enter",
+])
+def test_chain_search_matches_regex(text):
+    """Linear gap matching agrees with the backtracking regex, newlines included."""
+    pattern = r"\benter.*(javascript|js|code).*(comment|form|field).*(executed|execute|runs?).*(browser|user|screen)"
+    chain = _compile_chain(pattern, re.IGNORECASE)
+    assert _chain_search(chain, text) == bool(re.search(pattern, text, re.IGNORECASE))
+
+
+def test_safe_mode_same_answers_and_fast_on_long_input():
+    """Safe mode keeps every corpus answer and doesn't stall on pasted logs."""
+    safe = ExplicitDetector()
+    unsafe = ExplicitDetector(safe_mode=False)
+    for case in TEST_CASES:
+        text = case["user_input"] * 10  # long enough to take the safe path
+        assert safe.detect(text) == unsafe.detect(text)
+        assert safe.detect_scores(text) == unsafe.detect_scores(text)
+
+    adversarial = "enter javascript comment execute " * 2000  # ~64 KB
+    start = time.perf_counter()
+    safe.detect_scores(adversarial)
+    assert time.perf_counter() - start < 5
+
+
+def test_profiler_records_pattern_costs():
+    """Profiling mode keeps call counts, total and worst time per pattern."""
+    detector = ExplicitDetector()
+    profiler = detector.enable_profiling()
+    detector.detect("sql injection in the login form")
+    detector.detect("x" * 500)
+
+    top = profiler.top(3)
+    assert top and top[0]["calls"] >= 1
+    assert top[0]["total_ms"] >= top[0]["worst_ms"] > 0
+    assert "pattern" in profiler.format_report()
+
+    recorded = {pattern: list(stats) for pattern, stats in profiler.stats.items()}
+    detector.disable_profiling()
+    detector.detect("sql injection in the login form")
+    assert profiler.stats == recorded
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,109 @@
+# tests/test_extractor.py
+"""
+Tests for the single-scan IOC extractor.
+"""
+
+import io
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.extractor import SecurityExtractor
+from test_cases import TEST_CASES
+
+
+LOG = """\
+2024-05-01T10:00:01Z WARN src=10.0.0.5 GET http://203.0.113.7/dl/payload.exe 200
+2024-05-01T10:00:02Z INFO beacon to c2.bad-actor.ru from 10.0.0.5, also 999.1.1.1
+2024-05-01T10:00:03Z ERROR dropped run.ps1 sha256=9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08
+2024-05-01T10:00:04Z ALERT cve-2021-44228 exploit, mail admin@example.org, see https://Portal.Example.com/login?x=1
+2024-05-01T10:00:05Z INFO md5 d41d8cd98f00b204e9800998ecf8427e seen again from 10.0.0.5
+"""
+
+
+def test_extracts_every_field_in_first_seen_order():
+    """One scan fills all fields, deduplicated, in the order they appear."""
+    ents = SecurityExtractor().extract(LOG)
+
+    assert ents.ips == ["10.0.0.5", "203.0.113.7"]
+    assert ents.urls == ["http://203.0.113.7/dl/payload.exe", "https://Portal.Example.com/login?x=1"]
+    assert ents.domains == ["c2.bad-actor.ru", "portal.example.com"]
+    assert ents.hashes == [
+        "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+        "d41d8cd98f00b204e9800998ecf8427e",
+    ]
+    assert ents.cves == ["CVE-2021-44228"]
+    assert ents.emails == ["admin@example.org"]
+    assert ents.filenames == ["payload.exe", "run.ps1"]
+
+
+@pytest.mark.parametrize("text", [
+    "e.g. the login.page broke, i.e. nothing to see",
+    "version 1.2.3.4.5 and build 2024-05-01",
+    "http://localhost:8080/admin",
+])
+def test_no_false_domains(text):
+    """Abbreviations, versions and dotted prose don't turn into domains."""
+    assert SecurityExtractor().extract(text).domains == []
+
+
+def test_finds_everything_the_old_passes_did():
+    """Same IPs/URLs/CVEs/emails/hashes as separate findall passes on the corpus."""
+    extractor = SecurityExtractor()
+    texts = [case["user_input"] for case in TEST_CASES] + [LOG]
+    for text in texts:
+        ents = extractor.extract(text)
+        ips = {
+            ip for ip in re.findall(extractor.IP_PATTERN, text)
+            if all(int(part) <= 255 for part in ip.split("."))
+        }
+        assert ips == set(ents.ips)
+        assert set(re.findall(extractor.URL_PATTERN, text)) == set(ents.urls)
+        assert {c.upper() for c in re.findall(extractor.CVE_PATTERN, text, re.I)} == set(ents.cves)
+        assert set(re.findall(extractor.EMAIL_PATTERN, text)) == set(ents.emails)
+        hashes = re.findall(extractor.HASH_MD5_PATTERN, text) + re.findall(extractor.HASH_SHA256_PATTERN, text)
+        assert set(hashes) <= set(ents.hashes)
+
+
+@pytest.mark.parametrize("make_source", [
+    lambda path: path,
+    lambda path: io.BytesIO(path.read_bytes()),
+    lambda path: io.StringIO(path.read_text(encoding="utf-8")),
+], ids=["mmap-path", "bytes-stream", "text-stream"])
+def test_stream_matches_extract(tmp_path, make_source):
+    """Chunked streaming gives the same result as extract(), even with IOCs cut at chunk edges."""
+    text = LOG * 3
+    path = tmp_path / "incident.log"
+    path.write_text(text, encoding="utf-8")
+
+    # 37-byte chunks split plenty of URLs/hashes across chunk boundaries
+    updates = list(SecurityExtractor().extract_stream(make_source(path), chunk_size=37))
+
+    final = updates[-1]
+    assert final.done and all(not u.done for u in updates[:-1])
+    assert final.entities == SecurityExtractor().extract(text)
+
+    # counts only grow, and "new" adds up to the full result
+    ips = [ip for u in updates for ip in u.new.ips]
+    assert ips == final.entities.ips
+    for before, after in zip(updates, updates[1:]):
+        assert all(after.counts[k] >= before.counts[k] for k in before.counts)
+
+
+def test_stream_caps_entities_per_field(tmp_path):
+    """max_per_field bounds memory on logs full of unique IOCs."""
+    path = tmp_path / "scan.log"
+    path.write_text("".join(f"deny 10.0.{i // 256}.{i % 256}\n" for i in range(500)))
+
+    final = list(SecurityExtractor().extract_stream(path, chunk_size=256, max_per_field=100))[-1]
+    assert len(final.entities.ips) == 100
+    assert final.dropped == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
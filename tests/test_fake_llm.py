@@ -0,0 +1,78 @@
+# tests/test_fake_llm.py
+"""
+Tests for the offline fake provider (src/fake_llm.py) through LLMAdapter.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.llm_adapter as llm_adapter
+from src.fake_llm import FakeAPIError, FakeLLMConfig, configure_fake_llm, load_recordings
+from src.llm_adapter import LLMAdapter
+from src.rate_limiter import RetryPolicy, classify_error
+
+
+@pytest.fixture(autouse=True)
+def fast_fake():
+    configure_fake_llm(FakeLLMConfig(latency_ms=5, latency_sigma=0.0))
+    yield
+    configure_fake_llm(FakeLLMConfig())
+    llm_adapter.clear_provider_clients()
+
+
+def test_fake_provider_classifies_offline_and_replays_recordings(tmp_path, monkeypatch):
+    adapter = LLMAdapter(model="fake")
+    assert adapter.provider == "fake"
+    result = adapter.classify_incident("SQL error after typing ' OR 1=1 into the login form")
+    assert result["category"] == "injection"
+
+    recordings = tmp_path / "recorded.jsonl"
+    recordings.write_text(json.dumps({
+        "description": "Users  can see other users' invoices",
+        "response": {"fine_label": "broken_access_control", "confidence": 0.93, "rationale": "recorded"},
+    }) + "\n")
+    configure_fake_llm(recordings=load_recordings(str(recordings)))
+    result = adapter.classify_incident("users can see other users' invoices")
+    assert (result["category"], result["rationale"]) == ("broken_access_control", "recorded")
+
+    # LLM_PROVIDER=fake switches adapters over without changing model names
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    turn = LLMAdapter(model="gpt-4o-mini").analyze_turn("login from 203.0.113.9 then a download of http://evil.example/x.exe")
+    assert turn["entities"]["ips"] == ["203.0.113.9"]
+    assert turn["clarifying_question"]
+
+
+def test_fake_errors_and_throttling_go_through_retries():
+    throttled = FakeAPIError(429, "Rate limit reached", retry_after=0.5)
+    assert classify_error(throttled) == (True, True, 0.5)
+
+    configure_fake_llm(error_rate=1.0)
+    adapter = LLMAdapter(model="fake")
+    adapter.retry_policy = RetryPolicy(max_attempts=2, base_delay=0.01)
+    with pytest.raises(FakeAPIError):
+        adapter.classify_incident("passwords stored in plain text")
+
+    # fake allows 5/s, the adapter's limiter starts at 10/s - it gets 429s
+    # and waits them out
+    configure_fake_llm(error_rate=0.0, rate_limit=5.0, retry_after=0.05)
+    adapter.retry_policy = RetryPolicy(max_attempts=8, base_delay=0.01)
+    adapter.coalesce = False  # identical descriptions would otherwise share one call
+    results = llm_adapter.asyncio.run(adapter.aclassify_many(["passwords stored in plain text"] * 12))
+    assert all(r["category"] == "cryptographic_failures" for r in results)
+    assert adapter.rate_limiter.rate < 10.0  # throttled down
+
+
+def test_fake_stream_is_deterministic_for_a_seed():
+    def run():
+        configure_fake_llm(FakeLLMConfig(latency_ms=5, latency_sigma=0.5, token_ms=0.1, seed=7))
+        chunks = list(LLMAdapter(model="fake").stream_analyze_turn("my password reset link works for any account"))
+        return [c.text for c in chunks], chunks[-1].result
+
+    first, second = run(), run()
+    assert first == second
+    assert len(first[0]) > 10  # streamed piece by piece
@@ -0,0 +1,415 @@
+# tests/test_llm_adapter.py
+"""
+Tests for the async LLMAdapter API.
+
+The provider's async client is swapped for a fake one that just sleeps, so
+these run offline and measure how many calls overlap.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.llm_adapter as llm_adapter
+from src.llm_adapter import LLMAdapter, get_async_provider_client, key_fingerprint
+
+
+class FakeAsyncOpenAI:
+    """Looks enough like AsyncOpenAI for chat.completions.create()."""
+
+    def __init__(self, latency: float = 0.05, fail_on: str = None):
+        self.latency = latency
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            message = kwargs["messages"][-1]["content"]
+            if self.fail_on and self.fail_on in message:
+                raise RuntimeError("429 rate limited")
+            content = json.dumps({"fine_label": "injection", "confidence": 0.9, "rationale": message})
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        finally:
+            self.in_flight -= 1
+
+
+def make_adapter(client: FakeAsyncOpenAI) -> LLMAdapter:
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter._async_client = client
+    adapter.rate_limiter = None  # measuring overlap here, not pacing
+    return adapter
+
+
+def test_aclassify_incident_matches_sync_output_format():
+    adapter = make_adapter(FakeAsyncOpenAI(latency=0))
+    result = asyncio.run(adapter.aclassify_incident("SQL error on login"))
+
+    assert result["category"] == "injection"  # normalized from fine_label
+    assert result["owasp_version"] == "2025"
+    assert "CURRENT USER MESSAGE: SQL error on login" in result["rationale"]
+
+
+def test_aclassify_many_overlaps_calls_up_to_the_limit():
+    """20 calls x 50 ms at concurrency 5 take ~4 rounds, not 20, and keep input order."""
+    client = FakeAsyncOpenAI(latency=0.05)
+    adapter = make_adapter(client)
+    descriptions = [f"incident {i}" for i in range(20)]
+
+    start = time.perf_counter()
+    results = adapter.classify_many(descriptions, concurrency=5)
+    elapsed = time.perf_counter() - start
+
+    assert client.max_in_flight == 5
+    assert elapsed < 0.5  # serial would be 1.0s
+    assert [r["rationale"].split("CURRENT USER MESSAGE: ")[1].split("\n")[0] for r in results] == descriptions
+
+
+def test_aclassify_many_return_exceptions():
+    adapter = make_adapter(FakeAsyncOpenAI(latency=0, fail_on="incident 2"))
+    descriptions = ["incident 1", "incident 2", "incident 3"]
+
+    results = adapter.classify_many(descriptions, concurrency=2, return_exceptions=True)
+    assert isinstance(results[1], RuntimeError)
+    assert results[0]["category"] == results[2]["category"] == "injection"
+
+    with pytest.raises(RuntimeError):
+        adapter.classify_many(descriptions, concurrency=2)
+
+
+def test_adapters_share_sdk_clients_per_provider_model_and_key():
+    a = LLMAdapter(api_key="sk-test-a", model="gpt-4o-mini")
+    b = LLMAdapter(api_key="sk-test-a", model="gpt-4o-mini")
+    other_key = LLMAdapter(api_key="sk-test-b", model="gpt-4o-mini")
+
+    assert a.client is b.client
+    assert a.client is not other_key.client
+    assert "sk-test-a" not in key_fingerprint("sk-test-a")
+
+
+def test_async_clients_are_shared_per_event_loop():
+    async def grab():
+        first = get_async_provider_client("openai", "gpt-4o-mini", "sk-test")
+        second = get_async_provider_client("openai", "gpt-4o-mini", "sk-test")
+        assert first is second
+        return first
+
+    # a client from a closed loop isn't handed to a new one
+    assert asyncio.run(grab()) is not asyncio.run(grab())
+
+
+def test_anthropic_caches_the_static_classification_prompt():
+    adapter = LLMAdapter(api_key="sk-ant-test", model="claude-3-5-sonnet-20241022")
+
+    kwargs = adapter._request_kwargs(adapter._classification_request("desc", "", None, "history"))
+    assert kwargs["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "CURRENT USER MESSAGE: desc" in kwargs["messages"][0]["content"]
+
+    # short one-off prompts aren't worth a cache write
+    assert isinstance(adapter._request_kwargs(adapter._entities_request("text"))["system"], str)
+    adapter.prompt_caching = False
+    assert isinstance(adapter._request_kwargs(adapter._classification_request("d", "", None, None))["system"], str)
+
+
+def test_usage_is_recorded_per_call():
+    adapter = LLMAdapter(api_key="sk-ant-test", model="claude-3-5-sonnet-20241022")
+    usage = SimpleNamespace(input_tokens=40, cache_read_input_tokens=3000,
+                            cache_creation_input_tokens=0, output_tokens=90)
+    for _ in range(2):
+        adapter._record_usage(SimpleNamespace(usage=usage), latency_s=0.5)
+
+    assert adapter.last_usage.input_tokens == 3040
+    assert adapter.last_usage.cached_input_tokens == 3000
+    assert adapter.usage_totals.calls == 2
+    assert adapter.usage_totals.output_tokens == 180
+
+
+def test_gemini_falls_back_to_system_instruction_without_context_caching(monkeypatch):
+    def no_caching(**kwargs):
+        raise RuntimeError("400 Cached content is too small")
+
+    monkeypatch.setattr(llm_adapter.genai.caching.CachedContent, "create", no_caching)
+    adapter = LLMAdapter(api_key="AIza-test", model="gemini-2.5-pro")
+    request = adapter._classification_request("desc", "", "STATIC PROMPT", None)
+
+    model = adapter._gemini_model(request)
+    assert model is adapter._gemini_model(request)  # built once, shared
+    assert "STATIC PROMPT" in str(model._system_instruction)
+    assert adapter._request_kwargs(request)["contents"] == request.user  # only the dynamic part
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
+
+
+def openai_stream(text: str, piece: int = 7):
+    """Chat completion chunks for text, a few characters each, then the usage chunk."""
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + piece]))], usage=None)
+        for i in range(0, len(text), piece)
+    ]
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None)
+    return chunks + [SimpleNamespace(choices=[], usage=usage)]
+
+
+def make_streaming_adapter(text: str = None, error: Exception = None) -> LLMAdapter:
+    def create(**kwargs):
+        assert kwargs["stream"] is True
+        if error is not None:
+            raise error
+        return iter(openai_stream(text))
+
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    adapter.rate_limiter = None
+    return adapter
+
+
+def test_stream_classify_incident_shows_label_before_the_response_ends():
+    response = json.dumps({
+        "incident_type": "A05:2025 - Injection",
+        "fine_label": "sql_injection",
+        "confidence": 0.85,
+        "rationale": "Syntax errors on the login page " * 20,
+    })
+    adapter = make_streaming_adapter(response)
+    chunks = list(adapter.stream_classify_incident("weird syntax on login"))
+
+    first_label = next(i for i, c in enumerate(chunks) if c.label)
+    assert chunks[first_label].label == "sql_injection"
+    assert first_label < len(chunks) // 3  # long before the rationale is done
+    assert chunks[-1].result == adapter._parse_classification(response)
+    assert chunks[-1].fields["confidence"] == 0.85
+    assert "".join(c.text for c in chunks) == response
+    assert adapter.last_usage.output_tokens == 20
+    assert 0 < adapter.last_usage.ttft_s <= adapter.last_usage.latency_s
+
+
+def test_partial_json_fields_handles_pairs_split_across_chunks():
+    parser = llm_adapter.PartialJSONFields()
+    assert parser.feed('{"fine_label": "broken_acc') == {}
+    assert parser.feed('ess_control", "confidence": 0.') == {"fine_label": "broken_access_control"}
+    fields = parser.feed('9, "labels": ["a", "b"]}')
+    assert fields == {"fine_label": "broken_access_control", "confidence": 0.9, "labels": ["a", "b"]}
+
+
+def test_stream_clarifying_question_strips_quotes_and_falls_back():
+    adapter = make_streaming_adapter('  "What did the error message say?"\n')
+    pieces = list(adapter.stream_clarifying_question("errors", {"confidence": 0.4}))
+    assert len(pieces) > 1
+    assert "".join(pieces) == "What did the error message say?"
+
+    failing = make_streaming_adapter(error=ValueError("bad request"))
+    assert list(failing.stream_clarifying_question("errors", {"confidence": 0.4})) == [llm_adapter.FALLBACK_QUESTION]
+
+
+def test_anthropic_stream_events():
+    adapter = LLMAdapter(api_key="sk-ant-test", model="claude-3-5-haiku-latest")
+    usage = SimpleNamespace(input_tokens=10, output_tokens=1, cache_read_input_tokens=90, cache_creation_input_tokens=0)
+    events = [
+        SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage)),
+        SimpleNamespace(type="content_block_start"),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text="Which ")),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text="page?")),
+        SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=5)),
+        SimpleNamespace(type="message_stop"),
+    ]
+    adapter.client = SimpleNamespace(messages=SimpleNamespace(create=lambda **kwargs: iter(events)))
+    adapter.rate_limiter = None
+
+    assert "".join(adapter.stream_clarifying_question("errors", {"confidence": 0.4})) == "Which page?"
+    assert adapter.last_usage.input_tokens == 100
+    assert adapter.last_usage.cached_input_tokens == 90
+    assert adapter.last_usage.output_tokens == 5
+
+
+def test_classification_requests_use_strict_schema_per_provider():
+    request = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")._classification_request("x", "", None, None)
+
+    openai_kwargs = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")._request_kwargs(request)
+    assert openai_kwargs["response_format"]["type"] == "json_schema"
+    assert openai_kwargs["response_format"]["json_schema"]["strict"] is True
+    legacy = LLMAdapter(api_key="sk-test", model="gpt-3.5-turbo")._request_kwargs(request)
+    assert legacy["response_format"] == {"type": "json_object"}
+
+    claude_kwargs = LLMAdapter(api_key="sk-ant-test", model="claude-3-5-haiku-latest")._request_kwargs(request)
+    assert claude_kwargs["tool_choice"] == {"type": "tool", "name": "incident_classification"}
+    assert claude_kwargs["tools"][0]["input_schema"] is llm_adapter.CLASSIFICATION_SCHEMA
+
+    gemini_schema = llm_adapter._gemini_schema(llm_adapter.CLASSIFICATION_SCHEMA)
+    assert "additionalProperties" not in gemini_schema
+    assert gemini_schema["properties"]["fine_label"]["format"] == "enum"
+    assert "sql_injection" in gemini_schema["properties"]["fine_label"]["enum"]
+
+
+def test_extract_json_object_handles_fences_nesting_and_braces_in_strings():
+    obj = {"fine_label": "xss", "rationale": "payload was <script>{alert(1)}</script> \"quoted\" }",
+           "meta": {"a": {"b": {"c": [1, 2]}}}}
+    text = "Sure! Here is the result:\n```json\n" + json.dumps(obj) + "\n```\nHope that helps {"
+    assert llm_adapter.extract_json_object(text) == obj
+    assert llm_adapter.extract_json_object("{not json} then {\"ok\": 1}") == {"ok": 1}
+    assert llm_adapter.extract_json_object("{" * 10000) is None
+
+
+def test_unparseable_classification_is_retried_once_and_counted():
+    replies = iter(["I think it's SQL injection!", json.dumps({"fine_label": "sql_injection", "confidence": 0.8})])
+    temperatures = []
+
+    def create(**kwargs):
+        temperatures.append(kwargs["temperature"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=next(replies)))], usage=None)
+
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    adapter.rate_limiter = None
+    llm_adapter.reset_parse_stats()
+
+    result = adapter.classify_incident("weird syntax on login")
+
+    assert result["category"] == "sql_injection"
+    assert temperatures == [0.1, 0.0]
+    assert llm_adapter.get_parse_stats() == {"responses": 2, "extracted": 0, "retried": 1, "unparseable": 0}
+
+
+def test_anthropic_tool_use_response_is_read_as_json():
+    adapter = LLMAdapter(api_key="sk-ant-test", model="claude-3-5-haiku-latest")
+    block = SimpleNamespace(type="tool_use", input={"fine_label": "injection", "confidence": 0.9})
+    assert json.loads(adapter._response_text(SimpleNamespace(content=[block]))) == block.input
+
+
+def make_turn_adapter(turn: dict, question: str = "Which page was it on?"):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        schema = kwargs.get("response_format", {}).get("json_schema", {}).get("name")
+        content = json.dumps(turn) if schema == "incident_turn" else question
+        if kwargs.get("stream"):
+            return iter(openai_stream(content))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    adapter.rate_limiter = None
+    return adapter, calls
+
+
+TURN = {
+    "fine_label": "sql_injection", "confidence": 0.55, "labels": ["sql_injection"],
+    "incident_type": "A05:2025 - Injection", "clarifying_question": "\"What did the error say?\"",
+    "rationale": "Could be injection", "entities": {"ips": ["10.0.0.5"], "cves": []}, "owasp_version": "2025",
+}
+
+
+def test_analyze_turn_returns_everything_from_one_call():
+    adapter, calls = make_turn_adapter(TURN)
+    turn = adapter.analyze_turn("weird syntax on login from 10.0.0.5")
+
+    assert len(calls) == 1
+    assert turn["classification"]["category"] == "sql_injection"
+    assert "entities" not in turn["classification"]
+    assert turn["entities"]["ips"] == ["10.0.0.5"]
+    assert turn["entities"]["urls"] == []
+    assert turn["clarifying_question"] == "What did the error say?"
+
+
+def test_analyze_turn_question_only_below_threshold():
+    adapter, calls = make_turn_adapter({**TURN, "confidence": 0.9})
+    assert adapter.analyze_turn("SQL injection on login")["clarifying_question"] is None
+
+    # below the threshold with no question written -> one extra call for it
+    adapter, calls = make_turn_adapter({**TURN, "clarifying_question": ""})
+    assert adapter.analyze_turn("weird syntax")["clarifying_question"] == "Which page was it on?"
+    assert len(calls) == 2
+
+
+def test_stream_analyze_turn_streams_the_question():
+    adapter, _ = make_turn_adapter(TURN)
+    chunks = list(adapter.stream_analyze_turn("weird syntax on login"))
+
+    partial = [c.question for c in chunks[:-1] if c.question]
+    assert len(partial) > 1 and all('What did the error say?"'.startswith(q) for q in partial)
+    assert chunks[-1].result["clarifying_question"] == "What did the error say?"
+
+
+def test_budget_falls_back_to_keyword_detection_when_the_llm_is_slow():
+    def create(**kwargs):
+        time.sleep(2)  # provider brownout
+        if kwargs.get("stream"):
+            return iter(openai_stream(json.dumps(TURN)))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(TURN)))], usage=None)
+
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    adapter.rate_limiter = None
+    text = "attacker used ' OR 1=1 -- in the login form (sql injection)"
+
+    start = time.monotonic()
+    result = adapter.classify_incident(text, budget=0.2)
+    assert time.monotonic() - start < 1.0
+    assert result["degraded"] is True and result["degraded_reason"] == "timeout"
+    assert result["fine_label"] == "injection"
+
+    start = time.monotonic()
+    chunks = list(adapter.stream_analyze_turn(text, budget=0.2))
+    assert time.monotonic() - start < 1.0
+    assert chunks[-1].result["classification"]["degraded"] is True
+
+    slow = make_adapter(FakeAsyncOpenAI(latency=2))
+    result = asyncio.run(slow.aclassify_incident(text, budget=0.2))
+    assert result["degraded"] is True
+
+
+def test_budget_leaves_fast_calls_alone():
+    adapter, calls = make_turn_adapter(TURN)
+    turn = adapter.analyze_turn("weird syntax on login", budget=5)
+    assert "degraded" not in turn["classification"]
+    assert turn["clarifying_question"] == "What did the error say?"
+    assert list(adapter.stream_analyze_turn("weird syntax", budget=5))[-1].result == turn
+
+
+def test_hedged_request_uses_the_faster_provider():
+    def slow_create(**kwargs):
+        time.sleep(1.0)
+        content = json.dumps({"fine_label": "xss", "confidence": 0.9})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    def fast_create(**kwargs):
+        assert kwargs["tool_choice"]["type"] == "tool"  # same request, Anthropic's format
+        block = SimpleNamespace(type="tool_use", input={"fine_label": "injection", "confidence": 0.8})
+        return SimpleNamespace(content=[block], usage=None)
+
+    adapter = LLMAdapter(api_key="sk-test", model="gpt-4o-mini")
+    adapter.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=slow_create)))
+    adapter.rate_limiter = None
+    adapter.enable_hedging("claude-3-5-haiku-latest", api_key="sk-ant-test", delay=0.1)
+    adapter.hedge.client = SimpleNamespace(messages=SimpleNamespace(create=fast_create))
+    adapter.hedge.rate_limiter = None
+
+    start = time.monotonic()
+    result = adapter.classify_incident("SQL error on login")
+    assert time.monotonic() - start < 0.8
+    assert result["fine_label"] == "injection"
+    assert adapter.hedge_stats == {"hedged": 1, "secondary_wins": 1}
+
+
+def test_latency_histogram_p95_drives_the_hedge_delay():
+    from src.hedging import DEFAULT_HEDGE_DELAY, LatencyHistogram, hedge_delay
+
+    histogram = LatencyHistogram()
+    assert hedge_delay(histogram) == DEFAULT_HEDGE_DELAY  # no data yet
+    for i in range(100):
+        histogram.record(0.5 if i < 95 else 8.0)
+    assert 0.5 <= hedge_delay(histogram) < 0.56  # bucket bound just above p95
+    assert histogram.quantile(0.99) >= 8.0
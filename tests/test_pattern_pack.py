@@ -0,0 +1,80 @@
+# tests/test_pattern_pack.py
+"""
+Tests for the YAML pattern pack: validation, compilation and hot reload.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.explicit_detector import ExplicitDetector, get_detector
+from src.pattern_pack import (
+    DEFAULT_PACK_PATH,
+    PatternPackError,
+    PatternPackSource,
+    load_pattern_pack,
+)
+
+
+def _write_pack(path, version, patterns, tick=0):
+    """Write-then-rename, with a distinct mtime per tick (coarse filesystem clocks)."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(yaml.safe_dump({"version": version, "patterns": patterns}), encoding="utf-8")
+    os.replace(tmp, path)
+    stamp = 1_700_000_000_000_000_000 + tick * 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_shipped_pack_loads():
+    """The repo's pack validates and is what the shared detector uses."""
+    pack = load_pattern_pack(DEFAULT_PACK_PATH)
+    assert pack.version
+    assert len(pack.entries) > 200
+    assert get_detector().patterns == pack.entries
+    assert get_detector().detect("SQL injection on the login form") == ("injection", 0.95)
+
+
+@pytest.mark.parametrize("patterns,message", [
+    ([{"pattern": r"\bsql(", "label": "injection", "confidence": 0.9}], "invalid regex"),
+    ([{"pattern": r"\bsql", "label": "injection", "confidence": 1.5}], r"not in \[0, 1\]"),
+    ([{"pattern": r"\bsql", "label": "", "confidence": 0.9}], "'label'"),
+    ([{"pattern": r"\bsql", "label": "injection", "confidence": "high"}], "'confidence'"),
+    ([], "non-empty list"),
+])
+def test_invalid_pack_rejected(tmp_path, patterns, message):
+    """Bad entries fail loudly with the entry and the reason."""
+    path = tmp_path / "pack.yaml"
+    _write_pack(path, "1", patterns)
+    with pytest.raises(PatternPackError, match=message):
+        load_pattern_pack(path)
+
+
+def test_hot_reload_swaps_pack(tmp_path):
+    """A changed file swaps in a new snapshot; a broken one keeps the last good pack."""
+    path = tmp_path / "pack.yaml"
+    _write_pack(path, "1", [{"pattern": r"\bfoo\b", "label": "injection", "confidence": 0.9}])
+    source = PatternPackSource(path, check_interval=None)
+    detector = ExplicitDetector(pack_path=path)
+    old = source.pack
+    assert detector.detect("foo bar") == ("injection", 0.9)
+
+    _write_pack(path, "2", [{"pattern": r"\bbar\b", "label": "cryptographic_failures", "confidence": 0.8}], tick=1)
+    assert source.reload() is True
+    assert source.pack.version == "2"
+    assert source.pack.matcher.best_match("foo bar") == ("cryptographic_failures", 0.8)
+    # snapshots are immutable - anyone still holding the old one is unaffected
+    assert old.matcher.best_match("foo bar") == ("injection", 0.9)
+
+    _write_pack(path, "3-broken", [{"pattern": r"\bbaz(", "label": "other", "confidence": 0.5}], tick=2)
+    assert source.reload() is False
+    assert source.pack.version == "2"
+    assert "invalid regex" in source.last_error
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
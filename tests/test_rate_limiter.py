@@ -0,0 +1,116 @@
+# tests/test_rate_limiter.py
+"""
+Tests for the adaptive rate limiter and retry loop.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.rate_limiter import (
+    AdaptiveRateLimiter,
+    RetryDeadlineExceeded,
+    RetryPolicy,
+    call_with_retry,
+    classify_error,
+)
+
+FAST = RetryPolicy(max_attempts=4, base_delay=0.01, max_delay=0.05)
+
+
+class StatusError(Exception):
+    """Shaped like openai.APIStatusError / anthropic.APIStatusError."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def test_classify_error():
+    assert classify_error(StatusError(429, {"retry-after": "2"})) == (True, True, 2.0)
+    assert classify_error(StatusError(503)) == (True, False, None)
+    assert classify_error(StatusError(400)) == (False, False, None)
+    assert classify_error(ConnectionResetError()) == (True, False, None)
+    assert classify_error(ValueError("bad json")) == (False, False, None)
+    # Gemini style: google.api_core error with .code and the delay in the message
+    gemini = Exception("429 Quota exceeded. Please retry in 1.5s.")
+    gemini.code = 429
+    assert classify_error(gemini) == (True, True, 1.5)
+
+
+def test_limiter_backs_off_on_throttle_and_recovers():
+    limiter = AdaptiveRateLimiter(rate=10.0)
+    limiter.on_throttle()
+    limiter.on_throttle()  # same overload - no second halving inside the cooldown
+    assert limiter.rate == 5.0
+
+    for _ in range(60):  # 1% of the max rate back per success, capped at the max
+        limiter.on_success()
+    assert limiter.rate == 10.0
+
+
+def test_limiter_paces_requests_and_honours_retry_after():
+    limiter = AdaptiveRateLimiter(rate=100.0, burst=1)
+    assert limiter.reserve() == 0.0
+    assert limiter.reserve() == pytest.approx(0.01, abs=0.005)
+
+    limiter.on_throttle(retry_after=5.0)
+    assert limiter.reserve(deadline=time.monotonic() + 1.0) is None  # can't start before the deadline
+    assert limiter.reserve() >= 4.9
+
+
+def test_call_with_retry_recovers_from_throttling():
+    limiter = AdaptiveRateLimiter(rate=1000.0)
+    errors = [StatusError(429), StatusError(503)]
+
+    def flaky(timeout):
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert call_with_retry(flaky, limiter, FAST) == "ok"
+    assert limiter.stats["retries"] == 2
+    assert limiter.stats["throttled"] == 1
+
+
+def test_call_with_retry_gives_up():
+    calls = []
+
+    def always(exc):
+        def fn(timeout):
+            calls.append(timeout)
+            raise exc
+        return fn
+
+    # non-retryable errors surface straight away
+    with pytest.raises(StatusError):
+        call_with_retry(always(StatusError(401)), policy=FAST)
+    assert len(calls) == 1
+
+    # retryable ones stop at max_attempts
+    calls.clear()
+    with pytest.raises(StatusError):
+        call_with_retry(always(StatusError(500)), policy=FAST)
+    assert len(calls) == FAST.max_attempts
+
+    # ...or when the retry-after would pass the deadline
+    calls.clear()
+    with pytest.raises(StatusError):
+        call_with_retry(always(StatusError(429, {"retry-after": "10"})), policy=FAST,
+                        deadline=time.monotonic() + 0.5)
+    assert len(calls) == 1 and calls[0] <= 0.5
+
+    limiter = AdaptiveRateLimiter(rate=1.0, burst=1)
+    limiter.reserve()
+    with pytest.raises(RetryDeadlineExceeded):
+        call_with_retry(lambda timeout: "ok", limiter, FAST, deadline=time.monotonic() + 0.1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
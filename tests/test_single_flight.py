@@ -0,0 +1,115 @@
+# tests/test_single_flight.py
+"""
+Tests for single-flight coalescing (src/single_flight.py) and its use in
+LLMAdapter against the offline fake provider.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.llm_adapter as llm_adapter
+from src.fake_llm import FakeLLMConfig, configure_fake_llm, fake_llm_stats
+from src.llm_adapter import LLMAdapter
+from src.single_flight import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def slow_fake():
+    configure_fake_llm(FakeLLMConfig(latency_ms=200, latency_sigma=0.0))
+    yield
+    configure_fake_llm(FakeLLMConfig())
+    llm_adapter.clear_provider_clients()
+
+
+def test_concurrent_identical_classifications_share_one_call():
+    adapter = LLMAdapter(model="fake")
+    start = threading.Barrier(6)
+
+    def classify(text):
+        start.wait()
+        return adapter.classify_incident(text)
+
+    # same incident, differently spaced / cased - same cache key
+    texts = ["SQL error after ' OR 1=1 in the login form"] * 3 + ["sql error after ' or 1=1 in the  login form"] * 3
+    with ThreadPoolExecutor(6) as pool:
+        results = list(pool.map(classify, texts))
+    assert fake_llm_stats()["calls"] == 1
+    assert all(r == results[0] for r in results)
+    results[1]["category"] = "changed"
+    assert results[0]["category"] == "injection"  # every caller gets its own copy
+
+    # async batch: duplicates in flight together coalesce, different incidents don't
+    configure_fake_llm(FakeLLMConfig(latency_ms=50, latency_sigma=0.0))
+    batch = ["passwords stored in plain text", "users can see other users' invoices"] * 5
+    results = asyncio.run(adapter.aclassify_many(batch, concurrency=len(batch)))
+    assert fake_llm_stats()["calls"] == 2
+    assert [r["category"] for r in results[:2]] == ["cryptographic_failures", "broken_access_control"]
+
+    # off switch - everyone calls
+    configure_fake_llm(FakeLLMConfig(latency_ms=50, latency_sigma=0.0))
+    adapter.coalesce = False
+    asyncio.run(adapter.aclassify_many(batch, concurrency=len(batch)))
+    assert fake_llm_stats()["calls"] == len(batch)
+
+
+def test_stream_and_blocking_turns_coalesce():
+    adapter = LLMAdapter(model="fake")
+    text = "my password reset link works for any account"
+    with ThreadPoolExecutor(3) as pool:
+        streamed = pool.submit(lambda: list(adapter.stream_analyze_turn(text)))
+        time.sleep(0.05)  # the stream leads
+        blocking = pool.submit(adapter.analyze_turn, text)
+        follower_stream = pool.submit(lambda: list(adapter.stream_analyze_turn(text)))
+        chunks, turn, follower_chunks = streamed.result(), blocking.result(), follower_stream.result()
+    assert fake_llm_stats()["calls"] == 1
+    assert len(chunks) > 1 and chunks[-1].result == turn
+    assert len(follower_chunks) == 1  # just the finished turn
+    assert follower_chunks[0].result == turn
+    assert follower_chunks[0].label == turn["classification"]["fine_label"]
+
+
+def test_errors_are_shared_but_timeouts_hand_over():
+    flights = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def leader_call(error):
+        def call():
+            calls.append("leader")
+            started.set()
+            time.sleep(0.1)
+            raise error
+        return call
+
+    def follower_call():
+        calls.append("follower")
+        return "own answer"
+
+    def run(error):
+        started.clear()
+        calls.clear()
+        with ThreadPoolExecutor(2) as pool:
+            leader = pool.submit(flights.do, "key", leader_call(error))
+            started.wait()
+            follower = pool.submit(flights.do, "key", follower_call)
+            with pytest.raises(type(error)):
+                leader.result()
+            return follower
+
+    # a real failure reaches everyone waiting
+    with pytest.raises(ValueError):
+        run(ValueError("bad request")).result()
+    assert calls == ["leader"]
+
+    # the leader running out of its own time isn't the follower's problem
+    assert run(TimeoutError("leader's deadline")).result() == ("own answer", False)
+    assert calls == ["leader", "follower"]
+    assert flights.in_flight() == 0